@@ -8,6 +8,12 @@ from alembic import context
 from app.core.config import get_settings
 from app.db import Base
 from app.models.payment import Payment  # noqa: F401
+from app.models.event import PaymentEvent  # noqa: F401
+from app.models.webhook import WebhookEndpoint  # noqa: F401
+from app.models.idempotency import IdempotencyKey  # noqa: F401
+from app.models.stats import PaymentDailyStats  # noqa: F401
+from app.models.refund import PaymentRefund  # noqa: F401
+from app.services.partitions import NAME_RE
 
 # Берём конфиг Alembic
 config = context.config
@@ -20,6 +26,14 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def include_object(obj, name, type_, reflected, compare_to):
+    # Секции payments и их индексы создаёт app.workers.partitions
+    table = obj.table.name if type_ == "index" else name
+    if reflected and type_ in ("table", "index") and NAME_RE.match(table):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     settings = get_settings()
     context.configure(
@@ -28,6 +42,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -39,6 +54,7 @@ def do_run_migrations(connection):
         connection=connection,
         target_metadata=target_metadata,
         compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -0,0 +1,167 @@
+"""money in integer minor units
+
+Revision ID: 3e7a9c1d5b26
+Revises: c8feb122410f
+Create Date: 2026-10-18 14:12:37.402115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e7a9c1d5b26'
+down_revision = 'c8feb122410f'
+branch_labels = None
+depends_on = None
+
+# Экспоненты на момент миграции (копия app/core/money.py: миграция не
+# должна меняться вместе с кодом).
+ZERO_DECIMALS = (
+    'BIF', 'CLP', 'DJF', 'GNF', 'ISK', 'JPY', 'KMF', 'KRW', 'PYG',
+    'RWF', 'UGX', 'UYI', 'VND', 'VUV', 'XAF', 'XOF', 'XPF',
+)
+THREE_DECIMALS = ('BHD', 'IQD', 'JOD', 'KWD', 'LYD', 'OMR', 'TND')
+
+
+def exponent(currency: str) -> str:
+    """SQL: экспонента валюты из столбца currency."""
+    def listed(codes):
+        return ', '.join(f"'{code}'" for code in codes)
+    return (
+        f"CASE WHEN {currency} IN ({listed(ZERO_DECIMALS)}) THEN 0 "
+        f"WHEN {currency} IN ({listed(THREE_DECIMALS)}) THEN 3 ELSE 2 END"
+    )
+
+
+def to_minor(amount: str, currency: str) -> str:
+    # power от numeric: 10 ^ n было бы double precision
+    return (
+        f"round({amount} * power(10::numeric, {exponent(currency)}))::bigint")
+
+
+def from_minor(minor: str, currency: str) -> str:
+    return (
+        f"round({minor} / power(10::numeric, {exponent(currency)}), 2)")
+
+
+def upgrade() -> None:
+    # Одна перезапись каждой секции на оба столбца
+    op.execute(f"""
+        ALTER TABLE payments
+            ALTER COLUMN amount TYPE bigint
+                USING {to_minor('amount', 'currency')},
+            ALTER COLUMN refunded_total DROP DEFAULT,
+            ALTER COLUMN refunded_total TYPE bigint
+                USING {to_minor('refunded_total', 'currency')},
+            ALTER COLUMN refunded_total SET DEFAULT 0
+    """)
+    op.alter_column('payments', 'amount', new_column_name='amount_minor')
+    op.alter_column(
+        'payments', 'refunded_total', new_column_name='refunded_minor')
+
+    op.add_column('payment_refunds', sa.Column(
+        'currency', sa.String(length=3), nullable=True))
+    op.execute("""
+        UPDATE payment_refunds r SET currency = p.currency
+        FROM payments p
+        WHERE p.id = r.payment_id
+    """)
+    op.alter_column('payment_refunds', 'currency', nullable=False)
+    op.execute(f"""
+        ALTER TABLE payment_refunds ALTER COLUMN amount TYPE bigint
+            USING {to_minor('amount', 'currency')}
+    """)
+    op.alter_column(
+        'payment_refunds', 'amount', new_column_name='amount_minor')
+
+    op.execute(f"""
+        ALTER TABLE payment_daily_stats ALTER COLUMN amount TYPE bigint
+            USING {to_minor('amount', 'currency')}
+    """)
+    op.alter_column(
+        'payment_daily_stats', 'amount', new_column_name='amount_minor')
+
+    # Ответы ключей — суммы строками, как теперь у PaymentRead; fingerprint
+    # — по сумме в минорных единицах, как теперь считает
+    # app.services.idempotency.fingerprint (json.dumps с sort_keys и без
+    # пробелов). Иначе повтор старого ключа получил бы 409.
+    op.execute(f"""
+        UPDATE payment_idempotency_keys k SET
+            fingerprint = encode(sha256(convert_to(format(
+                '{{"amount":%s,"currency":%s,"order_id":%s}}',
+                m.amount_minor, to_json(m.currency)::text, m.order_id
+            ), 'UTF8')), 'hex'),
+            response = k.response || jsonb_build_object(
+                'amount', round(m.amount, m.exponent)::text,
+                'refunded_total', round(m.refunded_total, m.exponent)::text
+            )
+        FROM (
+            SELECT payment_id,
+                   response->>'currency' AS currency,
+                   response->>'order_id' AS order_id,
+                   (response->>'amount')::numeric AS amount,
+                   coalesce((response->>'refunded_total')::numeric, 0)
+                       AS refunded_total,
+                   {exponent("response->>'currency'")} AS exponent,
+                   {to_minor("(response->>'amount')::numeric",
+                             "response->>'currency'")} AS amount_minor
+            FROM payment_idempotency_keys
+            WHERE response IS NOT NULL
+        ) m
+        WHERE k.payment_id = m.payment_id
+    """)
+
+
+def downgrade() -> None:
+    # Прежний fingerprint — json.dumps от float: 10.0, 10.5
+    op.execute(f"""
+        UPDATE payment_idempotency_keys k SET
+            fingerprint = encode(sha256(convert_to(format(
+                '{{"amount":%s,"currency":%s,"order_id":%s}}',
+                CASE WHEN m.amount::text LIKE '%.%' THEN m.amount::text
+                     ELSE m.amount::text || '.0' END,
+                to_json(m.currency)::text, m.order_id
+            ), 'UTF8')), 'hex'),
+            response = k.response || jsonb_build_object(
+                'amount', m.amount, 'refunded_total', m.refunded_total)
+        FROM (
+            SELECT payment_id,
+                   response->>'currency' AS currency,
+                   response->>'order_id' AS order_id,
+                   trim_scale((response->>'amount')::numeric) AS amount,
+                   coalesce((response->>'refunded_total')::numeric, 0)
+                       AS refunded_total
+            FROM payment_idempotency_keys
+            WHERE response IS NOT NULL
+        ) m
+        WHERE k.payment_id = m.payment_id
+    """)
+
+    op.alter_column(
+        'payment_daily_stats', 'amount_minor', new_column_name='amount')
+    op.execute(f"""
+        ALTER TABLE payment_daily_stats ALTER COLUMN amount TYPE numeric(20, 2)
+            USING {from_minor('amount', 'currency')}
+    """)
+
+    op.alter_column(
+        'payment_refunds', 'amount_minor', new_column_name='amount')
+    op.execute(f"""
+        ALTER TABLE payment_refunds ALTER COLUMN amount TYPE numeric(10, 2)
+            USING {from_minor('amount', 'currency')}
+    """)
+    op.drop_column('payment_refunds', 'currency')
+
+    op.alter_column('payments', 'amount_minor', new_column_name='amount')
+    op.alter_column(
+        'payments', 'refunded_minor', new_column_name='refunded_total')
+    op.execute(f"""
+        ALTER TABLE payments
+            ALTER COLUMN amount TYPE numeric(10, 2)
+                USING {from_minor('amount', 'currency')},
+            ALTER COLUMN refunded_total DROP DEFAULT,
+            ALTER COLUMN refunded_total TYPE numeric(10, 2)
+                USING {from_minor('refunded_total', 'currency')},
+            ALTER COLUMN refunded_total SET DEFAULT 0
+    """)
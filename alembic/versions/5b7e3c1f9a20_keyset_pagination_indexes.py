@@ -0,0 +1,66 @@
+"""keyset pagination indexes
+
+Revision ID: 5b7e3c1f9a20
+Revises: d00a1d9c01f5
+Create Date: 2026-10-18 10:12:04.318552
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e3c1f9a20'
+down_revision = 'd00a1d9c01f5'
+branch_labels = None
+depends_on = None
+
+
+NEW_INDEXES = {
+    'ix_payments_created_at_id': ['created_at', 'id'],
+    'ix_payments_order_id_created_at_id': ['order_id', 'created_at', 'id'],
+    'ix_payments_status_created_at_id': ['status', 'created_at', 'id'],
+    'ix_payments_currency_created_at_id': ['currency', 'created_at', 'id'],
+}
+
+OLD_INDEXES = {
+    'ix_payments_id': ['id'],
+    'ix_payments_order_id': ['order_id'],
+    'ix_payments_status': ['status'],
+}
+
+
+def upgrade() -> None:
+    # CONCURRENTLY — чтобы не блокировать запись в большую таблицу
+    with op.get_context().autocommit_block():
+        for name, columns in NEW_INDEXES.items():
+            op.create_index(
+                name, 'payments', columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name in OLD_INDEXES:
+            op.drop_index(
+                name, table_name='payments',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in OLD_INDEXES.items():
+            op.create_index(
+                name, 'payments', columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name in NEW_INDEXES:
+            op.drop_index(
+                name, table_name='payments',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
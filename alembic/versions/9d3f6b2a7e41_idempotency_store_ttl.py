@@ -0,0 +1,135 @@
+"""idempotency store with fingerprint, response and ttl
+
+Revision ID: 9d3f6b2a7e41
+Revises: f4b8d2a61c37
+Create Date: 2026-10-18 19:12:45.307718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f6b2a7e41'
+down_revision = 'f4b8d2a61c37'
+branch_labels = None
+depends_on = None
+
+
+# IDEMPOTENCY_TTL_SECONDS по умолчанию на момент миграции
+TTL_SECONDS = 86400
+
+# Тот же канонический JSON, что у app.services.idempotency.fingerprint:
+# json.dumps(sort_keys=True, separators=(",", ":")), amount как float
+# (repr: 10.0, 10.5, 10.55).
+FINGERPRINT_SQL = """
+encode(sha256(convert_to(
+    '{"amount":'
+    || CASE WHEN p.amount = trunc(p.amount)
+            THEN trunc(p.amount)::text || '.0'
+            ELSE rtrim(p.amount::text, '0') END
+    || ',"currency":' || to_json(p.currency)::text
+    || ',"order_id":' || p.order_id::text || '}',
+    'UTF8')), 'hex')
+"""
+
+# Для ключей, созданных до миграции, ответ — текущее состояние платежа
+RESPONSE_SQL = """
+jsonb_build_object(
+    'id', p.id, 'order_id', p.order_id, 'amount', p.amount,
+    'currency', p.currency, 'status', lower(p.status::text),
+    'provider', p.provider, 'created_at', p.created_at,
+    'updated_at', p.updated_at)
+"""
+
+
+def upgrade() -> None:
+    op.add_column('payment_idempotency_keys', sa.Column(
+        'fingerprint', sa.String(length=64), nullable=True))
+    op.add_column('payment_idempotency_keys', sa.Column(
+        'response', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('payment_idempotency_keys', sa.Column(
+        'expires_at', sa.DateTime(timezone=True), nullable=True))
+
+    # строка переживает ключ (нужна для поиска по id), поэтому первичный
+    # ключ — payment_id, а idempotency_key становится nullable
+    op.drop_constraint(
+        'payment_idempotency_keys_payment_id_key',
+        'payment_idempotency_keys', type_='unique')
+    op.drop_constraint(
+        'payment_idempotency_keys_pkey',
+        'payment_idempotency_keys', type_='primary')
+    op.create_primary_key(
+        'payment_idempotency_keys_pkey',
+        'payment_idempotency_keys', ['payment_id'])
+    op.alter_column(
+        'payment_idempotency_keys', 'idempotency_key',
+        existing_type=sa.String(length=64), nullable=True)
+    op.create_unique_constraint(
+        'payment_idempotency_keys_idempotency_key_key',
+        'payment_idempotency_keys', ['idempotency_key'])
+
+    op.execute(f"""
+        UPDATE payment_idempotency_keys k
+        SET fingerprint = {FINGERPRINT_SQL},
+            response = {RESPONSE_SQL},
+            expires_at = k.created_at + interval '{TTL_SECONDS} seconds'
+        FROM payments p
+        WHERE p.id = k.payment_id
+          AND p.created_at = k.created_at
+          AND k.created_at > now() - interval '{TTL_SECONDS} seconds'
+    """)
+    # ключи старше TTL сразу свободны
+    op.execute(
+        "UPDATE payment_idempotency_keys SET idempotency_key = NULL "
+        "WHERE expires_at IS NULL")
+
+    op.create_index(
+        'ix_payment_idempotency_keys_expires_at',
+        'payment_idempotency_keys', ['expires_at'], unique=False,
+        postgresql_where=sa.text('expires_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_payment_idempotency_keys_expires_at',
+        table_name='payment_idempotency_keys',
+        postgresql_where=sa.text('expires_at IS NOT NULL'))
+    op.drop_constraint(
+        'payment_idempotency_keys_idempotency_key_key',
+        'payment_idempotency_keys', type_='unique')
+    # Освобождённым ключам возвращается исходное значение из payments;
+    # если его уже занял новый платёж — заглушка, чтобы сохранить строку.
+    op.execute("""
+        UPDATE payment_idempotency_keys k
+        SET idempotency_key = CASE
+            WHEN EXISTS (
+                SELECT 1 FROM payment_idempotency_keys k2
+                WHERE k2.idempotency_key = p.idempotency_key)
+            THEN 'purged-' || k.payment_id
+            ELSE p.idempotency_key END
+        FROM payments p
+        WHERE k.idempotency_key IS NULL
+          AND p.id = k.payment_id
+          AND p.created_at = k.created_at
+    """)
+    op.execute(
+        "UPDATE payment_idempotency_keys "
+        "SET idempotency_key = 'purged-' || payment_id "
+        "WHERE idempotency_key IS NULL")
+    op.alter_column(
+        'payment_idempotency_keys', 'idempotency_key',
+        existing_type=sa.String(length=64), nullable=False)
+    op.drop_constraint(
+        'payment_idempotency_keys_pkey',
+        'payment_idempotency_keys', type_='primary')
+    op.create_primary_key(
+        'payment_idempotency_keys_pkey',
+        'payment_idempotency_keys', ['idempotency_key'])
+    op.create_unique_constraint(
+        'payment_idempotency_keys_payment_id_key',
+        'payment_idempotency_keys', ['payment_id'])
+    op.drop_column('payment_idempotency_keys', 'expires_at')
+    op.drop_column('payment_idempotency_keys', 'response')
+    op.drop_column('payment_idempotency_keys', 'fingerprint')
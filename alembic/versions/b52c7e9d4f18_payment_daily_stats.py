@@ -0,0 +1,58 @@
+"""payment daily stats rollup
+
+Revision ID: b52c7e9d4f18
+Revises: 9d3f6b2a7e41
+Create Date: 2026-10-18 21:04:11.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52c7e9d4f18'
+down_revision = '9d3f6b2a7e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payment_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('status', postgresql.ENUM(
+            'PENDING', 'CONFIRMED', 'FAILED', 'REFUNDED',
+            name='paymentstatus', create_type=False), nullable=False),
+        sa.Column('payments', sa.BigInteger(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=20, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'currency', 'status'),
+    )
+    op.create_table(
+        'payment_stats_watermark',
+        sa.Column('id', sa.SmallInteger(), nullable=False),
+        sa.Column('watermark', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_payments_updated_at', 'payments', ['updated_at'], unique=False)
+
+    # Начальный пересчёт всей таблицы; дальше — по водяному знаку.
+    # now() — начало транзакции миграции: изменения, закоммиченные
+    # после её снимка, попадут в первый пересчёт с запасом overlap.
+    op.execute("""
+        INSERT INTO payment_daily_stats (day, currency, status, payments, amount)
+        SELECT date(timezone('UTC', created_at)), currency, status,
+               count(*), sum(amount)
+        FROM payments
+        GROUP BY 1, 2, 3
+    """)
+    op.execute(
+        "INSERT INTO payment_stats_watermark (id, watermark) VALUES (1, now())")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_updated_at', table_name='payments')
+    op.drop_table('payment_stats_watermark')
+    op.drop_table('payment_daily_stats')
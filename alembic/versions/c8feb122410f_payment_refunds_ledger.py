@@ -0,0 +1,55 @@
+"""payment refunds ledger
+
+Revision ID: c8feb122410f
+Revises: b52c7e9d4f18
+Create Date: 2026-10-18 08:35:24.974878
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8feb122410f'
+down_revision = 'b52c7e9d4f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payment_refunds',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('payment_id', sa.BigInteger(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key'),
+    )
+    op.create_index(
+        'ix_payment_refunds_payment_id_id', 'payment_refunds',
+        ['payment_id', 'id'], unique=False)
+    # константный DEFAULT: без перезаписи секций
+    op.add_column('payments', sa.Column(
+        'refunded_total', sa.Numeric(precision=10, scale=2),
+        server_default='0', nullable=False))
+
+    # Прежний возврат — всегда полный: строка журнала на всю сумму
+    op.execute("""
+        INSERT INTO payment_refunds (payment_id, amount, created_at)
+        SELECT id, amount, updated_at
+        FROM payments
+        WHERE status = 'REFUNDED'
+        ORDER BY updated_at
+    """)
+    op.execute(
+        "UPDATE payments SET refunded_total = amount WHERE status = 'REFUNDED'")
+
+
+def downgrade() -> None:
+    op.drop_column('payments', 'refunded_total')
+    op.drop_index(
+        'ix_payment_refunds_payment_id_id', table_name='payment_refunds')
+    op.drop_table('payment_refunds')
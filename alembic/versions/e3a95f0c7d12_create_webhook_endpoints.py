@@ -0,0 +1,34 @@
+"""create webhook endpoints
+
+Revision ID: e3a95f0c7d12
+Revises: 8c41d2e7b5f3
+Create Date: 2026-10-18 13:05:51.402771
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a95f0c7d12'
+down_revision = '8c41d2e7b5f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('webhook_endpoints',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('url', sa.String(length=2048), nullable=False),
+    sa.Column('secret', sa.String(length=128), nullable=False),
+    sa.Column('event_types', postgresql.ARRAY(sa.String(length=32)), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('webhook_endpoints')
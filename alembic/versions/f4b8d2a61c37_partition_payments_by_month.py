@@ -0,0 +1,135 @@
+"""partition payments by month
+
+Revision ID: f4b8d2a61c37
+Revises: e3a95f0c7d12
+Create Date: 2026-10-18 16:40:12.581204
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2a61c37'
+down_revision = 'e3a95f0c7d12'
+branch_labels = None
+depends_on = None
+
+
+# Секций наперёд при миграции; дальше их создаёт app.workers.partitions
+AHEAD_MONTHS = 3
+
+COLUMNS = (
+    "id, order_id, amount, currency, status, provider, "
+    "created_at, updated_at, idempotency_key"
+)
+
+COLUMNS_DDL = """
+    id bigint NOT NULL DEFAULT nextval('payments_id_seq'),
+    order_id bigint NOT NULL,
+    amount numeric(10, 2) NOT NULL,
+    currency varchar(3) NOT NULL,
+    status paymentstatus NOT NULL,
+    provider varchar(32) NOT NULL,
+    created_at timestamptz NOT NULL,
+    updated_at timestamptz NOT NULL,
+    idempotency_key varchar(64) NOT NULL
+"""
+
+KEYSET_INDEXES = {
+    'ix_payments_created_at_id': ['created_at', 'id'],
+    'ix_payments_order_id_created_at_id': ['order_id', 'created_at', 'id'],
+    'ix_payments_status_created_at_id': ['status', 'created_at', 'id'],
+    'ix_payments_currency_created_at_id': ['currency', 'created_at', 'id'],
+}
+
+
+def _add_months(month: date, count: int) -> date:
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def _month(value: datetime | None) -> date:
+    value = value or datetime.now(timezone.utc)
+    return value.astimezone(timezone.utc).date().replace(day=1)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    # Запись в payments на время копирования блокируется, чтение — нет.
+    op.execute("LOCK TABLE payments IN EXCLUSIVE MODE")
+    oldest, newest = conn.execute(
+        sa.text("SELECT min(created_at), max(created_at) FROM payments")
+    ).one()
+
+    op.execute(
+        f"CREATE TABLE payments_partitioned ({COLUMNS_DDL}) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    month = _month(oldest)
+    last = max(
+        _add_months(_month(None), AHEAD_MONTHS), _month(newest))
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE payments_p{month:%Y_%m} "
+            "PARTITION OF payments_partitioned "
+            f"FOR VALUES FROM ('{month} 00:00:00+00') "
+            f"TO ('{upper} 00:00:00+00')"
+        )
+        month = upper
+
+    op.execute(
+        f"INSERT INTO payments_partitioned ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM payments"
+    )
+
+    op.create_table('payment_idempotency_keys',
+    sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+    sa.Column('payment_id', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('idempotency_key'),
+    sa.UniqueConstraint('payment_id')
+    )
+    op.execute(
+        "INSERT INTO payment_idempotency_keys "
+        "(idempotency_key, payment_id, created_at) "
+        "SELECT idempotency_key, id, created_at FROM payments"
+    )
+
+    # последовательность id переезжает на новую таблицу до DROP старой
+    op.execute(
+        "ALTER SEQUENCE payments_id_seq AS bigint "
+        "OWNED BY payments_partitioned.id"
+    )
+    op.drop_table('payments')
+    op.rename_table('payments_partitioned', 'payments')
+    op.execute(
+        "ALTER TABLE payments "
+        "ADD CONSTRAINT payments_pkey PRIMARY KEY (id, created_at)"
+    )
+    for name, columns in KEYSET_INDEXES.items():
+        op.create_index(name, 'payments', columns, unique=False)
+
+
+def downgrade() -> None:
+    # Секции, уже перенесённые в архивную схему, обратно не возвращаются.
+    op.execute("LOCK TABLE payments IN EXCLUSIVE MODE")
+    op.execute(f"CREATE TABLE payments_plain ({COLUMNS_DDL})")
+    op.execute(
+        f"INSERT INTO payments_plain ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM payments"
+    )
+    op.execute("ALTER SEQUENCE payments_id_seq OWNED BY payments_plain.id")
+    op.drop_table('payments')
+    op.drop_table('payment_idempotency_keys')
+    op.rename_table('payments_plain', 'payments')
+    op.execute(
+        "ALTER TABLE payments ADD CONSTRAINT payments_pkey PRIMARY KEY (id)")
+    op.create_index(
+        'ix_payments_idempotency_key', 'payments', ['idempotency_key'],
+        unique=True)
+    for name, columns in KEYSET_INDEXES.items():
+        op.create_index(name, 'payments', columns, unique=False)
@@ -0,0 +1,89 @@
+"""Маршрутизация чтений между primary и репликами.
+
+После успешного изменяющего запроса клиент получает cookie со временем,
+до которого его чтения идут на primary (DB_REPLICA_STICKINESS_SECONDS):
+так он видит свою запись, даже если реплика отстаёт. Cookie, а не память
+процесса — чтобы окно работало при любом числе воркеров.
+"""
+import math
+import time
+from http.cookies import SimpleCookie
+from typing import AsyncGenerator
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import read_session_factory
+
+STICKY_COOKIE = "db_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def _sticky_until(scope) -> float:
+    for name, value in scope["headers"]:
+        if name != b"cookie":
+            continue
+        morsel = SimpleCookie(value.decode("latin-1")).get(STICKY_COOKIE)
+        if morsel is not None:
+            try:
+                return float(morsel.value)
+            except ValueError:
+                return 0.0
+    return 0.0
+
+
+class PrimaryStickinessMiddleware:
+    """ASGI middleware: окно read-your-writes для клиента после записи.
+
+    Подключается в get_app только при настроенных репликах.
+    """
+
+    def __init__(self, app, window: float, clock=time.time):
+        self.app = app
+        self.window = window
+        self._clock = clock
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in SAFE_METHODS:
+            sticky = _sticky_until(scope) > self._clock()
+            scope.setdefault("state", {})["read_primary"] = sticky
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = self._clock() + self.window
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={math.ceil(self.window)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode("latin-1")),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def prefers_primary(request: Request) -> bool:
+    return getattr(request.state, "read_primary", False)
+
+
+async def get_read_session_factory(
+    request: Request,
+) -> async_sessionmaker[AsyncSession]:
+    # async: engine привязан к текущему loop, а sync-зависимости FastAPI
+    # выполняет в threadpool
+    return read_session_factory(primary=prefers_primary(request))
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для чтения: реплика, если клиент не в окне после записи."""
+    factory = read_session_factory(primary=prefers_primary(request))
+    async with factory() as session:
+        yield session
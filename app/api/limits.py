@@ -0,0 +1,292 @@
+"""Ограничение частоты запросов и сброс нагрузки.
+
+RateLimitMiddleware — token bucket на пару (клиент, маршрут): клиент —
+значение заголовка RATE_LIMIT_CLIENT_HEADER (API-ключ), без него — IP.
+Состояние вёдер — в RateLimitBackend: в памяти воркера или в Redis,
+общем для всех воркеров.
+
+LoadSheddingMiddleware сразу отвечает 503, если воркер перегружен:
+запросов в работе больше порога или ожидание соединения пула дольше
+порога. Лучше быстро отказать части клиентов, чем всем отвечать по
+таймауту.
+
+Обе middleware касаются только маршрутов API (prefix): /health
+и /metrics доступны и под нагрузкой.
+"""
+import hashlib
+import json
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from starlette.routing import BaseRoute, Match
+
+from app.core.config import Settings
+from app.core.metrics import LOAD_SHED, POOL_WAIT, RATE_LIMITED, PoolWaitTracker
+from app.services.cache import LRUStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # токенов в секунду
+    burst: int
+
+
+def parse_route_limits(value: str) -> dict[str, Limit]:
+    """ "POST /api/v1/payments/=5/10, ..." -> {"POST /api/v1/payments/": Limit}."""
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        route, sep, spec = item.strip().rpartition("=")
+        rate, _, burst = spec.partition("/")
+        method, _, path = route.partition(" ")
+        if not sep or not path.strip():
+            raise ValueError(f"Invalid RATE_LIMIT_ROUTES item: {item!r}")
+        limits[f"{method.upper()} {path.strip()}"] = Limit(
+            float(rate), int(burst) if burst else max(1, math.ceil(float(rate))))
+    return limits
+
+
+def take_token(
+    tokens: float,
+    elapsed: float,
+    limit: Limit,
+) -> tuple[float, float]:
+    """Долить ведро за elapsed секунд и взять токен.
+
+    Возвращает (токенов осталось, секунд до следующего токена — 0,
+    если токен взят).
+    """
+    tokens = min(limit.burst, tokens + elapsed * limit.rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / limit.rate
+
+
+class RateLimitBackend(ABC):
+    """Хранилище вёдер."""
+
+    @abstractmethod
+    async def acquire(self, key: str, limit: Limit) -> float:
+        """Взять токен из ведра key; 0 — можно, иначе Retry-After в секундах."""
+        ...
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Вёдра в памяти воркера: при N воркерах клиент получает до N×rate.
+
+    Полное ведро не отличается от отсутствующего, поэтому запись живёт
+    в LRU, пока ведро не дольётся, а число клиентов ограничено max_entries.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self._buckets: LRUStore[str, tuple[float, float]] = LRUStore(
+            max_entries, clock)
+
+    async def acquire(self, key: str, limit: Limit) -> float:
+        now = self._clock()
+        tokens, updated = self._buckets.get(key) or (limit.burst, now)
+        tokens, retry_after = take_token(tokens, now - updated, limit)
+        self._buckets.set(
+            key, (tokens, now), (limit.burst - tokens) / limit.rate)
+        return retry_after
+
+
+# take_token на стороне Redis: одно обращение на запрос, время — сервера,
+# чтобы часы воркеров не расходились
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Вёдра в Redis, общие для всех воркеров.
+
+    client — асинхронный клиент с методом eval, как у redis.asyncio.Redis.
+    Ошибки Redis не роняют запрос: он пропускается без ограничения.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def acquire(self, key: str, limit: Limit) -> float:
+        try:
+            retry_after = await self.client.eval(
+                TOKEN_BUCKET_LUA, 1, self.prefix + key,
+                limit.rate, limit.burst)
+        except Exception:
+            logger.warning("rate limit backend failed", exc_info=True)
+            return 0.0
+        return float(retry_after)
+
+
+def build_rate_limit_backend(settings: Settings) -> RateLimitBackend:
+    backend = settings.RATE_LIMIT_BACKEND
+    if backend == "memory":
+        return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_CLIENTS)
+    if backend == "redis":
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis requires the 'redis' package"
+            ) from exc
+        return RedisRateLimitBackend(aioredis.from_url(settings.REDIS_URL))
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend!r}")
+
+
+async def reject(send, status: int, detail: str, retry_after: float) -> None:
+    """Ответ в формате HTTPException, не доходя до приложения."""
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def match_route(scope) -> BaseRoute | None:
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def client_id(scope, header: bytes) -> str:
+    for name, value in scope["headers"]:
+        if name == header:
+            # сам ключ не храним ни в памяти, ни в Redis
+            return "key:" + hashlib.blake2b(value, digest_size=8).hexdigest()
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware: 429 с Retry-After, когда ведро клиента пусто.
+
+    Ведро — на клиента и шаблон маршрута: лимит из routes
+    ("METHOD /path"), иначе default (None — маршрут без ограничения).
+    """
+
+    def __init__(
+        self,
+        app,
+        backend: RateLimitBackend,
+        default: Limit | None,
+        routes: dict[str, Limit],
+        prefix: str,
+        client_header: str = "X-API-Key",
+    ):
+        self.app = app
+        self.backend = backend
+        self.default = default
+        self.routes = routes
+        self.prefix = prefix
+        self.client_header = client_header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        route = match_route(scope)
+        limit = None
+        if route is not None:
+            name = f"{scope['method']} {route.path}"
+            limit = self.routes.get(name, self.default)
+        if limit is None or limit.rate <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{client_id(scope, self.client_header)}:{name}"
+        retry_after = await self.backend.acquire(key, limit)
+        if retry_after > 0:
+            RATE_LIMITED.labels(route.path).inc()
+            # метка route в MetricsMiddleware
+            scope["route"] = route
+            await reject(send, 429, "Too many requests", retry_after)
+            return
+        await self.app(scope, receive, send)
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware: 503 с Retry-After, пока воркер перегружен.
+
+    max_in_flight — запросов API в работе в этом воркере, max_pool_wait —
+    ожидание соединения пула (PoolWaitTracker); 0 — порог выключен.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_in_flight: int,
+        max_pool_wait: float,
+        prefix: str,
+        pool_wait: PoolWaitTracker = POOL_WAIT,
+        retry_after: float = 1.0,
+    ):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait
+        self.prefix = prefix
+        self.pool_wait = pool_wait
+        self.retry_after = retry_after
+        self.in_flight = 0
+
+    def overload(self) -> str | None:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_pool_wait and self.pool_wait.value() > self.max_pool_wait:
+            return "pool_wait"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        reason = self.overload()
+        if reason is not None:
+            LOAD_SHED.labels(reason).inc()
+            await reject(send, 503, "Service overloaded", self.retry_after)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,101 @@
+"""Быстрая сериализация платежей в ответах (FAST_SERIALIZATION).
+
+Обычный путь FastAPI для response_model: валидация ORM-объекта через
+from_attributes, затем model_dump(mode="json") и json.dumps. Данные
+пришли из нашей же БД, поэтому быстрый путь пропускает валидацию:
+поля берутся прямо из __dict__ объекта и сразу кодируются в bytes.
+JSON на выходе тот же, что у PaymentRead; response_model в роутере
+остаётся для OpenAPI.
+"""
+from typing import Any, Iterable
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic_core import to_json
+
+from app.core.money import format_minor
+from app.models.payment import Payment
+from app.models.refund import PaymentRefund
+from app.schemas.payment import BatchOutcome, PaymentRead, RefundRead
+
+try:
+    import orjson
+except ImportError:  # orjson — опциональная зависимость (extra "fast")
+    orjson = None
+
+PAYMENT_FIELDS = tuple(PaymentRead.model_fields)
+REFUND_FIELDS = tuple(RefundRead.model_fields)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        # OPT_UTC_Z: UTC как "Z", так же как у pydantic; Decimal
+        # (суммы) orjson не знает — строкой, тоже как у pydantic
+        return orjson.dumps(content, default=str, option=orjson.OPT_UTC_Z)
+    return to_json(content)
+
+
+def payment_dict(payment: Payment | PaymentRead) -> dict[str, Any]:
+    """Поля PaymentRead из ORM-объекта или уже готовой модели.
+
+    __dict__ в обход дескрипторов SQLAlchemy; getattr — только если
+    атрибут expired и его нужно догрузить. Суммы ORM-объекта — строкой
+    прямо из минорных единиц, без свойств amount/refunded_total.
+    """
+    state = payment.__dict__
+    if "amount_minor" in state and "refunded_minor" in state:
+        currency = state["currency"]
+        state = {
+            **state,
+            "amount": format_minor(state["amount_minor"], currency),
+            "refunded_total": format_minor(state["refunded_minor"], currency),
+        }
+    return {
+        name: state[name] if name in state else getattr(payment, name)
+        for name in PAYMENT_FIELDS
+    }
+
+
+def payments_list(payments: Iterable[Payment | PaymentRead]) -> list[dict]:
+    return [payment_dict(p) for p in payments]
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_serialization(request: Request) -> bool:
+    return request.app.state.fast_serialization
+
+
+def payment_response(
+    request: Request,
+    payment: Payment | PaymentRead,
+    status_code: int = 200,
+) -> Payment | PaymentRead | Response:
+    """Готовый Response на быстром пути, иначе сам объект для response_model."""
+    if not fast_serialization(request):
+        return payment
+    return FastJSONResponse(payment_dict(payment), status_code=status_code)
+
+
+def batch_result_dict(
+    idempotency_key: str,
+    outcome: BatchOutcome,
+    payment: Payment,
+) -> dict[str, Any]:
+    return {
+        "idempotency_key": idempotency_key,
+        "outcome": outcome.value,
+        "payment": (
+            None if outcome == BatchOutcome.CONFLICT
+            else payment_dict(payment)
+        ),
+    }
+
+
+def refund_dict(refund: PaymentRefund | None) -> dict[str, Any] | None:
+    if refund is None:
+        return None
+    return {name: getattr(refund, name) for name in REFUND_FIELDS}
@@ -0,0 +1,27 @@
+from decimal import Decimal
+
+from fastapi import APIRouter, HTTPException, status
+
+from app.schemas.fx import FxRateTableRead
+from app.services.fx import FxRatesUnavailableError, get_fx_rates
+
+router = APIRouter(prefix="/fx", tags=["fx"])
+
+
+@router.get("/rates", response_model=FxRateTableRead)
+async def fx_rates_endpoint():
+    """Текущая таблица курсов этого воркера."""
+    try:
+        table = get_fx_rates().table()
+    except FxRatesUnavailableError as exc:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    return FxRateTableRead(
+        base=table.base,
+        as_of=table.as_of,
+        version=table.version,
+        rates={
+            code: Decimal(rate.numerator) / rate.denominator
+            for code, rate in sorted(table.rates.items())
+        },
+    )
@@ -1,23 +1,93 @@
 
+from collections import Counter
+
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
     status,
     Header,
+    Query,
+    Request,
     Response,
 )
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from pydantic_core import to_json
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.db import get_db
-from app.schemas.payment import PaymentCreate, PaymentRead
+from app.api.consistency import get_read_db, get_read_session_factory
+from app.api.responses import (
+    FastJSONResponse,
+    batch_result_dict,
+    fast_serialization,
+    payment_dict,
+    payment_response,
+    payments_list,
+    refund_dict,
+)
+from app.core.config import get_settings
+from app.core.money import UnknownCurrencyError, check_currency, from_minor
+from app.db import get_db, get_engine, is_replica, read_session_factory
+from app.schemas.fx import FxInfo
+from app.schemas.payment import (
+    PaymentCreate,
+    PaymentRead,
+    PaymentBatchCreate,
+    PaymentBatchResult,
+    BatchOutcome,
+    PaymentFilters,
+    PaymentPage,
+    PaymentStats,
+    PaymentStatsFilters,
+    PaymentStatsRow,
+    ExportFormat,
+    RefundBatchCreate,
+    RefundBatchResult,
+    RefundCreate,
+    RefundOutcome,
+    RefundRead,
+    TransitionBulkCreate,
+    TransitionBulkResult,
+)
+from app.services.export import (
+    MEDIA_TYPES,
+    converted_columns,
+    export_payments,
+)
+from app.services.fx import (
+    FxRatesUnavailableError,
+    RateTable,
+    UnknownRateError,
+    get_fx_rates,
+)
+from app.services.providers import ProviderUnavailableError
+from app.services.refunds import list_refunds, refund_payment, refund_payments
+from app.services.stats import (
+    InvalidStatsRangeError,
+    convert_stats,
+    get_stats,
+)
+from app.services.transitions import (
+    InvalidCsvError,
+    bulk_transitions,
+    items_from_list,
+    read_csv_items,
+)
 from app.services.payments import (
     create_payment,
-    get_payment,
+    create_payments_batch,
+    get_payment_cached,
     change_status,
+    confirm_payment,
+    watch_payment,
+    list_payments,
     IdempotencyConflictError,
+    InvalidCursorError,
     InvalidStatusTransitionError,
+    PaymentDeclinedError,
 )
 from app.models.payment import PaymentStatus
 
@@ -25,11 +95,38 @@ from app.models.payment import PaymentStatus
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 
+def convert_to_param(
+    convert_to: str | None = Query(None, min_length=3, max_length=3),
+) -> str | None:
+    """Валюта отчёта: код ISO 4217 или 422."""
+    if convert_to is None:
+        return None
+    try:
+        return check_currency(convert_to)
+    except UnknownCurrencyError as exc:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(exc))
+
+
+def rate_table_for(convert_to: str) -> RateTable:
+    """Текущие курсы, в которых есть convert_to; иначе 503 или 400."""
+    try:
+        table = get_fx_rates().table()
+        table.rate(convert_to)
+    except FxRatesUnavailableError as exc:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    except UnknownRateError as exc:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return table
+
+
 @router.post(
     "/", response_model=PaymentRead,
     status_code=status.HTTP_201_CREATED
     )
 async def create_payment_endpoint(
+    request: Request,
     payload: PaymentCreate,
     response: Response,
     db: AsyncSession = Depends(get_db),
@@ -44,47 +141,305 @@ async def create_payment_endpoint(
             detail="Idempotency key reused with different payload",
         )
 
-    if not created:
-        response.status_code = status.HTTP_200_OK
+    status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+    response.status_code = status_code
+    return payment_response(request, payment, status_code)
+
+
+@router.get("/", response_model=PaymentPage)
+async def list_payments_endpoint(
+    request: Request,
+    filters: PaymentFilters = Depends(),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    try:
+        items, next_cursor = await list_payments(filters, limit, cursor, db)
+    except InvalidCursorError:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor")
+
+    if fast_serialization(request):
+        return FastJSONResponse(
+            {"items": payments_list(items), "next_cursor": next_cursor})
+    return PaymentPage(
+        items=[PaymentRead.model_validate(p) for p in items],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/export")
+async def export_payments_endpoint(
+    filters: PaymentFilters = Depends(),
+    fmt: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    convert_to: str | None = Depends(convert_to_param),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(
+        get_read_session_factory),
+):
+    # таблица курсов берётся до начала потока: ошибка — обычным ответом
+    convert = None if convert_to is None else converted_columns(
+        rate_table_for(convert_to), convert_to)
+    return StreamingResponse(
+        export_payments(
+            filters, fmt, session_factory=session_factory, convert=convert),
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="payments.{fmt.value}"'
+        },
+    )
+
+
+# без convert_to ответ — как прежде, без пустых converted_* и fx
+@router.get(
+    "/stats", response_model=PaymentStats, response_model_exclude_none=True)
+async def payment_stats_endpoint(
+    filters: PaymentStatsFilters = Depends(),
+    convert_to: str | None = Depends(convert_to_param),
+    db: AsyncSession = Depends(get_read_db),
+):
+    table = None if convert_to is None else rate_table_for(convert_to)
+    try:
+        items, as_of = await get_stats(
+            filters, get_settings().STATS_MAX_DAYS, db)
+    except InvalidStatsRangeError as exc:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    stats = PaymentStats(
+        items=[PaymentStatsRow.model_validate(row) for row in items],
+        as_of=as_of,
+    )
+    if table is None:
+        return stats
+
+    try:
+        converted = convert_stats(items, table, convert_to)
+    except UnknownRateError as exc:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    for row, minor in zip(stats.items, converted):
+        row.converted_amount = from_minor(minor, convert_to)
+    stats.fx = FxInfo(
+        currency=convert_to, version=table.version, as_of=table.as_of)
+    stats.converted_total = from_minor(sum(converted), convert_to)
+    return stats
+
+
+@router.post("/batch", response_model=list[PaymentBatchResult])
+async def create_payments_batch_endpoint(
+    request: Request,
+    payload: PaymentBatchCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    results = await create_payments_batch(payload.items, db)
+    if fast_serialization(request):
+        return FastJSONResponse([
+            batch_result_dict(item.idempotency_key, outcome, payment)
+            for item, outcome, payment in results
+        ])
+    return [
+        PaymentBatchResult(
+            idempotency_key=item.idempotency_key,
+            outcome=outcome,
+            payment=(
+                None if outcome == BatchOutcome.CONFLICT
+                else PaymentRead.model_validate(payment)
+            ),
+        )
+        for item, outcome, payment in results
+    ]
+
+
+@router.post("/refunds/batch", response_model=list[RefundBatchResult])
+async def refund_payments_batch_endpoint(
+    request: Request,
+    payload: RefundBatchCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    """Возвраты пачкой в одной транзакции; результат на каждый item."""
+    results = await refund_payments(payload.items, db)
+    if fast_serialization(request):
+        return FastJSONResponse([
+            {
+                "payment_id": item.payment_id,
+                "idempotency_key": item.idempotency_key,
+                "outcome": result.outcome.value,
+                "refund": refund_dict(result.refund),
+                "payment": (
+                    None if result.payment is None
+                    else payment_dict(result.payment)
+                ),
+            }
+            for item, result in zip(payload.items, results)
+        ])
+    return [
+        RefundBatchResult(
+            payment_id=item.payment_id,
+            idempotency_key=item.idempotency_key,
+            outcome=result.outcome,
+            refund=(
+                None if result.refund is None
+                else RefundRead.model_validate(result.refund)
+            ),
+            payment=(
+                None if result.payment is None
+                else PaymentRead.model_validate(result.payment)
+            ),
+        )
+        for item, result in zip(payload.items, results)
+    ]
+
 
-    return payment
+@router.post(
+    "/transitions:bulk",
+    response_model=TransitionBulkResult,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {
+            "$ref": "#/components/schemas/TransitionBulkCreate"}},
+        "text/csv": {"schema": {"type": "string"}},
+    }}},
+)
+async def bulk_transitions_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    """Смена статусов по файлу сверки: JSON {"items": [{"id", "status"}]}
+    или CSV (Content-Type: text/csv) с колонками id,status, читаемый
+    потоком. confirmed — без capture у провайдера."""
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        rows = read_csv_items(request.stream())
+    else:
+        try:
+            payload = TransitionBulkCreate.model_validate_json(
+                await request.body())
+        except ValidationError as exc:
+            raise RequestValidationError([
+                {**error, "loc": ("body", *error["loc"])}
+                for error in exc.errors(include_url=False)
+            ])
+        rows = items_from_list(payload.items)
+
+    try:
+        results = await bulk_transitions(
+            rows, db, get_settings().TRANSITIONS_CHUNK_SIZE)
+    except InvalidCsvError as exc:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(exc))
+    return TransitionBulkResult(
+        results=results,
+        counts=Counter(result.outcome for result in results),
+    )
 
 
 @router.get("/{payment_id}", response_model=PaymentRead)
 async def get_payment_endpoint(
+    request: Request,
     payment_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    payment = await get_payment(payment_id, db)
+    payment = await get_payment_cached(payment_id, db)
+    if payment is None and is_replica(db):
+        # платёж мог быть создан другим клиентом и ещё не доехать до реплики
+        async with read_session_factory(primary=True)() as primary:
+            payment = await get_payment_cached(payment_id, primary)
     if not payment:
         raise HTTPException(
             status.HTTP_404_NOT_FOUND,
             detail="Payment not found")
-    return payment
+    return payment_response(request, payment)
+
+
+@router.get(
+    "/{payment_id}/events",
+    response_model=PaymentRead,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def payment_events_endpoint(
+    request: Request,
+    payment_id: int,
+    wait: float | None = Query(None, ge=0),
+    known: PaymentStatus | None = Query(None, alias="status"),
+):
+    """Изменения статуса платежа.
+
+    Без wait — Server-Sent Events: текущий снимок, затем каждый новый
+    статус; поток закрывается на терминальном статусе. С wait — long-poll:
+    платёж, как только его статус отличается от status (без status —
+    сразу), иначе по истечении wait секунд (не больше
+    EVENTS_MAX_WAIT_SECONDS) — текущий снимок.
+    """
+    settings = get_settings()
+    if wait is not None:
+        wait = min(wait, settings.EVENTS_MAX_WAIT_SECONDS)
+    updates = watch_payment(
+        payment_id,
+        get_engine()[1],
+        settings.EVENTS_KEEPALIVE_SECONDS if wait is None else wait,
+    )
+    current = await anext(updates, None)
+    if current is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            detail="Payment not found")
+
+    if wait is not None:
+        try:
+            if current.status == known:
+                current = await anext(updates, None) or current
+        finally:
+            await updates.aclose()
+        return payment_response(request, current)
+
+    async def stream():
+        try:
+            yield b"event: status\ndata: " + to_json(current) + b"\n\n"
+            async for update in updates:
+                if update is None:
+                    yield b": keepalive\n\n"
+                else:
+                    yield b"event: status\ndata: " + to_json(update) + b"\n\n"
+        finally:
+            await updates.aclose()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/{payment_id}/confirm", response_model=PaymentRead)
 async def confirm_payment_endpoint(
+    request: Request,
     payment_id: int,
     db: AsyncSession = Depends(get_db),
 ):
     try:
-        payment = await change_status(payment_id, PaymentStatus.CONFIRMED, db)
+        payment = await confirm_payment(payment_id, db)
     except InvalidStatusTransitionError:
         raise HTTPException(
             status.HTTP_409_CONFLICT,
             detail="Invalid status transition")
+    except PaymentDeclinedError:
+        raise HTTPException(
+            status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Payment declined by provider")
+    except ProviderUnavailableError:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment provider unavailable",
+            headers={"Retry-After": "1"})
 
     if not payment:
         raise HTTPException(
             status.HTTP_404_NOT_FOUND,
             detail="Payment not found")
 
-    return payment
+    return payment_response(request, payment)
 
 
 @router.post("/{payment_id}/fail", response_model=PaymentRead)
 async def fail_payment_endpoint(
+    request: Request,
     payment_id: int,
     db: AsyncSession = Depends(get_db),
 ):
@@ -100,24 +455,57 @@ async def fail_payment_endpoint(
             status.HTTP_404_NOT_FOUND,
             detail="Payment not found")
 
-    return payment
+    return payment_response(request, payment)
 
 
 @router.post("/{payment_id}/refund", response_model=PaymentRead)
 async def refund_payment_endpoint(
+    request: Request,
     payment_id: int,
+    payload: RefundCreate | None = None,
     db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(
+        None, alias="Idempotency-Key", max_length=64),
 ):
-    try:
-        payment = await change_status(payment_id, PaymentStatus.REFUNDED, db)
-    except InvalidStatusTransitionError:
+    """Возврат amount (без тела — всего остатка)."""
+    result = await refund_payment(
+        payment_id,
+        None if payload is None else payload.amount,
+        idempotency_key,
+        db,
+    )
+    if result.outcome == RefundOutcome.NOT_FOUND:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            detail="Payment not found")
+    if result.outcome == RefundOutcome.INVALID_STATUS:
         raise HTTPException(
             status.HTTP_409_CONFLICT,
             detail="Invalid status transition")
+    if result.outcome == RefundOutcome.EXCEEDS_BALANCE:
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            detail="Refund exceeds the refundable amount")
+    if result.outcome == RefundOutcome.INVALID_AMOUNT:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="Amount has more decimals than the currency allows")
+    if result.outcome == RefundOutcome.CONFLICT:
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            detail="Idempotency key reused with different payload")
 
-    if not payment:
+    return payment_response(request, result.payment)
+
+
+@router.get("/{payment_id}/refunds", response_model=list[RefundRead])
+async def list_refunds_endpoint(
+    payment_id: int,
+    db: AsyncSession = Depends(get_read_db),
+):
+    refunds = await list_refunds(payment_id, db)
+    if not refunds and await get_payment_cached(payment_id, db) is None:
         raise HTTPException(
             status.HTTP_404_NOT_FOUND,
             detail="Payment not found")
-
-    return payment
+    return refunds
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_db
+from app.models.webhook import WebhookEndpoint
+from app.schemas.webhook import (
+    WebhookEndpointCreate,
+    WebhookEndpointCreated,
+    WebhookEndpointRead,
+)
+from app.services.webhooks import new_secret
+
+
+router = APIRouter(prefix="/webhooks/endpoints", tags=["webhooks"])
+
+
+@router.post(
+    "/", response_model=WebhookEndpointCreated,
+    status_code=status.HTTP_201_CREATED
+    )
+async def create_webhook_endpoint(
+    payload: WebhookEndpointCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    endpoint = WebhookEndpoint(
+        url=str(payload.url),
+        secret=new_secret(),
+        event_types=payload.event_types,
+    )
+    db.add(endpoint)
+    await db.commit()
+    return endpoint
+
+
+@router.get("/", response_model=list[WebhookEndpointRead])
+async def list_webhook_endpoints(db: AsyncSession = Depends(get_db)):
+    result = await db.scalars(
+        select(WebhookEndpoint)
+        .where(WebhookEndpoint.is_active)
+        .order_by(WebhookEndpoint.id)
+    )
+    return result.all()
+
+
+@router.delete("/{endpoint_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_webhook_endpoint(
+    endpoint_id: int,
+    db: AsyncSession = Depends(get_db),
+):
+    endpoint = await db.get(WebhookEndpoint, endpoint_id)
+    if endpoint is None or not endpoint.is_active:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            detail="Webhook endpoint not found")
+
+    endpoint.is_active = False
+    await db.commit()
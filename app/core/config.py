@@ -11,6 +11,17 @@ class Settings(BaseSettings):
 
     PROJECT_NAME: str = "Payment Service API"
     API_V1_PREFIX: str = "/api/v1"
+    METRICS_ENABLED: bool = True
+    # Ответы с платежами в обход валидации response_model (app/api/responses.py)
+    FAST_SERIALIZATION: bool = False
+
+    # Сервер (python -m app.server); WEB_CONCURRENCY=0 — по числу CPU
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int = 0
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    SERVER_ACCESS_LOG: bool = False
 
     DB_HOST: str = "localhost"
     DB_PORT: int = 5432
@@ -18,13 +29,153 @@ class Settings(BaseSettings):
     DB_PASS: str = "payment_pass"
     DB_NAME: str = "payment_db"
 
-    @property
-    def database_url(self) -> str:
+    # Пул соединений SQLAlchemy
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # Сколько соединений открыть при старте воркера (lifespan)
+    DB_POOL_WARMUP: int = 4
+    # За PgBouncer (transaction pooling) пулом управляет он: NullPool
+    # и DB_STATEMENT_CACHE_SIZE=0.
+    DB_USE_NULL_POOL: bool = False
+
+    # Реплики для чтения: "host[:port],host[:port]", учётные данные и БД
+    # те же, что у primary. Политика: round_robin | random | least_busy.
+    DB_REPLICA_HOSTS: str = ""
+    DB_REPLICA_POLICY: str = "round_robin"
+    # Сколько секунд после записи клиент читает с primary (read-your-writes)
+    DB_REPLICA_STICKINESS_SECONDS: float = 5.0
+
+    # asyncpg
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_APPLICATION_NAME: str = "payment-service"
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Кэш GET /payments/{id}: "none" | "memory" | "redis"
+    CACHE_BACKEND: str = "none"
+    CACHE_TTL_SECONDS: float = 5.0
+    CACHE_MAX_ENTRIES: int = 10_000
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Ограничение частоты (app/api/limits.py): token bucket на клиента
+    # (заголовок RATE_LIMIT_CLIENT_HEADER, без него — IP) и маршрут.
+    # RATE_LIMIT_ROUTES — "METHOD /path=rate/burst" через запятую;
+    # маршруты без записи получают RATE_LIMIT_RATE (0 — без ограничения).
+    # Backend: "memory" (на воркер) | "redis" (общий, REDIS_URL).
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_RATE: float = 0.0
+    RATE_LIMIT_BURST: int = 1
+    RATE_LIMIT_ROUTES: str = ""
+    RATE_LIMIT_CLIENT_HEADER: str = "X-API-Key"
+    RATE_LIMIT_MAX_CLIENTS: int = 100_000
+
+    # Сброс нагрузки: 503, если в воркере больше LOAD_SHED_MAX_IN_FLIGHT
+    # запросов API или ожидание соединения пула дольше
+    # LOAD_SHED_POOL_WAIT_SECONDS; 0 — порог выключен
+    LOAD_SHED_MAX_IN_FLIGHT: int = 0
+    LOAD_SHED_POOL_WAIT_SECONDS: float = 0.0
+
+    # Подписка на статус (GET /payments/{id}/events): UPDATE статуса
+    # шлёт NOTIFY, воркер слушает канал одним соединением вне пула.
+    # false — только подписчики того же воркера.
+    PAYMENT_NOTIFY_ENABLED: bool = True
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    EVENTS_MAX_WAIT_SECONDS: int = 60
+
+    # Ключи идемпотентности: сколько помнить ответ, размер горячего слоя
+    # в памяти воркера (0 — выключен) и очистка истёкших ключей
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_HOT_MAX_ENTRIES: int = 10_000
+    IDEMPOTENCY_PURGE_BATCH_SIZE: int = 1000
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = 60.0
+
+    # Истечение PENDING (app/services/expiry.py): платежи старше
+    # PAYMENT_PENDING_TTL_SECONDS переводятся в FAILED пачками по
+    # EXPIRY_BATCH_SIZE. Свипер работает в lifespan каждого воркера
+    # (EXPIRY_SWEEPER_ENABLED) или отдельно: python -m app.workers.expiry_sweeper
+    PAYMENT_PENDING_TTL_SECONDS: int = 86400
+    EXPIRY_SWEEPER_ENABLED: bool = False
+    EXPIRY_BATCH_SIZE: int = 500
+    EXPIRY_INTERVAL_SECONDS: float = 60.0
+
+    # Платёжные провайдеры (app/services/providers.py): confirm списывает
+    # средства у провайдера платежа. PROVIDER_LIMITS — "name=concurrency/
+    # timeout" через запятую; остальные провайдеры получают
+    # PROVIDER_MAX_CONCURRENCY и PROVIDER_TIMEOUT_SECONDS. FAKE_PROVIDER_* —
+    # поведение встроенного провайдера "fake".
+    PROVIDER_MAX_CONCURRENCY: int = 50
+    PROVIDER_TIMEOUT_SECONDS: float = 10.0
+    PROVIDER_LIMITS: str = ""
+    FAKE_PROVIDER_LATENCY_SECONDS: float = 0.0
+    FAKE_PROVIDER_JITTER_SECONDS: float = 0.0
+    FAKE_PROVIDER_FAILURE_RATE: float = 0.0
+    FAKE_PROVIDER_DECLINE_RATE: float = 0.0
+    FAKE_PROVIDER_SEED: str = "fake"
+
+    # Массовая смена статусов (POST /payments/transitions:bulk): строки
+    # применяются пачками по TRANSITIONS_CHUNK_SIZE, пачка — транзакция.
+    TRANSITIONS_CHUNK_SIZE: int = 1000
+
+    # Дневные итоги (GET /payments/stats, app/services/stats.py): раз в
+    # STATS_REFRESH_INTERVAL_SECONDS пересчитываются дни, где платежи
+    # менялись с прошлого раза. Пересчёт — в lifespan (STATS_REFRESH_ENABLED)
+    # или отдельно: python -m app.workers.stats. OVERLAP — запас на
+    # транзакции записи, закоммиченные после начала пересчёта.
+    STATS_REFRESH_ENABLED: bool = False
+    STATS_REFRESH_INTERVAL_SECONDS: float = 60.0
+    STATS_WATERMARK_OVERLAP_SECONDS: float = 60.0
+    STATS_MAX_DAYS: int = 366
+
+    # Курсы валют для отчётов (app/services/fx.py): JSON-файл или URL
+    # ленты; пусто — пересчёт (convert_to) недоступен. Каждый воркер
+    # перечитывает источник раз в FX_REFRESH_INTERVAL_SECONDS.
+    FX_RATES_SOURCE: str = ""
+    FX_REFRESH_INTERVAL_SECONDS: float = 3600.0
+
+    # Секции payments (python -m app.workers.partitions): сколько месяцев
+    # создавать наперёд и сколько хранить в payments (0 — всё). Старые
+    # секции уходят в PARTITION_ARCHIVE_SCHEMA или удаляются (--drop).
+    PARTITION_AHEAD_MONTHS: int = 3
+    PARTITION_RETAIN_MONTHS: int = 0
+    PARTITION_ARCHIVE_SCHEMA: str = "archive"
+
+    # Outbox relay
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+
+    # Доставка вебхуков
+    WEBHOOK_CONCURRENCY: int = 32
+    WEBHOOK_TIMEOUT_SECONDS: float = 5.0
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_BACKOFF_BASE_SECONDS: float = 1.0
+    WEBHOOK_BACKOFF_MAX_SECONDS: float = 300.0
+    WEBHOOK_MAX_IN_FLIGHT_PER_ENDPOINT: int = 4
+    WEBHOOK_BREAKER_THRESHOLD: int = 5
+    WEBHOOK_BREAKER_RESET_SECONDS: float = 30.0
+
+    def _url(self, host: str, port: int) -> str:
         return (
             f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}"
-            f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+            f"@{host}:{port}/{self.DB_NAME}"
         )
 
+    @property
+    def database_url(self) -> str:
+        return self._url(self.DB_HOST, self.DB_PORT)
+
+    @property
+    def replica_urls(self) -> list[str]:
+        urls = []
+        for item in self.DB_REPLICA_HOSTS.split(","):
+            if not item.strip():
+                continue
+            host, _, port = item.strip().partition(":")
+            urls.append(self._url(host, int(port) if port else self.DB_PORT))
+        return urls
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -0,0 +1,244 @@
+import functools
+import itertools
+import time
+from typing import Awaitable, Callable, ParamSpec, TypeVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Бакеты под латентность API/БД: от 0.5 мс до 10 с
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_OPERATION_DURATION = Histogram(
+    "db_operation_duration_seconds",
+    "Latency of service-layer database operations",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=LATENCY_BUCKETS,
+)
+IDEMPOTENCY_REPLAYS = Counter(
+    "payment_idempotency_replays_total",
+    "Create requests answered with an existing payment",
+)
+IDEMPOTENCY_CONFLICTS = Counter(
+    "payment_idempotency_conflicts_total",
+    "Idempotency keys reused with a different payload",
+)
+PAYMENTS_EXPIRED = Counter(
+    "payment_expired_total",
+    "Stale pending payments moved to failed by the expiry sweeper",
+)
+RATE_LIMITED = Counter(
+    "http_requests_rate_limited_total",
+    "Requests rejected with 429 by the per-client rate limiter",
+    ["route"],
+)
+LOAD_SHED = Counter(
+    "http_requests_shed_total",
+    "Requests rejected with 503 by load shedding",
+    ["reason"],
+)
+PROVIDER_CALLS = Counter(
+    "payment_provider_calls_total",
+    "Payment provider calls by outcome (captured, declined, ok, timeout, error)",
+    ["provider", "method", "outcome"],
+)
+PROVIDER_CALL_DURATION = Histogram(
+    "payment_provider_call_duration_seconds",
+    "Latency of completed payment provider calls, including the wait for a slot",
+    ["provider", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+INVALID_TRANSITIONS = Counter(
+    "payment_invalid_transitions_total",
+    "Rejected status transitions by target status",
+    ["target"],
+)
+BULK_TRANSITIONS = Counter(
+    "payment_bulk_transition_rows_total",
+    "Rows processed by bulk status transitions by outcome",
+    ["outcome"],
+)
+
+
+def timed(operation: str):
+    """Декоратор: латентность async-функции сервиса в db_operation_duration."""
+    histogram = DB_OPERATION_DURATION.labels(operation)
+
+    def decorator(
+        func: Callable[P, Awaitable[R]],
+    ) -> Callable[P, Awaitable[R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class PoolWaitTracker:
+    """Недавнее ожидание соединения пула — сигнал для сброса нагрузки.
+
+    value() — скользящее среднее завершённых ожиданий, затухающее вдвое
+    за half_life секунд без новых замеров, но не меньше, чем уже ждёт
+    самый давний из текущих checkout: зависший пул виден сразу, а не
+    через DB_POOL_TIMEOUT.
+    """
+
+    def __init__(
+        self,
+        half_life: float = 1.0,
+        alpha: float = 0.2,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.half_life = half_life
+        self.alpha = alpha
+        self._clock = clock
+        self._average = 0.0
+        self._updated = clock()
+        self._waiting: dict[int, float] = {}
+        self._tokens = itertools.count()
+
+    def _decayed(self, now: float) -> float:
+        return self._average * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def start(self) -> int:
+        token = next(self._tokens)
+        self._waiting[token] = self._clock()
+        return token
+
+    def finish(self, token: int) -> float:
+        """Закончить ожидание token; вернуть его длительность."""
+        now = self._clock()
+        waited = now - self._waiting.pop(token)
+        average = self._decayed(now)
+        self._average = average + self.alpha * (waited - average)
+        self._updated = now
+        return waited
+
+    def value(self) -> float:
+        now = self._clock()
+        # словарь хранит порядок вставки: первый — самый давний
+        oldest = next(iter(self._waiting.values()), now)
+        return max(self._decayed(now), now - oldest)
+
+
+POOL_WAIT = PoolWaitTracker()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий ожидание свободного соединения при checkout."""
+
+    def _do_get(self):
+        token = POOL_WAIT.start()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(POOL_WAIT.finish(token))
+
+
+class PoolCollector(Collector):
+    """Размер и занятость пулов всех engine процесса на момент scrape."""
+
+    GAUGES = (
+        ("size", "Configured persistent pool size"),
+        ("checked_out", "Connections currently in use"),
+        ("checked_in", "Idle connections in the pool"),
+        ("overflow", "Connections opened above pool size"),
+    )
+
+    def _families(self) -> dict[str, GaugeMetricFamily]:
+        return {
+            name: GaugeMetricFamily(
+                f"db_pool_{name}", help_text, labels=["engine"])
+            for name, help_text in self.GAUGES
+        }
+
+    def describe(self):
+        # без describe registry вызовет collect при регистрации,
+        # то есть во время импорта app.db
+        return list(self._families().values())
+
+    def collect(self):
+        from app.db import all_engines
+
+        gauges = self._families()
+        for role, engine in all_engines():
+            pool = engine.sync_engine.pool
+            if not isinstance(pool, AsyncAdaptedQueuePool):
+                continue
+            label = [role]
+            gauges["size"].add_metric(label, pool.size())
+            gauges["checked_out"].add_metric(label, pool.checkedout())
+            gauges["checked_in"].add_metric(label, pool.checkedin())
+            gauges["overflow"].add_metric(label, max(0, pool.overflow()))
+        yield from gauges.values()
+
+
+REGISTRY.register(PoolCollector())
+
+
+class MetricsMiddleware:
+    """ASGI middleware: гистограмма запросов по шаблону маршрута и статусу.
+
+    Метка route — шаблон ("/api/v1/payments/{payment_id}"), а не сырой
+    путь, чтобы число временных рядов не росло с числом платежей.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status_code),
+            ).observe(time.perf_counter() - started)
+
+
+def render_latest() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,80 @@
+"""Денежные суммы в минорных единицах валюты.
+
+В БД и в расчётах сумма — целое число минорных единиц (центов, иен,
+филсов): сравнение и сумма точные, без float. Decimal — только на
+границе API: во входе (строка или число) и в ответе (строка "10.50").
+Число знаков после запятой — экспонента валюты по ISO 4217
+(реестр CURRENCIES).
+"""
+from decimal import Decimal
+
+DEFAULT_EXPONENT = 2
+
+# Реестр валют ISO 4217 (действующие коды, без металлов и X-кодов
+# расчётных единиц) -> экспонента
+CURRENCIES: dict[str, int] = {
+    **dict.fromkeys((
+        "AED", "AFN", "ALL", "AMD", "ANG", "AOA", "ARS", "AUD", "AWG",
+        "AZN", "BAM", "BBD", "BDT", "BGN", "BMD", "BND", "BOB", "BOV",
+        "BRL", "BSD", "BTN", "BWP", "BYN", "BZD", "CAD", "CDF", "CHE",
+        "CHF", "CHW", "CNY", "COP", "COU", "CRC", "CUP", "CVE", "CZK",
+        "DKK", "DOP", "DZD", "EGP", "ERN", "ETB", "EUR", "FJD", "FKP",
+        "GBP", "GEL", "GHS", "GIP", "GMD", "GTQ", "GYD", "HKD", "HNL",
+        "HTG", "HUF", "IDR", "ILS", "INR", "IRR", "JMD", "KES", "KGS",
+        "KHR", "KPW", "KYD", "KZT", "LAK", "LBP", "LKR", "LRD", "LSL",
+        "MAD", "MDL", "MGA", "MKD", "MMK", "MNT", "MOP", "MRU", "MUR",
+        "MVR", "MWK", "MXN", "MXV", "MYR", "MZN", "NAD", "NGN", "NIO",
+        "NOK", "NPR", "NZD", "PAB", "PEN", "PGK", "PHP", "PKR", "PLN",
+        "QAR", "RON", "RSD", "RUB", "SAR", "SBD", "SCR", "SDG", "SEK",
+        "SGD", "SHP", "SLE", "SOS", "SRD", "SSP", "STN", "SVC", "SYP",
+        "SZL", "THB", "TJS", "TMT", "TOP", "TRY", "TTD", "TWD", "TZS",
+        "UAH", "USD", "USN", "UYU", "UZS", "VED", "VES", "WST", "XCD",
+        "XCG", "YER", "ZAR", "ZMW", "ZWG",
+    ), 2),
+    **dict.fromkeys((
+        "BIF", "CLP", "DJF", "GNF", "ISK", "JPY", "KMF", "KRW", "PYG",
+        "RWF", "UGX", "UYI", "VND", "VUV", "XAF", "XOF", "XPF",
+    ), 0),
+    **dict.fromkeys(
+        ("BHD", "IQD", "JOD", "KWD", "LYD", "OMR", "TND"), 3),
+    **dict.fromkeys(("CLF", "UYW"), 4),
+}
+
+
+class UnknownCurrencyError(ValueError):
+    pass
+
+
+class InvalidAmountError(ValueError):
+    """Сумма точнее, чем позволяет экспонента валюты."""
+
+
+def check_currency(code: str) -> str:
+    """Код из реестра (регистр не важен); иначе UnknownCurrencyError."""
+    code = code.upper()
+    if code not in CURRENCIES:
+        raise UnknownCurrencyError(f"unknown currency {code!r}")
+    return code
+
+
+def exponent(currency: str) -> int:
+    # DEFAULT_EXPONENT — для строк, записанных до проверки по реестру
+    return CURRENCIES.get(currency, DEFAULT_EXPONENT)
+
+
+def to_minor(amount: Decimal, currency: str) -> int:
+    """Decimal("10.5"), "USD" -> 1050; лишние знаки — InvalidAmountError."""
+    minor = amount.scaleb(exponent(currency))
+    if minor != minor.to_integral_value():
+        raise InvalidAmountError(
+            f"{currency} amounts allow at most {exponent(currency)} decimals")
+    return int(minor)
+
+
+def from_minor(minor: int, currency: str) -> Decimal:
+    """1050, "USD" -> Decimal("10.50"): знаков ровно по экспоненте."""
+    return Decimal(minor).scaleb(-exponent(currency))
+
+
+def format_minor(minor: int, currency: str) -> str:
+    return str(from_minor(minor, currency))
@@ -1,15 +1,19 @@
 import asyncio
+import random
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
     AsyncSession,
     AsyncEngine,
 )
-from typing import AsyncGenerator, Dict, Tuple
+from typing import Any, AsyncGenerator, Callable, Dict, Sequence, Tuple
 
+from sqlalchemy import Executable, text
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import NullPool
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.core.metrics import InstrumentedAsyncPool
 
 
 class Base(DeclarativeBase):
@@ -17,6 +21,99 @@ class Base(DeclarativeBase):
 
 
 _engines: Dict[int, Tuple[AsyncEngine, async_sessionmaker[AsyncSession]]] = {}
+_replicas: Dict[int, "ReplicaSet | None"] = {}
+
+REPLICA_POLICIES = ("round_robin", "random", "least_busy")
+
+
+def engine_options(settings: Settings) -> dict[str, Any]:
+    """Аргументы create_async_engine из настроек пула и asyncpg."""
+    server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        server_settings["statement_timeout"] = str(
+            settings.DB_STATEMENT_TIMEOUT_MS)
+
+    options: dict[str, Any] = {
+        "echo": False,
+        "connect_args": {
+            "server_settings": server_settings,
+            # кэш prepared statements самого asyncpg и адаптера SQLAlchemy
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    }
+
+    if settings.DB_USE_NULL_POOL:
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=InstrumentedAsyncPool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    return options
+
+
+def build_engine(
+    settings: Settings,
+    url: str | None = None,
+    replica: bool = False,
+) -> Tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
+    engine = create_async_engine(
+        url or settings.database_url, **engine_options(settings))
+    session_factory = async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        info={"replica": replica},
+    )
+    return engine, session_factory
+
+
+def _checked_out(engine: AsyncEngine) -> int:
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+class ReplicaSet:
+    """Реплики текущего loop и выбор между ними.
+
+    round_robin — по кругу; random — случайно; least_busy — реплика
+    с наименьшим числом занятых соединений пула (при равенстве — по кругу).
+    """
+
+    def __init__(
+        self,
+        members: list[Tuple[AsyncEngine, async_sessionmaker[AsyncSession]]],
+        policy: str = "round_robin",
+        rng: Callable[[], float] = random.random,
+    ):
+        if policy not in REPLICA_POLICIES:
+            raise ValueError(f"Unknown DB_REPLICA_POLICY: {policy!r}")
+        self.members = members
+        self.policy = policy
+        self._rng = rng
+        self._next = 0
+
+    @property
+    def engines(self) -> list[AsyncEngine]:
+        return [engine for engine, _ in self.members]
+
+    def choose(self) -> async_sessionmaker[AsyncSession]:
+        size = len(self.members)
+        if self.policy == "random":
+            index = min(int(self._rng() * size), size - 1)
+        else:
+            index = self._next
+            if self.policy == "least_busy":
+                order = [(self._next + i) % size for i in range(size)]
+                index = min(
+                    order, key=lambda i: _checked_out(self.members[i][0]))
+            self._next = (index + 1) % size
+        return self.members[index][1]
 
 
 def get_engine() -> Tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
@@ -24,22 +121,77 @@ def get_engine() -> Tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
     key = id(loop)
 
     if key not in _engines:
-        settings = get_settings()
-        engine = create_async_engine(
-            settings.database_url,
-            echo=False,
-            pool_pre_ping=True,
-        )
-        session_factory = async_sessionmaker(
-            bind=engine,
-            class_=AsyncSession,
-            expire_on_commit=False,
-        )
-        _engines[key] = (engine, session_factory)
+        _engines[key] = build_engine(get_settings())
 
     return _engines[key]
 
 
+def get_replicas() -> ReplicaSet | None:
+    """Реплики для текущего loop; None, если DB_REPLICA_HOSTS пуст."""
+    key = id(asyncio.get_running_loop())
+    if key not in _replicas:
+        settings = get_settings()
+        urls = settings.replica_urls
+        _replicas[key] = ReplicaSet(
+            [build_engine(settings, url, replica=True) for url in urls],
+            settings.DB_REPLICA_POLICY,
+        ) if urls else None
+    return _replicas[key]
+
+
+def read_session_factory(
+    primary: bool = False,
+) -> async_sessionmaker[AsyncSession]:
+    """Фабрика сессий для чтения: реплика по политике или primary."""
+    replicas = None if primary else get_replicas()
+    if replicas is None:
+        return get_engine()[1]
+    return replicas.choose()
+
+
+def is_replica(session: AsyncSession) -> bool:
+    return session.info.get("replica", False)
+
+
+def all_engines() -> list[Tuple[str, AsyncEngine]]:
+    """(роль, engine) по всем loop процесса — для метрик пула."""
+    engines = [("primary", engine) for engine, _ in list(_engines.values())]
+    for replicas in list(_replicas.values()):
+        if replicas is not None:
+            engines += [
+                (f"replica{index}", engine)
+                for index, engine in enumerate(replicas.engines)
+            ]
+    return engines
+
+
+async def warm_up_engine(
+    connections: int,
+    statements: Sequence[Executable] = (),
+) -> None:
+    """Заранее открыть connections соединений пула текущего loop.
+
+    Соединения открываются параллельно, иначе пул раз за разом отдавал бы
+    одно и то же. На каждом выполняются statements: asyncpg при первом
+    запросе на соединении готовит statement и разбирает пользовательские
+    типы (enum статуса) — это ~10 мс, которые иначе достались бы клиенту.
+    """
+    engine, _ = get_engine()
+    if connections <= 0 or isinstance(engine.pool, NullPool):
+        return
+    replicas = get_replicas()
+    engines = [engine, *(replicas.engines if replicas else [])]
+
+    async def touch(engine: AsyncEngine) -> None:
+        async with engine.connect() as conn:
+            for statement in statements or [text("SELECT 1")]:
+                await conn.execute(statement)
+
+    await asyncio.gather(*(
+        touch(engine) for engine in engines for _ in range(connections)
+    ))
+
+
 async def dispose_engine() -> None:
     """Аккуратно закрыть engine именно для текущего loop."""
     loop = asyncio.get_running_loop()
@@ -48,6 +200,10 @@ async def dispose_engine() -> None:
     if pair:
         engine, _ = pair
         await engine.dispose()
+    replicas = _replicas.pop(key, None)
+    if replicas:
+        for engine in replicas.engines:
+            await engine.dispose()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -1,16 +1,118 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator
+
 from fastapi import FastAPI
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import configure_mappers
+
+from app.api.consistency import PrimaryStickinessMiddleware
+from app.api.limits import (
+    Limit,
+    LoadSheddingMiddleware,
+    RateLimitMiddleware,
+    build_rate_limit_backend,
+    parse_route_limits,
+)
+from app.core.config import Settings, get_settings
+from app.core.metrics import MetricsMiddleware
+from app.api.routers import payments, fx, health, metrics, webhooks
+from app.db import dispose_engine, get_engine, warm_up_engine
+from app.services.expiry import run_sweeper
+from app.services.fx import get_fx_rates, run_fx_refresh
+from app.services.notifications import get_payment_hub
+from app.services.payments import warm_up_statements
+from app.services.stats import run_stats_refresh
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Старт воркера: engine и пул создаются в его loop до первого запроса.
+
+    Остановка: сервер сначала дожидается текущих запросов
+    (SERVER_GRACEFUL_TIMEOUT_SECONDS), затем останавливаются фоновые
+    задачи и LISTEN уведомлений и закрывается engine.
+    """
+    settings: Settings = app.state.settings
+    configure_mappers()
+    try:
+        await warm_up_engine(
+            settings.DB_POOL_WARMUP, warm_up_statements())
+    except (OSError, SQLAlchemyError):
+        # БД недоступна — стартуем, соединения откроются по первому запросу
+        logger.warning("database warm-up failed", exc_info=True)
 
-from app.core.config import get_settings
-from app.api.routers import payments, health
+    stop = asyncio.Event()
+    background = []
+    if settings.EXPIRY_SWEEPER_ENABLED:
+        # в каждом воркере: SKIP LOCKED не даёт им делать одну работу дважды
+        background.append(asyncio.create_task(run_sweeper(
+            get_engine()[1],
+            timedelta(seconds=settings.PAYMENT_PENDING_TTL_SECONDS),
+            settings.EXPIRY_BATCH_SIZE,
+            settings.EXPIRY_INTERVAL_SECONDS,
+            stop,
+        )))
+    if settings.STATS_REFRESH_ENABLED:
+        # тоже в каждом: пересчёт идёт в том воркере, что взял водяной знак
+        background.append(asyncio.create_task(run_stats_refresh(
+            get_engine()[1],
+            timedelta(seconds=settings.STATS_WATERMARK_OVERLAP_SECONDS),
+            settings.STATS_REFRESH_INTERVAL_SECONDS,
+            stop,
+        )))
+    if settings.FX_RATES_SOURCE:
+        # первая загрузка — тоже в задаче: недоступная лента не держит старт
+        background.append(asyncio.create_task(run_fx_refresh(
+            get_fx_rates(), settings.FX_REFRESH_INTERVAL_SECONDS, stop)))
+    yield
+    stop.set()
+    for task in background:
+        await task
+    await get_payment_hub().close()
+    await dispose_engine()
 
-settings = get_settings()
 
+def get_app(settings: Settings | None = None) -> FastAPI:
+    settings = settings or get_settings()
+    app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
+    app.state.settings = settings
+    app.state.fast_serialization = settings.FAST_SERIALIZATION
 
-def get_app() -> FastAPI:
-    app = FastAPI(title=settings.PROJECT_NAME)
+    if settings.replica_urls:
+        app.add_middleware(
+            PrimaryStickinessMiddleware,
+            window=settings.DB_REPLICA_STICKINESS_SECONDS,
+        )
+    if settings.RATE_LIMIT_ENABLED:
+        app.add_middleware(
+            RateLimitMiddleware,
+            backend=build_rate_limit_backend(settings),
+            default=Limit(settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST),
+            routes=parse_route_limits(settings.RATE_LIMIT_ROUTES),
+            prefix=settings.API_V1_PREFIX,
+            client_header=settings.RATE_LIMIT_CLIENT_HEADER,
+        )
+    # снаружи лимитера: перегруженный воркер не ходит даже в его backend
+    if settings.LOAD_SHED_MAX_IN_FLIGHT or settings.LOAD_SHED_POOL_WAIT_SECONDS:
+        app.add_middleware(
+            LoadSheddingMiddleware,
+            max_in_flight=settings.LOAD_SHED_MAX_IN_FLIGHT,
+            max_pool_wait=settings.LOAD_SHED_POOL_WAIT_SECONDS,
+            prefix=settings.API_V1_PREFIX,
+        )
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics.router)
 
     app.include_router(health.router)
     app.include_router(payments.router, prefix=settings.API_V1_PREFIX)
+    app.include_router(webhooks.router, prefix=settings.API_V1_PREFIX)
+    app.include_router(fx.router, prefix=settings.API_V1_PREFIX)
 
     return app
 
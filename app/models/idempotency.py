@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import BigInteger, DateTime, Index, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class IdempotencyKey(Base):
+    """Ключ идемпотентности -> платёж.
+
+    Держит глобальную уникальность ключа поверх секций payments и даёт
+    created_at платежа по id, чтобы поиск по id попадал в одну секцию.
+    Повтор запроса отвечается по fingerprint и response без чтения
+    payments. После expires_at очистка (app/services/idempotency.py)
+    освобождает ключ; строка остаётся ради created_at.
+    """
+
+    __tablename__ = "payment_idempotency_keys"
+    __table_args__ = (
+        Index(
+            "ix_payment_idempotency_keys_expires_at", "expires_at",
+            postgresql_where="expires_at IS NOT NULL",
+        ),
+    )
+
+    payment_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False)
+    idempotency_key: Mapped[str | None] = mapped_column(
+        String(64), unique=True)
+    # sha256 канонического payload запроса (hex)
+    fingerprint: Mapped[str | None] = mapped_column(String(64))
+    # PaymentRead на момент создания — тело ответа на повтор
+    response: Mapped[dict[str, Any] | None] = mapped_column(JSONB)
+    expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True))
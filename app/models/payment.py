@@ -1,9 +1,18 @@
 import enum
 from datetime import datetime
+from decimal import Decimal
 
-from sqlalchemy import String, Enum, Numeric, DateTime, BigInteger
+from sqlalchemy import (
+    String,
+    Enum,
+    DateTime,
+    BigInteger,
+    Index,
+    Sequence,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
+from app.core.money import from_minor
 from app.db import Base
 
 
@@ -14,32 +23,74 @@ class PaymentStatus(str, enum.Enum):
     REFUNDED = "refunded"
 
 
+PAYMENT_ID_SEQ = Sequence("payments_id_seq")
+
+
 class Payment(Base):
+    """Платёж. Таблица секционирована по месяцам created_at
+    (app/services/partitions.py), поэтому первичный ключ в БД — (id,
+    created_at); для ORM идентичность по-прежнему id.
+    """
+
     __tablename__ = "payments"
+    # Составные индексы под keyset-пагинацию по (created_at, id):
+    # фильтр по равенству идёт первым столбцом, дальше порядок страницы.
+    __table_args__ = (
+        Index("ix_payments_created_at_id", "created_at", "id"),
+        Index(
+            "ix_payments_order_id_created_at_id",
+            "order_id", "created_at", "id",
+        ),
+        Index(
+            "ix_payments_status_created_at_id",
+            "status", "created_at", "id",
+        ),
+        Index(
+            "ix_payments_currency_created_at_id",
+            "currency", "created_at", "id",
+        ),
+        # водяной знак пересчёта дневных итогов (app/services/stats.py)
+        Index("ix_payments_updated_at", "updated_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
-    order_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    id: Mapped[int] = mapped_column(
+        BigInteger, PAYMENT_ID_SEQ, primary_key=True)
+    order_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
 
-    amount: Mapped[float] = mapped_column(Numeric(10, 2, asdecimal=False))
+    # суммы — в минорных единицах валюты (app/core/money.py)
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Сумма строк payment_refunds этого платежа: GET платежа не читает
+    # журнал. Меняется только в app/services/refunds.py, под блокировкой
+    # строки платежа.
+    refunded_minor: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0")
     currency: Mapped[str] = mapped_column(String(3), default="USD")
 
     status: Mapped[PaymentStatus] = mapped_column(
-        Enum(PaymentStatus), default=PaymentStatus.PENDING, index=True
+        Enum(PaymentStatus), default=PaymentStatus.PENDING
     )
 
     provider: Mapped[str] = mapped_column(String(32), default="fake")
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=datetime.utcnow
+        DateTime(timezone=True), primary_key=True, default=datetime.utcnow
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=datetime.utcnow,
         onupdate=datetime.utcnow
     )
-    idempotency_key: Mapped[str] = mapped_column(
-        String(64),
-        unique=True,
-        index=True,
-        nullable=False
-        )
+    # Уникальность ключа — в payment_idempotency_keys: уникальный индекс
+    # секционированной таблицы обязан включать created_at.
+    idempotency_key: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    __mapper_args__ = {"primary_key": [id]}
+
+    @property
+    def amount(self) -> Decimal:
+        return from_minor(self.amount_minor, self.currency)
+
+    @property
+    def refunded_total(self) -> Decimal:
+        return from_minor(self.refunded_minor, self.currency)
@@ -0,0 +1,37 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, DateTime, Index, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.money import from_minor
+from app.db import Base
+
+
+class PaymentRefund(Base):
+    """Журнал возвратов: строка на каждый (частичный) возврат.
+
+    Пишется только вместе с payments.refunded_minor в одной транзакции
+    (app/services/refunds.py). Внешнего ключа нет: первичный ключ
+    секционированной payments — (id, created_at).
+    """
+
+    __tablename__ = "payment_refunds"
+    __table_args__ = (
+        Index("ix_payment_refunds_payment_id_id", "payment_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    payment_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # валюта платежа: сумму возврата можно показать без payments
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)
+    # необязательный ключ идемпотентности запроса возврата
+    idempotency_key: Mapped[str | None] = mapped_column(
+        String(64), unique=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    @property
+    def amount(self) -> Decimal:
+        return from_minor(self.amount_minor, self.currency)
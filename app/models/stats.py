@@ -0,0 +1,41 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, Date, DateTime, Enum, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.money import from_minor
+from app.db import Base
+from app.models.payment import PaymentStatus
+
+
+class PaymentDailyStats(Base):
+    """Итоги платежей за день (UTC) по валюте и статусу.
+
+    Обновляется не при каждой записи, а пересчётом целых дней, в которых
+    что-то менялось (app/services/stats.py).
+    """
+
+    __tablename__ = "payment_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    currency: Mapped[str] = mapped_column(String(3), primary_key=True)
+    status: Mapped[PaymentStatus] = mapped_column(
+        Enum(PaymentStatus), primary_key=True)
+    payments: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    @property
+    def amount(self) -> Decimal:
+        return from_minor(self.amount_minor, self.currency)
+
+
+class PaymentStatsWatermark(Base):
+    """Одна строка: изменения payments с updated_at до watermark уже
+    учтены в payment_daily_stats."""
+
+    __tablename__ = "payment_stats_watermark"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    watermark: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False)
@@ -0,0 +1,19 @@
+from datetime import datetime
+from decimal import Decimal
+
+from pydantic import BaseModel
+
+
+class FxInfo(BaseModel):
+    """Какими курсами пересчитан отчёт."""
+    currency: str
+    version: str
+    as_of: datetime
+
+
+class FxRateTableRead(BaseModel):
+    base: str
+    as_of: datetime
+    version: str
+    # единиц валюты за одну единицу base
+    rates: dict[str, Decimal]
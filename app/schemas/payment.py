@@ -1,18 +1,49 @@
-from datetime import datetime
-from pydantic import BaseModel, Field, ConfigDict
+import enum
+from datetime import date, datetime
+from decimal import Decimal
+from pydantic import (
+    BaseModel,
+    Field,
+    ConfigDict,
+    field_validator,
+    model_validator,
+)
+from app.core.money import check_currency, to_minor
 from app.models.payment import PaymentStatus
+from app.schemas.fx import FxInfo
 
 
 class PaymentCreate(BaseModel):
     order_id: int
-    amount: float = Field(gt=0)
+    # Суммы в API — Decimal: на входе строка ("10.50") или число, на
+    # выходе строка с числом знаков по экспоненте валюты. 18 цифр влезают
+    # в BIGINT минорных единиц при любой экспоненте.
+    amount: Decimal = Field(gt=0, max_digits=18)
+    # код ISO 4217 (app/core/money.py), регистр не важен
     currency: str = "USD"
 
+    @field_validator("currency")
+    @classmethod
+    def _check_currency(cls, value: str) -> str:
+        return check_currency(value)
+
+    @model_validator(mode="after")
+    def _check_precision(self):
+        to_minor(self.amount, self.currency)
+        return self
+
+    @property
+    def amount_minor(self) -> int:
+        return to_minor(self.amount, self.currency)
+
 
 class PaymentRead(BaseModel):
     id: int
     order_id: int
-    amount: float
+    amount: Decimal
+    # сумма возвратов по журналу; по умолчанию 0 — для снимков,
+    # сохранённых до появления поля (кэш, ключи идемпотентности)
+    refunded_total: Decimal = Decimal(0)
     currency: str
     status: PaymentStatus
     provider: str
@@ -20,3 +51,149 @@ class PaymentRead(BaseModel):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class PaymentBatchItem(PaymentCreate):
+    idempotency_key: str = Field(min_length=1, max_length=64)
+
+
+class PaymentBatchCreate(BaseModel):
+    items: list[PaymentBatchItem] = Field(min_length=1, max_length=500)
+
+
+class BatchOutcome(str, enum.Enum):
+    CREATED = "created"
+    REPLAYED = "replayed"
+    CONFLICT = "conflict"
+
+
+class PaymentBatchResult(BaseModel):
+    idempotency_key: str
+    outcome: BatchOutcome
+    payment: PaymentRead | None = None
+
+
+class PaymentFilters(BaseModel):
+    order_id: int | None = None
+    status: PaymentStatus | None = None
+    currency: str | None = Field(default=None, max_length=3)
+    provider: str | None = Field(default=None, max_length=32)
+    created_from: datetime | None = None  # включительно
+    created_to: datetime | None = None  # не включительно
+
+
+class PaymentPage(BaseModel):
+    items: list[PaymentRead]
+    next_cursor: str | None = None
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class PaymentStatsFilters(BaseModel):
+    day_from: date | None = None  # включительно; по умолчанию 30 дней назад
+    day_to: date | None = None  # включительно; по умолчанию сегодня (UTC)
+    currency: str | None = Field(default=None, max_length=3)
+    status: PaymentStatus | None = None
+
+
+class PaymentStatsRow(BaseModel):
+    day: date
+    currency: str
+    status: PaymentStatus
+    payments: int
+    amount: Decimal
+    # amount в валюте convert_to по курсам PaymentStats.fx
+    converted_amount: Decimal | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PaymentStats(BaseModel):
+    items: list[PaymentStatsRow]
+    # изменения платежей до этого момента уже учтены
+    as_of: datetime
+    # только с convert_to: курсы и сумма converted_amount по items
+    fx: FxInfo | None = None
+    converted_total: Decimal | None = None
+
+
+class RefundCreate(BaseModel):
+    # None — весь ещё не возвращённый остаток
+    amount: Decimal | None = Field(default=None, gt=0, max_digits=18)
+
+
+class RefundRead(BaseModel):
+    id: int
+    payment_id: int
+    amount: Decimal
+    currency: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RefundBatchItem(RefundCreate):
+    payment_id: int
+    idempotency_key: str | None = Field(
+        default=None, min_length=1, max_length=64)
+
+
+class RefundBatchCreate(BaseModel):
+    items: list[RefundBatchItem] = Field(min_length=1, max_length=500)
+
+
+class RefundOutcome(str, enum.Enum):
+    REFUNDED = "refunded"
+    REPLAYED = "replayed"
+    NOT_FOUND = "not_found"
+    INVALID_STATUS = "invalid_status"
+    EXCEEDS_BALANCE = "exceeds_balance"
+    # сумма точнее экспоненты валюты платежа
+    INVALID_AMOUNT = "invalid_amount"
+    CONFLICT = "conflict"
+
+
+class RefundBatchResult(BaseModel):
+    payment_id: int
+    idempotency_key: str | None = None
+    outcome: RefundOutcome
+    refund: RefundRead | None = None
+    payment: PaymentRead | None = None
+
+
+class TransitionItem(BaseModel):
+    id: int
+    status: PaymentStatus
+
+
+class TransitionBulkCreate(BaseModel):
+    items: list[TransitionItem] = Field(min_length=1, max_length=50_000)
+
+
+class TransitionOutcome(str, enum.Enum):
+    APPLIED = "applied"
+    # платёж уже в этом статусе (повтор файла сверки)
+    UNCHANGED = "unchanged"
+    NOT_FOUND = "not_found"
+    INVALID_STATUS = "invalid_status"
+    # id уже встречался в этом запросе; применено первое вхождение
+    DUPLICATE = "duplicate"
+    # строка CSV без id или с неизвестным статусом
+    INVALID_ROW = "invalid_row"
+
+
+class TransitionResult(BaseModel):
+    id: int | None
+    outcome: TransitionOutcome
+    # статус платежа после запроса
+    status: PaymentStatus | None = None
+    # номер строки CSV — только для invalid_row
+    line: int | None = None
+
+
+class TransitionBulkResult(BaseModel):
+    results: list[TransitionResult]
+    counts: dict[TransitionOutcome, int]
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import AnyHttpUrl, BaseModel, ConfigDict, Field
+
+WebhookEventType = Literal[
+    "payment.confirmed",
+    "payment.failed",
+    "payment.refunded",
+    "payment.partially_refunded",
+]
+
+
+class WebhookEndpointCreate(BaseModel):
+    url: AnyHttpUrl
+    event_types: list[WebhookEventType] | None = Field(
+        default=None, min_length=1)
+
+
+class WebhookEndpointRead(BaseModel):
+    id: int
+    url: str
+    event_types: list[str] | None
+    is_active: bool
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class WebhookEndpointCreated(WebhookEndpointRead):
+    # секрет подписи отдаётся один раз — при регистрации
+    secret: str
@@ -0,0 +1,38 @@
+"""Продакшен-запуск API: python -m app.server
+
+Несколько процессов-воркеров uvicorn (WEB_CONCURRENCY, по умолчанию по
+числу CPU). uvloop и httptools подхватываются, если установлены
+(pip install .[server]), иначе asyncio и h11. У каждого воркера свой
+engine и пул: до WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+соединений к Postgres.
+"""
+import os
+
+import uvicorn
+
+from app.core.config import Settings, get_settings
+
+
+def worker_count(settings: Settings) -> int:
+    return settings.WEB_CONCURRENCY or os.cpu_count() or 1
+
+
+def main() -> None:
+    settings = get_settings()
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=worker_count(settings),
+        loop="auto",
+        http="auto",
+        lifespan="on",
+        proxy_headers=True,
+        access_log=settings.SERVER_ACCESS_LOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Generic, TypeVar
+
+from app.core.config import get_settings
+from app.models.payment import PaymentStatus
+from app.schemas.payment import PaymentRead
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+# Из этих статусов переходов нет, такие записи можно держать без TTL.
+TERMINAL_STATUSES = frozenset({PaymentStatus.FAILED, PaymentStatus.REFUNDED})
+
+
+class PaymentCache(ABC):
+    """Кэш снимков платежей для read-through чтения по id."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    def ttl_for(self, payment: PaymentRead) -> float | None:
+        if payment.status in TERMINAL_STATUSES:
+            return None
+        return self.ttl
+
+    @abstractmethod
+    async def get(self, payment_id: int) -> PaymentRead | None:
+        ...
+
+    @abstractmethod
+    async def set(self, payment: PaymentRead) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, payment_id: int) -> None:
+        ...
+
+
+class NullPaymentCache(PaymentCache):
+    def __init__(self):
+        super().__init__(ttl=0)
+
+    async def get(self, payment_id: int) -> PaymentRead | None:
+        return None
+
+    async def set(self, payment: PaymentRead) -> None:
+        pass
+
+    async def delete(self, payment_id: int) -> None:
+        pass
+
+
+class LRUStore(Generic[K, V]):
+    """In-process LRU: не больше max_entries записей, у каждой свой TTL
+    (None — без срока)."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float | None, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None) -> None:
+        expires_at = None if ttl is None else self._clock() + ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+
+class LRUPaymentCache(PaymentCache):
+    """In-process LRU с ограничением по размеру и TTL.
+
+    Кэш живёт в памяти одного процесса: при нескольких воркерах
+    изменение статуса в одном из них остальные увидят не позже чем через TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._store: LRUStore[int, PaymentRead] = LRUStore(max_entries, clock)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    async def get(self, payment_id: int) -> PaymentRead | None:
+        return self._store.get(payment_id)
+
+    async def set(self, payment: PaymentRead) -> None:
+        self._store.set(payment.id, payment, self.ttl_for(payment))
+
+    async def delete(self, payment_id: int) -> None:
+        self._store.delete(payment_id)
+
+
+class RedisPaymentCache(PaymentCache):
+    """Кэш в Redis (или совместимом сервере), общий для всех воркеров.
+
+    client — асинхронный клиент с методами get/set/delete, как у
+    redis.asyncio.Redis. Ошибки Redis не роняют запрос: чтение считается
+    промахом, запись пропускается.
+    """
+
+    # v2: суммы — строки по экспоненте валюты; снимки с float-суммами
+    # под старым префиксом не читаются и истекают сами
+    def __init__(self, client: Any, ttl: float, prefix: str = "payment:v2:"):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, payment_id: int) -> str:
+        return f"{self.prefix}{payment_id}"
+
+    async def get(self, payment_id: int) -> PaymentRead | None:
+        try:
+            raw = await self.client.get(self._key(payment_id))
+        except Exception:
+            logger.warning("payment cache get failed", exc_info=True)
+            return None
+        if raw is None:
+            return None
+        return PaymentRead.model_validate_json(raw)
+
+    async def set(self, payment: PaymentRead) -> None:
+        ttl = self.ttl_for(payment)
+        px = None if ttl is None else max(1, int(ttl * 1000))
+        try:
+            await self.client.set(
+                self._key(payment.id), payment.model_dump_json(), px=px)
+        except Exception:
+            logger.warning("payment cache set failed", exc_info=True)
+
+    async def delete(self, payment_id: int) -> None:
+        try:
+            await self.client.delete(self._key(payment_id))
+        except Exception:
+            logger.warning("payment cache delete failed", exc_info=True)
+
+
+def build_payment_cache() -> PaymentCache:
+    settings = get_settings()
+    backend = settings.CACHE_BACKEND
+
+    if backend == "none":
+        return NullPaymentCache()
+    if backend == "memory":
+        return LRUPaymentCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            ttl=settings.CACHE_TTL_SECONDS,
+        )
+    if backend == "redis":
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as exc:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the 'redis' package"
+            ) from exc
+        return RedisPaymentCache(
+            aioredis.from_url(settings.REDIS_URL),
+            ttl=settings.CACHE_TTL_SECONDS,
+        )
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend!r}")
+
+
+_cache: PaymentCache | None = None
+
+
+def get_payment_cache() -> PaymentCache:
+    global _cache
+    if _cache is None:
+        _cache = build_payment_cache()
+    return _cache
+
+
+def set_payment_cache(cache: PaymentCache | None) -> None:
+    """Подменить кэш (тесты) или сбросить к настройкам (None)."""
+    global _cache
+    _cache = cache
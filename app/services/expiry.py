@@ -0,0 +1,72 @@
+"""Истечение зависших PENDING-платежей.
+
+Платёж, который никто не подтвердил и не отклонил за max_age, переводится
+в FAILED (переход из ALLOWED_TRANSITIONS) с обычным событием
+payment.failed. Пачка выбирается FOR UPDATE SKIP LOCKED, поэтому
+свиперов может работать сколько угодно: каждый берёт свои строки,
+а строки, занятые confirm/fail, пропускает до следующего прохода.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import PAYMENTS_EXPIRED, timed
+from app.models.payment import Payment, PaymentStatus
+from app.services.payments import commit_transitions, transition_stmt
+
+logger = logging.getLogger(__name__)
+
+
+@timed("expire_pending")
+async def expire_pending(
+    db: AsyncSession,
+    max_age: timedelta,
+    batch_size: int,
+) -> int:
+    """Перевести в FAILED до batch_size PENDING старше max_age; вернуть их число."""
+    stale = (
+        select(Payment.id, Payment.created_at, Payment.status)
+        .where(
+            Payment.status == PaymentStatus.PENDING,
+            Payment.created_at < func.now() - max_age,
+        )
+        .order_by(Payment.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("stale")
+    )
+    rows = (await db.execute(transition_stmt(stale, PaymentStatus.FAILED))).all()
+    if not rows:
+        await db.rollback()
+        return 0
+    await commit_transitions(db, rows, PaymentStatus.FAILED)
+    PAYMENTS_EXPIRED.inc(len(rows))
+    return len(rows)
+
+
+async def run_sweeper(
+    session_factory: async_sessionmaker[AsyncSession],
+    max_age: timedelta,
+    batch_size: int,
+    interval: float,
+    stop: asyncio.Event,
+) -> None:
+    """Истекать пачками до stop; когда истекать нечего — ждать interval."""
+    while not stop.is_set():
+        try:
+            async with session_factory() as db:
+                expired = await expire_pending(db, max_age, batch_size)
+        except Exception:
+            logger.exception("expiry sweep failed")
+            expired = 0
+
+        if expired:
+            logger.info("expired %d pending payments", expired)
+        if expired < batch_size:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,138 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Callable, Sequence
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.money import format_minor
+from app.db import get_engine
+from app.models.payment import Payment
+from app.schemas.payment import ExportFormat, PaymentFilters
+from app.services.fx import RateTable, UnknownRateError
+from app.services.payments import apply_filters
+
+EXPORT_COLUMNS = (
+    Payment.id,
+    Payment.order_id,
+    # в выгрузке сумма — строка, как в API
+    Payment.amount_minor.label("amount"),
+    Payment.currency,
+    Payment.status,
+    Payment.provider,
+    Payment.created_at,
+    Payment.updated_at,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+# с convert_to: сумма в валюте отчёта; пусто — нет курса валюты платежа
+CONVERTED_FIELDS = ["converted_amount", "converted_currency"]
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+async def stream_payment_rows(
+    filters: PaymentFilters,
+    chunk_size: int = 1000,
+    session_factory: async_sessionmaker[AsyncSession] | None = None,
+) -> AsyncIterator[Sequence[Row]]:
+    """Строки платежей пачками через server-side cursor.
+
+    В памяти одновременно не больше chunk_size строк. Сессия своя,
+    а не из get_db: она должна жить ровно столько, сколько отдаётся поток.
+    session_factory — например, реплика; по умолчанию primary.
+    """
+    if session_factory is None:
+        _, session_factory = get_engine()
+    stmt = (
+        apply_filters(select(*EXPORT_COLUMNS), filters)
+        .order_by(Payment.created_at, Payment.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async with session_factory() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
+
+
+Converted = Callable[[Row], list]
+
+
+def converted_columns(table: RateTable, target: str) -> Converted:
+    """Значения CONVERTED_FIELDS строки: курсы из table, без БД."""
+    def converted(row: Row) -> list:
+        try:
+            converter = table.converter(row.currency, target)
+        except UnknownRateError:
+            return [None, target]
+        return [format_minor(converter(row.amount), target), target]
+    return converted
+
+
+def _plain(row: Row, convert: Converted | None = None) -> list:
+    # Без PaymentRead: только приведение enum/datetime к JSON-совместимым
+    values = [
+        row.id,
+        row.order_id,
+        format_minor(row.amount, row.currency),
+        row.currency,
+        row.status.value,
+        row.provider,
+        row.created_at.isoformat(),
+        row.updated_at.isoformat(),
+    ]
+    if convert is not None:
+        values += convert(row)
+    return values
+
+
+def _fields(convert: Converted | None) -> list[str]:
+    return EXPORT_FIELDS if convert is None else EXPORT_FIELDS + CONVERTED_FIELDS
+
+
+def format_ndjson(
+    rows: Sequence[Row],
+    convert: Converted | None = None,
+) -> bytes:
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    fields = _fields(convert)
+    return b"".join(
+        (dumps(dict(zip(fields, _plain(row, convert)))) + "\n").encode()
+        for row in rows
+    )
+
+
+def format_csv(
+    rows: Sequence[Row],
+    header: bool = False,
+    convert: Converted | None = None,
+) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(_fields(convert))
+    writer.writerows(_plain(row, convert) for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def export_payments(
+    filters: PaymentFilters,
+    fmt: ExportFormat,
+    chunk_size: int = 1000,
+    session_factory: async_sessionmaker[AsyncSession] | None = None,
+    convert: Converted | None = None,
+) -> AsyncIterator[bytes]:
+    """convert — converted_columns: вся выгрузка по одной таблице курсов."""
+    if fmt == ExportFormat.CSV:
+        yield format_csv([], header=True, convert=convert)
+
+    async for rows in stream_payment_rows(
+        filters, chunk_size, session_factory,
+    ):
+        if fmt == ExportFormat.CSV:
+            yield format_csv(rows, convert=convert)
+        else:
+            yield format_ndjson(rows, convert)
@@ -0,0 +1,188 @@
+"""Курсы валют для отчётов: пересчёт итогов и выгрузки в одну валюту.
+
+Курсы читаются из FX_RATES_SOURCE — локального JSON-файла или URL
+ленты того же формата:
+
+    {"base": "USD", "as_of": "2026-10-18T00:00:00Z",
+     "rates": {"EUR": "0.9213", "JPY": "151.37"}}
+
+rates — сколько единиц валюты за одну единицу base. Загруженная таблица
+(RateTable) неизменна; обновление строит новую и подменяет ссылку в
+FxRates целиком, поэтому отчёт, взявший table() один раз, считает весь
+ответ по одной версии курсов, даже если таблица обновилась посреди
+выгрузки. Пересчёт — целочисленный, без обращений к БД: на пару валют
+один Converter.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from fractions import Fraction
+from pathlib import Path
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.money import check_currency, exponent
+
+logger = logging.getLogger(__name__)
+
+
+class FxRatesUnavailableError(Exception):
+    """Курсы не загружены (FX_RATES_SOURCE не задан или не читается)."""
+
+
+class UnknownRateError(ValueError):
+    """В таблице нет курса валюты."""
+
+
+class InvalidRateTableError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Converter:
+    """minor исходной валюты -> minor целевой: minor * numerator /
+    denominator с банковским округлением."""
+    numerator: int
+    denominator: int
+
+    def __call__(self, minor: int) -> int:
+        quotient, remainder = divmod(minor * self.numerator, self.denominator)
+        twice = 2 * remainder
+        if twice > self.denominator or (
+                twice == self.denominator and quotient % 2):
+            quotient += 1
+        return quotient
+
+
+@dataclass(frozen=True)
+class RateTable:
+    base: str
+    as_of: datetime
+    rates: dict[str, Fraction]
+    # sha256 канонического содержимого: одинаковые курсы — одна версия
+    # во всех воркерах
+    version: str
+    _converters: dict[tuple[str, str], Converter] = field(
+        default_factory=dict, compare=False, repr=False)
+
+    def rate(self, currency: str) -> Fraction:
+        try:
+            return self.rates[currency]
+        except KeyError:
+            raise UnknownRateError(f"no FX rate for {currency}")
+
+    def converter(self, source: str, target: str) -> Converter:
+        """Converter source -> target; считается один раз на пару."""
+        converter = self._converters.get((source, target))
+        if converter is None:
+            factor = (
+                self.rate(target) / self.rate(source)
+                * Fraction(10) ** (exponent(target) - exponent(source))
+            )
+            converter = Converter(factor.numerator, factor.denominator)
+            self._converters[source, target] = converter
+        return converter
+
+    def convert(self, minor: int, source: str, target: str) -> int:
+        return self.converter(source, target)(minor)
+
+
+def parse_rate_table(raw: bytes | str) -> RateTable:
+    try:
+        data = json.loads(raw)
+        base = check_currency(data["base"])
+        as_of = datetime.fromisoformat(data["as_of"])
+        rates = {
+            check_currency(code): Fraction(str(value))
+            for code, value in data["rates"].items()
+        }
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise InvalidRateTableError(f"invalid FX rate table: {exc}") from exc
+    if rates.setdefault(base, Fraction(1)) != 1:
+        raise InvalidRateTableError("base currency rate must be 1")
+    if any(rate <= 0 for rate in rates.values()):
+        raise InvalidRateTableError("FX rates must be positive")
+
+    canonical = json.dumps(
+        [base, as_of.isoformat(),
+         sorted((code, str(rate)) for code, rate in rates.items())],
+        separators=(",", ":"),
+    )
+    version = hashlib.sha256(canonical.encode()).hexdigest()[:16]
+    return RateTable(base, as_of, rates, version)
+
+
+async def read_source(source: str, timeout: float = 10.0) -> bytes:
+    """Содержимое файла или ответа ленты (http:// и https://)."""
+    if source.startswith(("http://", "https://")):
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(source)
+            response.raise_for_status()
+            return response.content
+    return await asyncio.to_thread(Path(source).read_bytes)
+
+
+class FxRates:
+    """Текущая таблица курсов и её обновление из source."""
+
+    def __init__(self, source: str = ""):
+        self.source = source
+        self._table: RateTable | None = None
+
+    def table(self) -> RateTable:
+        table = self._table
+        if table is None:
+            raise FxRatesUnavailableError("FX rates are not loaded")
+        return table
+
+    def swap(self, table: RateTable) -> bool:
+        """Подменить таблицу; False — та же версия уже загружена."""
+        if self._table is not None and self._table.version == table.version:
+            return False
+        self._table = table
+        return True
+
+    async def refresh(self) -> bool:
+        """Перечитать source; при ошибке прежняя таблица остаётся."""
+        if not self.source:
+            raise FxRatesUnavailableError("FX_RATES_SOURCE is not set")
+        return self.swap(parse_rate_table(await read_source(self.source)))
+
+
+async def run_fx_refresh(
+    rates: FxRates,
+    interval: float,
+    stop: asyncio.Event,
+) -> None:
+    """Перечитывать курсы раз в interval секунд до stop."""
+    while not stop.is_set():
+        try:
+            if await rates.refresh():
+                logger.info("FX rates %s loaded", rates.table().version)
+        except Exception:
+            logger.exception("FX rates refresh failed")
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+_rates: FxRates | None = None
+
+
+def get_fx_rates() -> FxRates:
+    global _rates
+    if _rates is None:
+        _rates = FxRates(get_settings().FX_RATES_SOURCE)
+    return _rates
+
+
+def set_fx_rates(rates: FxRates | None) -> None:
+    """Подменить курсы (тесты) или сбросить к настройкам (None)."""
+    global _rates
+    _rates = rates
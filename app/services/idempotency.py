@@ -0,0 +1,205 @@
+"""Хранилище ключей идемпотентности (payment_idempotency_keys).
+
+Для каждого ключа хранится sha256 канонического payload запроса
+(fingerprint), ответ на момент создания (response) и срок (expires_at).
+Повтор сверяется по fingerprint и отвечается сохранённым PaymentRead —
+таблица payments при этом не читается. Перед Postgres стоит горячий
+слой в памяти воркера: повтор, уже виденный этим воркером, не ходит
+в БД вообще.
+
+Ключ действует не меньше TTL: до очистки (purge_expired) повтор
+истёкшего ключа всё ещё отвечается старым платежом.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from typing import Callable, Iterable
+
+from sqlalchemy import ColumnElement, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.models.idempotency import IdempotencyKey
+from app.schemas.payment import PaymentCreate, PaymentRead
+from app.services.cache import LRUStore
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(data: PaymentCreate) -> str:
+    """sha256 канонического JSON полей PaymentCreate.
+
+    Сумма — в минорных единицах: "10", 10.0 и "10.00" дают один
+    fingerprint. Ключ пакета (PaymentBatchItem.idempotency_key) в payload
+    не входит.
+    """
+    payload = {
+        "order_id": data.order_id,
+        "amount": data.amount_minor,
+        "currency": data.currency,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def response_json(row: dict[str, ColumnElement]) -> ColumnElement:
+    """jsonb с полями PaymentRead из SQL-выражений row."""
+    return func.jsonb_build_object(*chain.from_iterable(
+        (name, row[name]) for name in PaymentRead.model_fields))
+
+
+@dataclass(frozen=True)
+class IdempotencyRecord:
+    fingerprint: str
+    response: PaymentRead
+    expires_at: datetime
+
+
+class IdempotencyStore:
+    """Срок жизни ключей и горячий слой (LRU) перед Postgres."""
+
+    def __init__(
+        self,
+        ttl: float,
+        hot_max_entries: int,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        self.ttl = timedelta(seconds=ttl)
+        self._now = now
+        self._hot: LRUStore[str, IdempotencyRecord] | None = (
+            LRUStore(hot_max_entries) if hot_max_entries > 0 else None
+        )
+
+    def cached(self, key: str) -> IdempotencyRecord | None:
+        if self._hot is None:
+            return None
+        return self._hot.get(key)
+
+    def remember(self, key: str, record: IdempotencyRecord) -> None:
+        if self._hot is None:
+            return
+        # запись неизменна до истечения, поэтому живёт в LRU ровно до него
+        ttl = (record.expires_at - self._now()).total_seconds()
+        if ttl > 0:
+            self._hot.set(key, record, ttl)
+
+    def created(
+        self,
+        key: str,
+        fingerprint: str,
+        payment: PaymentRead,
+    ) -> IdempotencyRecord:
+        record = IdempotencyRecord(
+            fingerprint, payment, payment.created_at + self.ttl)
+        self.remember(key, record)
+        return record
+
+    async def load(
+        self,
+        db: AsyncSession,
+        keys: Iterable[str],
+    ) -> dict[str, IdempotencyRecord]:
+        """Записи по ключам: из горячего слоя, остальные одним запросом."""
+        records: dict[str, IdempotencyRecord] = {}
+        missing = []
+        for key in keys:
+            record = self.cached(key)
+            if record is None:
+                missing.append(key)
+            else:
+                records[key] = record
+        if not missing:
+            return records
+
+        rows = await db.execute(
+            select(
+                IdempotencyKey.idempotency_key,
+                IdempotencyKey.fingerprint,
+                IdempotencyKey.response,
+                IdempotencyKey.expires_at,
+            ).where(IdempotencyKey.idempotency_key.in_(missing))
+        )
+        for key, fp, response, expires_at in rows:
+            record = IdempotencyRecord(
+                fp, PaymentRead.model_validate(response), expires_at)
+            self.remember(key, record)
+            records[key] = record
+        return records
+
+
+def build_idempotency_store() -> IdempotencyStore:
+    settings = get_settings()
+    return IdempotencyStore(
+        ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+        hot_max_entries=settings.IDEMPOTENCY_HOT_MAX_ENTRIES,
+    )
+
+
+_store: IdempotencyStore | None = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        _store = build_idempotency_store()
+    return _store
+
+
+def set_idempotency_store(store: IdempotencyStore | None) -> None:
+    """Подменить хранилище (тесты) или сбросить к настройкам (None)."""
+    global _store
+    _store = store
+
+
+async def purge_expired(db: AsyncSession, batch_size: int) -> int:
+    """Освободить до batch_size истёкших ключей; вернуть их число.
+
+    Строка остаётся: по ней get_payment находит секцию платежа.
+    SKIP LOCKED — чтобы несколько очисток не ждали друг друга.
+    """
+    expired = (
+        select(IdempotencyKey.payment_id)
+        .where(IdempotencyKey.expires_at <= func.now())
+        .order_by(IdempotencyKey.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.payment_id.in_(expired.scalar_subquery()))
+        .values(
+            idempotency_key=None,
+            fingerprint=None,
+            response=None,
+            expires_at=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def run_purge(
+    session_factory: async_sessionmaker[AsyncSession],
+    batch_size: int,
+    interval: float,
+    stop: asyncio.Event,
+) -> None:
+    """Чистить пачками до stop; когда истёкших не осталось — ждать interval."""
+    while not stop.is_set():
+        try:
+            async with session_factory() as db:
+                purged = await purge_expired(db, batch_size)
+        except Exception:
+            logger.exception("idempotency purge failed")
+            purged = 0
+
+        if purged < batch_size:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
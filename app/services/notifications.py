@@ -0,0 +1,209 @@
+"""Уведомления о смене статуса платежа (GET /payments/{id}/events).
+
+Внутри процесса — PaymentHub: очереди подписчиков по payment_id,
+commit_transitions публикует в них свежие снимки сразу после commit.
+Между процессами — Postgres LISTEN/NOTIFY: UPDATE статуса сам вызывает
+pg_notify в RETURNING (transition_stmt), уведомление уходит на commit,
+а у каждого воркера одно LISTEN-соединение вне пула. Оно открывается
+при первой подписке, поэтому воркер без подписчиков его не держит;
+ждущие клиенты не держат соединений вовсе.
+
+Уведомления, пропущенные, пока LISTEN-соединение переподключалось,
+не восстанавливаются: подписчики получают None и перечитывают платёж.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable
+
+import asyncpg
+from sqlalchemy import ColumnElement, Text, cast, func, literal, literal_column
+
+from app.core.config import get_settings
+from app.core.money import from_minor
+from app.models.payment import Payment, PaymentStatus
+from app.schemas.payment import PaymentRead
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "payment_status"
+
+# None в очереди подписчика: состояние неизвестно, перечитать из БД
+Update = PaymentRead | None
+
+
+@lru_cache
+def notify_expr(origin: str) -> ColumnElement:
+    """pg_notify(CHANNEL, {"origin", "payment"}) по новой строке payments.
+
+    Для RETURNING в UPDATE статуса. Строка целиком (to_jsonb), а не поля
+    PaymentRead по одному: выражение короче и ключ кэша компиляции
+    SQLAlchemy на каждом запросе дешевле. Выражение не зависит от
+    запроса, поэтому строится один раз на origin.
+    """
+    payload = func.jsonb_build_object(
+        "origin", literal(origin),
+        "payment", func.to_jsonb(literal_column(Payment.__tablename__)),
+    )
+    return func.pg_notify(CHANNEL, cast(payload, Text))
+
+
+def parse_notification(payload: str) -> tuple[str, PaymentRead]:
+    """(origin, снимок) из уведомления notify_expr."""
+    message = json.loads(payload)
+    row = message["payment"]
+    # в БД статус — имя члена enum, в API — значение
+    row["status"] = PaymentStatus[row["status"]].value
+    # в БД суммы — минорные единицы, в API — Decimal
+    row["amount"] = from_minor(row.pop("amount_minor"), row["currency"])
+    row["refunded_total"] = from_minor(
+        row.pop("refunded_minor"), row["currency"])
+    return message["origin"], PaymentRead.model_validate(row)
+
+
+class PaymentHub:
+    """Подписчики этого процесса и LISTEN-соединение к ним.
+
+    origin отличает свои уведомления от чужих: свои подписчики получают
+    снимок из publish, а не второй раз через NOTIFY.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[asyncpg.Connection]] | None = None,
+        ready_timeout: float = 2.0,
+        reconnect_delay: float = 1.0,
+    ):
+        self.origin = uuid.uuid4().hex
+        self._connect = connect
+        self._ready_timeout = ready_timeout
+        self._reconnect_delay = reconnect_delay
+        self._subscribers: defaultdict[int, set[asyncio.Queue[Update]]] = (
+            defaultdict(set))
+        self._listener: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+
+    def subscribers(self, payment_id: int) -> int:
+        return len(self._subscribers.get(payment_id, ()))
+
+    @asynccontextmanager
+    async def subscribe(
+        self,
+        payment_id: int,
+    ) -> AsyncIterator[asyncio.Queue[Update]]:
+        """Очередь изменений payment_id.
+
+        Возвращается, когда LISTEN уже действует (или не поднялся за
+        ready_timeout): платёж, прочитанный после этого, не разминётся
+        с уведомлением.
+        """
+        queue: asyncio.Queue[Update] = asyncio.Queue()
+        self._subscribers[payment_id].add(queue)
+        try:
+            await self._listen()
+            yield queue
+        finally:
+            queues = self._subscribers.get(payment_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[payment_id]
+
+    def publish(self, payment: PaymentRead) -> None:
+        for queue in self._subscribers.get(payment.id, ()):
+            queue.put_nowait(payment)
+
+    def resync(self) -> None:
+        for queues in self._subscribers.values():
+            for queue in queues:
+                queue.put_nowait(None)
+
+    async def _listen(self) -> None:
+        if self._connect is None:
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(
+                self._ready.wait(), timeout=self._ready_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("payment notifications are not listening yet")
+
+    def _on_notify(self, conn, pid: int, channel: str, payload: str) -> None:
+        origin, payment = parse_notification(payload)
+        if origin != self.origin:
+            self.publish(payment)
+
+    async def _run(self) -> None:
+        connected_before = False
+        while True:
+            conn = None
+            try:
+                conn = await self._connect()
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(CHANNEL, self._on_notify)
+                if connected_before:
+                    self.resync()
+                connected_before = True
+                self._ready.set()
+                await lost.wait()
+                logger.warning("payment notifications connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning(
+                    "payment notifications listen failed", exc_info=True)
+            finally:
+                self._ready.clear()
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(self._reconnect_delay)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+async def connect_listener() -> asyncpg.Connection:
+    """Отдельное от пула соединение для LISTEN."""
+    settings = get_settings()
+    return await asyncpg.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASS,
+        database=settings.DB_NAME,
+        server_settings={"application_name": settings.DB_APPLICATION_NAME},
+    )
+
+
+def build_payment_hub() -> PaymentHub:
+    settings = get_settings()
+    return PaymentHub(
+        connect_listener if settings.PAYMENT_NOTIFY_ENABLED else None)
+
+
+_hub: PaymentHub | None = None
+
+
+def get_payment_hub() -> PaymentHub:
+    global _hub
+    if _hub is None:
+        _hub = build_payment_hub()
+    return _hub
+
+
+def set_payment_hub(hub: PaymentHub | None) -> None:
+    """Подменить hub (тесты) или сбросить к настройкам (None)."""
+    global _hub
+    _hub = hub
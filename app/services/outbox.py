@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.event import PaymentEvent
+from app.models.payment import Payment, PaymentStatus
+from app.schemas.payment import PaymentRead
+
+logger = logging.getLogger(__name__)
+
+EVENT_CREATED = "payment.created"
+# возврат части суммы; статус остаётся confirmed
+EVENT_PARTIALLY_REFUNDED = "payment.partially_refunded"
+
+
+def status_event_type(status: PaymentStatus) -> str:
+    return f"payment.{status.value}"
+
+
+def add_payment_event(db: AsyncSession, event_type: str, payment: Payment) -> None:
+    """Положить событие в outbox текущей транзакции (запишется на commit)."""
+    db.add(PaymentEvent(
+        payment_id=payment.id,
+        event_type=event_type,
+        payload=PaymentRead.model_validate(payment).model_dump(mode="json"),
+    ))
+
+
+@dataclass(frozen=True)
+class OutboxEvent:
+    id: int
+    payment_id: int
+    event_type: str
+    payload: dict[str, Any]
+    created_at: datetime
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "payment_id": self.payment_id,
+            "event_type": self.event_type,
+            "payload": self.payload,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class EventSink(ABC):
+    """Куда relay доставляет события. Исключение из publish — пачка
+    остаётся в outbox и будет доставлена повторно (at-least-once)."""
+
+    @abstractmethod
+    async def publish(self, events: Sequence[OutboxEvent]) -> None:
+        ...
+
+
+class InMemorySink(EventSink):
+    def __init__(self):
+        self.events: list[OutboxEvent] = []
+
+    async def publish(self, events: Sequence[OutboxEvent]) -> None:
+        self.events.extend(events)
+
+
+class FileSink(EventSink):
+    """Дописывает события в NDJSON-файл."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    async def publish(self, events: Sequence[OutboxEvent]) -> None:
+        lines = "".join(json.dumps(e.to_dict()) + "\n" for e in events)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str) -> None:
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+async def relay_batch(db: AsyncSession, sink: EventSink, batch_size: int) -> int:
+    """Доставить одну пачку событий; вернуть их число.
+
+    FOR UPDATE SKIP LOCKED позволяет запускать несколько relay параллельно:
+    каждый берёт свои строки. Порядок гарантирован только внутри пачки.
+    """
+    result = await db.execute(
+        select(PaymentEvent)
+        .order_by(PaymentEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = result.scalars().all()
+    if not rows:
+        await db.rollback()
+        return 0
+
+    events = [
+        OutboxEvent(
+            id=row.id,
+            payment_id=row.payment_id,
+            event_type=row.event_type,
+            payload=row.payload,
+            created_at=row.created_at,
+        )
+        for row in rows
+    ]
+    try:
+        await sink.publish(events)
+    except Exception:
+        await db.rollback()
+        raise
+
+    await db.execute(
+        delete(PaymentEvent).where(PaymentEvent.id.in_([e.id for e in events]))
+    )
+    await db.commit()
+    return len(events)
+
+
+async def run_relay(
+    session_factory: async_sessionmaker[AsyncSession],
+    sink: EventSink,
+    batch_size: int,
+    poll_interval: float,
+    stop: asyncio.Event,
+) -> None:
+    """Крутить relay_batch до stop; при пустом outbox ждать poll_interval."""
+    while not stop.is_set():
+        try:
+            async with session_factory() as db:
+                delivered = await relay_batch(db, sink, batch_size)
+        except Exception:
+            logger.exception("outbox relay batch failed")
+            delivered = 0
+
+        if delivered < batch_size:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,115 @@
+"""Помесячные секции payments: создание наперёд и вывод старых из таблицы.
+
+Секция на месяц M называется payments_pYYYY_MM и покрывает
+[M-01 00:00 UTC, (M+1)-01 00:00 UTC). Секции по умолчанию (DEFAULT) нет:
+строка вне всех секций не вставится, поэтому секции создаются заранее
+(PARTITION_AHEAD_MONTHS), а DETACH может идти CONCURRENTLY.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+PARENT = "payments"
+NAME_RE = re.compile(r"^payments_p(\d{4})_(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+@dataclass(frozen=True, order=True)
+class MonthPartition:
+    month: date
+
+    @property
+    def name(self) -> str:
+        return f"{PARENT}_p{self.month:%Y_%m}"
+
+    @property
+    def upper(self) -> date:
+        return add_months(self.month, 1)
+
+    def create_sql(self) -> str:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.name} PARTITION OF {PARENT} "
+            f"FOR VALUES FROM ('{self.month} 00:00:00+00') "
+            f"TO ('{self.upper} 00:00:00+00')"
+        )
+
+    @classmethod
+    def from_name(cls, name: str) -> "MonthPartition | None":
+        match = NAME_RE.match(name)
+        if match is None:
+            return None
+        return cls(date(int(match[1]), int(match[2]), 1))
+
+
+async def list_partitions(conn: AsyncConnection) -> list[MonthPartition]:
+    names = await conn.scalars(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:parent AS regclass)"
+    ), {"parent": PARENT})
+    partitions = [MonthPartition.from_name(name) for name in names]
+    return sorted(p for p in partitions if p is not None)
+
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    today: date,
+    ahead: int,
+    dry_run: bool = False,
+) -> list[str]:
+    """Секции с текущего месяца по today + ahead месяцев включительно."""
+    existing = set(await list_partitions(conn))
+    current = month_start(today)
+    created = []
+    for offset in range(ahead + 1):
+        partition = MonthPartition(add_months(current, offset))
+        if partition in existing:
+            continue
+        if not dry_run:
+            await conn.execute(text(partition.create_sql()))
+        created.append(partition.name)
+    return created
+
+
+async def detach_old_partitions(
+    conn: AsyncConnection,
+    today: date,
+    retain: int,
+    archive_schema: str | None,
+    dry_run: bool = False,
+) -> list[str]:
+    """Вывести из payments секции, целиком старше retain месяцев.
+
+    conn должен быть в AUTOCOMMIT: DETACH ... CONCURRENTLY не работает
+    внутри транзакции, зато не блокирует запись в payments. Отсоединённая
+    секция переносится в archive_schema или удаляется (archive_schema=None).
+    """
+    cutoff = add_months(month_start(today), -retain)
+    detached = []
+    for partition in await list_partitions(conn):
+        if partition.upper > cutoff:
+            continue
+        if not dry_run:
+            await conn.execute(text(
+                f"ALTER TABLE {PARENT} DETACH PARTITION {partition.name} "
+                "CONCURRENTLY"))
+            if archive_schema is None:
+                await conn.execute(text(f"DROP TABLE {partition.name}"))
+            else:
+                await conn.execute(text(
+                    f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"'))
+                await conn.execute(text(
+                    f'ALTER TABLE {partition.name} SET SCHEMA "{archive_schema}"'))
+        detached.append(partition.name)
+    return detached
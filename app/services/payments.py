@@ -1,9 +1,60 @@
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select
+import asyncio
+import base64
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Sequence
 
-from app.models.payment import Payment, PaymentStatus
-from app.schemas.payment import PaymentCreate
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy import (
+    CTE,
+    BigInteger,
+    DateTime,
+    Row,
+    Select,
+    TableValuedAlias,
+    Update,
+    column,
+    func,
+    literal,
+    null,
+    select,
+    tuple_,
+    update,
+)
+
+from app.models.idempotency import IdempotencyKey
+from app.models.payment import PAYMENT_ID_SEQ, Payment, PaymentStatus
+from app.schemas.payment import (
+    PaymentCreate,
+    PaymentRead,
+    PaymentBatchItem,
+    BatchOutcome,
+    PaymentFilters,
+)
+from app.core.config import get_settings
+from app.core.metrics import (
+    IDEMPOTENCY_CONFLICTS,
+    IDEMPOTENCY_REPLAYS,
+    INVALID_TRANSITIONS,
+    timed,
+)
+from app.core.money import format_minor
+from app.db import is_replica
+from app.services.cache import TERMINAL_STATUSES, get_payment_cache
+from app.services.idempotency import (
+    IdempotencyRecord,
+    fingerprint,
+    get_idempotency_store,
+    response_json,
+)
+from app.services.notifications import get_payment_hub, notify_expr
+from app.services.outbox import (
+    EVENT_CREATED,
+    add_payment_event,
+    status_event_type,
+)
+from app.services.providers import CaptureOutcome, get_provider_gateway
 
 
 class IdempotencyConflictError(Exception):
@@ -15,6 +66,18 @@ class InvalidStatusTransitionError(Exception):
     pass
 
 
+class InvalidCursorError(ValueError):
+    pass
+
+
+class PaymentDeclinedError(Exception):
+    """Провайдер отказал в списании; платёж переведён в FAILED."""
+
+    def __init__(self, payment: Payment | None):
+        super().__init__("payment declined by provider")
+        self.payment = payment
+
+
 ALLOWED_TRANSITIONS: dict[PaymentStatus, set[PaymentStatus]] = {
     PaymentStatus.PENDING: {PaymentStatus.CONFIRMED, PaymentStatus.FAILED},
     PaymentStatus.CONFIRMED: {PaymentStatus.CONFIRMED, PaymentStatus.REFUNDED},
@@ -22,94 +85,519 @@ ALLOWED_TRANSITIONS: dict[PaymentStatus, set[PaymentStatus]] = {
     PaymentStatus.REFUNDED: set(),
 }
 
+# Обратная таблица: из каких статусов можно прийти в данный.
+ALLOWED_FROM: dict[PaymentStatus, list[PaymentStatus]] = {
+    target: [
+        source for source in PaymentStatus
+        if target in ALLOWED_TRANSITIONS[source]
+    ]
+    for target in PaymentStatus
+}
+
+
+def _created_at_of(payment_id: int):
+    """created_at платежа из ключей — для отсечения секций по id."""
+    return (
+        select(IdempotencyKey.created_at)
+        .where(IdempotencyKey.payment_id == payment_id)
+        .scalar_subquery()
+    )
+
+
+def payment_keys(pairs: Sequence[tuple[int, datetime]]) -> TableValuedAlias:
+    """Таблица (id, created_at) для соединения с payments пачкой.
+
+    unnest двух массивов, а не (id, created_at) IN (...) или VALUES:
+    IN на тысячах пар планируется секунды (отсечение секций по каждой
+    паре), VALUES — тысячи параметров и SQL без кэша компиляции.
+    """
+    return func.unnest(
+        literal([pid for pid, _ in pairs], ARRAY(BigInteger)),
+        literal(
+            [created_at for _, created_at in pairs],
+            ARRAY(DateTime(timezone=True)),
+        ),
+    ).table_valued(
+        column("id", BigInteger),
+        column("created_at", DateTime(timezone=True)),
+        name="keys",
+    ).render_derived()
+
+
+def _replay(
+    record: IdempotencyRecord,
+    fp: str,
+) -> PaymentRead:
+    """Ответ на повтор ключа; другой payload — IdempotencyConflictError."""
+    if record.fingerprint != fp:
+        IDEMPOTENCY_CONFLICTS.inc()
+        raise IdempotencyConflictError(
+            "Idempotency key reuse with different payload"
+        )
+    IDEMPOTENCY_REPLAYS.inc()
+    return record.response
 
+
+@timed("create_payment")
 async def create_payment(
     data: PaymentCreate,
     idempotency_key: str,
     db: AsyncSession,
-) -> tuple[Payment, bool]:
+) -> tuple[Payment | PaymentRead, bool]:
+    store = get_idempotency_store()
+    fp = fingerprint(data)
+    record = store.cached(idempotency_key)
+    if record is not None:
+        return _replay(record, fp), False
 
-    result = await db.execute(
-        select(Payment).where(Payment.idempotency_key == idempotency_key)
+    # Один round trip на новый платёж: CTE занимает ключ (ON CONFLICT DO
+    # NOTHING) вместе с fingerprint и будущим ответом, INSERT в payments
+    # берёт из него id и created_at. Если ключ уже занят, CTE пустой,
+    # RETURNING тоже — отвечаем по сохранённой записи ключа.
+    table = Payment.__table__
+    new = select(
+        PAYMENT_ID_SEQ.next_value().label("id"),
+        func.now().label("created_at"),
+    ).cte("new")
+    payload = {
+        name: literal(value, table.c[name].type)
+        for name, value in {
+            "order_id": data.order_id,
+            "amount_minor": data.amount_minor,
+            "currency": data.currency,
+            "idempotency_key": idempotency_key,
+            "status": PaymentStatus.PENDING,
+            "provider": table.c.provider.default.arg,
+        }.items()
+    }
+    response = response_json({
+        **payload,
+        "id": new.c.id,
+        # строкой, как PaymentRead: "10.50", а не число jsonb
+        "amount": literal(format_minor(data.amount_minor, data.currency)),
+        "status": literal(PaymentStatus.PENDING.value),
+        "refunded_total": literal(format_minor(0, data.currency)),
+        "created_at": new.c.created_at,
+        "updated_at": new.c.created_at,
+    })
+    key = (
+        insert(IdempotencyKey)
+        .from_select(
+            [
+                "payment_id", "created_at", "idempotency_key",
+                "fingerprint", "response", "expires_at",
+            ],
+            select(
+                new.c.id,
+                new.c.created_at,
+                payload["idempotency_key"],
+                literal(fp),
+                response,
+                new.c.created_at + store.ttl,
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.idempotency_key])
+        .returning(IdempotencyKey.payment_id, IdempotencyKey.created_at)
+        .cte("key")
     )
-    existing = result.scalar_one_or_none()
-
-    if existing:
-        if (
-            existing.order_id != data.order_id
-            or existing.amount != data.amount
-            or existing.currency != data.currency
-        ):
-            raise IdempotencyConflictError(
-                "Idempotency key reuse with different payload"
-            )
-        return existing, False
-
-    payment = Payment(
-        order_id=data.order_id,
-        amount=data.amount,
-        currency=data.currency,
-        idempotency_key=idempotency_key,
+    stmt = (
+        insert(Payment)
+        .from_select(
+            ["id", "created_at", "updated_at", *payload],
+            select(
+                key.c.payment_id,
+                key.c.created_at,
+                key.c.created_at,
+                *payload.values(),
+            ),
+            include_defaults=False,
+        )
+        .add_cte(key, nest_here=True)
+        .returning(*table.c)
     )
-    db.add(payment)
+    payment = (
+        await db.scalars(select(Payment).from_statement(stmt))
+    ).one_or_none()
 
-    try:
+    if payment is not None:
+        add_payment_event(db, EVENT_CREATED, payment)
         await db.commit()
-    except IntegrityError:
-        await db.rollback()
+        snapshot = PaymentRead.model_validate(payment)
+        store.created(idempotency_key, fp, snapshot)
+        await get_payment_cache().set(snapshot)
+        return payment, True
 
-        result = await db.execute(
-            select(Payment).where(Payment.idempotency_key == idempotency_key)
-        )
-        existing = result.scalar_one()
+    records = await store.load(db, [idempotency_key])
+    return _replay(records[idempotency_key], fp), False
+
+
+@timed("create_payments_batch")
+async def create_payments_batch(
+    items: list[PaymentBatchItem],
+    db: AsyncSession,
+) -> list[tuple[PaymentBatchItem, BatchOutcome, Payment | PaymentRead]]:
+    """Пакетное создание: многострочный INSERT ключей, затем платежей.
 
-        if (
-            existing.order_id != data.order_id
-            or existing.amount != data.amount
-            or existing.currency != data.currency
-        ):
+    Результаты возвращаются в порядке items. Повтор ключа внутри пакета
+    сверяется с первым вхождением по fingerprint, как и в create_payment.
+    """
+    store = get_idempotency_store()
+    first: dict[str, PaymentBatchItem] = {}
+    for item in items:
+        first.setdefault(item.idempotency_key, item)
+    fps = {key: fingerprint(item) for key, item in first.items()}
 
-            raise IdempotencyConflictError(
-                "Idempotency key reuse with different payload"
+    records = {
+        key: record for key in first
+        if (record := store.cached(key)) is not None
+    }
+    # Сортировка по ключу — чтобы встречные пакеты с пересекающимися
+    # ключами не ловили deadlock на уникальном индексе ключей.
+    keys = sorted(key for key in first if key not in records)
+    claimed = []
+    if keys:
+        claim = (
+            insert(IdempotencyKey)
+            .values([
+                {
+                    "idempotency_key": key,
+                    "payment_id": PAYMENT_ID_SEQ.next_value(),
+                    "created_at": func.now(),
+                    "fingerprint": fps[key],
+                    "expires_at": func.now() + store.ttl,
+                }
+                for key in keys
+            ])
+            .on_conflict_do_nothing(
+                index_elements=[IdempotencyKey.idempotency_key])
+            .returning(
+                IdempotencyKey.idempotency_key,
+                IdempotencyKey.payment_id,
+                IdempotencyKey.created_at,
             )
-        return existing, False
+        )
+        claimed = (await db.execute(claim)).all()
+
+    created: dict[str, Payment] = {}
+    snapshots: dict[str, PaymentRead] = {}
+    if claimed:
+        stmt = (
+            insert(Payment)
+            .values([
+                {
+                    "id": payment_id,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "order_id": first[key].order_id,
+                    "amount_minor": first[key].amount_minor,
+                    "currency": first[key].currency,
+                    "idempotency_key": key,
+                }
+                for key, payment_id, created_at in claimed
+            ])
+            .returning(Payment)
+        )
+        created = {
+            p.idempotency_key: p for p in (await db.scalars(stmt)).all()}
+        snapshots = {
+            key: PaymentRead.model_validate(p) for key, p in created.items()}
+        # ответ известен только после INSERT платежей: дописываем по payment_id
+        await db.execute(update(IdempotencyKey), [
+            {"payment_id": s.id, "response": s.model_dump(mode="json")}
+            for s in snapshots.values()
+        ])
+        for key in sorted(created):
+            add_payment_event(db, EVENT_CREATED, created[key])
+
+    missing = [key for key in keys if key not in created]
+    if missing:
+        records.update(await store.load(db, missing))
+    await db.commit()
+    for key, snapshot in snapshots.items():
+        records[key] = store.created(key, fps[key], snapshot)
 
-    await db.refresh(payment)
-    return payment, True
+    results = []
+    for item in items:
+        key = item.idempotency_key
+        record = records[key]
+        if key in created and first[key] is item:
+            outcome, payment = BatchOutcome.CREATED, created[key]
+        elif fingerprint(item) == record.fingerprint:
+            outcome, payment = BatchOutcome.REPLAYED, record.response
+            IDEMPOTENCY_REPLAYS.inc()
+        else:
+            outcome, payment = BatchOutcome.CONFLICT, record.response
+            IDEMPOTENCY_CONFLICTS.inc()
+        results.append((item, outcome, payment))
+    return results
 
 
+def warm_up_statements() -> list[Select]:
+    """Запросы для прогрева соединений при старте (app.db.warm_up_engine)."""
+    return [
+        select(Payment).where(
+            Payment.id == 0, Payment.created_at == _created_at_of(0)),
+        select(Payment).order_by(Payment.created_at, Payment.id).limit(1),
+    ]
+
+
+@timed("get_payment")
 async def get_payment(payment_id: int, db: AsyncSession) -> Payment | None:
-    result = await db.execute(
-        select(Payment).where(Payment.id == payment_id))
+    result = await db.execute(select(Payment).where(
+        Payment.id == payment_id,
+        Payment.created_at == _created_at_of(payment_id),
+    ))
     return result.scalar_one_or_none()
 
 
-async def change_status(
+def encode_cursor(payment: Payment) -> str:
+    raw = json.dumps([payment.created_at.isoformat(), payment.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, payment_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(created_at), int(payment_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Malformed cursor") from exc
+
+
+def apply_filters(stmt: Select, filters: PaymentFilters) -> Select:
+    if filters.order_id is not None:
+        stmt = stmt.where(Payment.order_id == filters.order_id)
+    if filters.status is not None:
+        stmt = stmt.where(Payment.status == filters.status)
+    if filters.currency is not None:
+        stmt = stmt.where(Payment.currency == filters.currency)
+    if filters.provider is not None:
+        stmt = stmt.where(Payment.provider == filters.provider)
+    if filters.created_from is not None:
+        stmt = stmt.where(Payment.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        stmt = stmt.where(Payment.created_at < filters.created_to)
+    return stmt
+
+
+@timed("list_payments")
+async def list_payments(
+    filters: PaymentFilters,
+    limit: int,
+    cursor: str | None,
+    db: AsyncSession,
+) -> tuple[list[Payment], str | None]:
+    """Страница платежей по возрастанию (created_at, id).
+
+    Keyset-пагинация: курсор — последний (created_at, id) страницы, поэтому
+    глубина листания не влияет на стоимость запроса.
+    """
+    stmt = apply_filters(select(Payment), filters)
+    if cursor is not None:
+        stmt = stmt.where(
+            tuple_(Payment.created_at, Payment.id) > decode_cursor(cursor))
+    stmt = stmt.order_by(Payment.created_at, Payment.id).limit(limit + 1)
+
+    rows = list((await db.scalars(stmt)).all())
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+async def get_payment_cached(
     payment_id: int,
-    new_status: PaymentStatus,
     db: AsyncSession,
-) -> Payment | None:
-    result = await db.execute(
-        select(Payment).where(Payment.id == payment_id))
-    payment = result.scalar_one_or_none()
+) -> PaymentRead | None:
+    """Read-through чтение через кэш платежей."""
+    cache = get_payment_cache()
+    cached = await cache.get(payment_id)
+    if cached is not None:
+        return cached
 
-    if not payment:
+    payment = await get_payment(payment_id, db)
+    if payment is None:
         return None
 
-    old_status = payment.status
-    if isinstance(old_status, str):
-        old_status = PaymentStatus(old_status)
+    data = PaymentRead.model_validate(payment)
+    if not is_replica(db):
+        # снимок с отстающей реплики в кэш не кладём: иначе устаревший
+        # статус прожил бы весь TTL, а не время лага
+        await cache.set(data)
+    return data
+
+
+def transition_stmt(locked: CTE, new_status: PaymentStatus) -> Update:
+    """UPDATE строк locked в new_status там, где переход разрешён.
+
+    locked — CTE с id, created_at и status, выбранными FOR UPDATE: статус
+    проверяется уже под блокировкой. RETURNING — платёж, прежний статус
+    и pg_notify для подписчиков других воркеров (уйдёт на commit).
+    """
+    # NOTIFY и при повторе того же статуса (confirm -> confirmed):
+    # подписчики отбрасывают его сами, а CASE вокруг стоил бы ~150 мкс
+    # на запрос
+    notify = (
+        notify_expr(get_payment_hub().origin)
+        if get_settings().PAYMENT_NOTIFY_ENABLED else null()
+    )
+    return (
+        update(Payment)
+        .where(
+            Payment.id == locked.c.id,
+            Payment.created_at == locked.c.created_at,
+            locked.c.status.in_(ALLOWED_FROM[new_status]),
+        )
+        # часы БД, как у created_at: по updated_at идёт пересчёт итогов
+        .values(status=new_status, updated_at=func.now())
+        .returning(Payment, locked.c.status, notify)
+        .execution_options(synchronize_session=False)
+    )
+
 
+async def commit_transitions(
+    db: AsyncSession,
+    rows: Sequence[Row[tuple[Payment, PaymentStatus, Any]]],
+    new_status: PaymentStatus,
+) -> None:
+    """События outbox для сменивших статус, commit, свежие снимки в кэш
+    и подписчикам этого процесса."""
+    event_type = status_event_type(new_status)
+    for payment, old_status, _ in rows:
+        if old_status != new_status:
+            add_payment_event(db, event_type, payment)
+    await db.commit()
+    cache = get_payment_cache()
+    hub = get_payment_hub()
+    for payment, old_status, _ in rows:
+        snapshot = PaymentRead.model_validate(payment)
+        await cache.set(snapshot)
+        if old_status != new_status:
+            hub.publish(snapshot)
+
+
+@timed("change_status")
+async def change_status(
+    payment_id: int,
+    new_status: PaymentStatus,
+    db: AsyncSession,
+) -> Payment | None:
     if isinstance(new_status, str):
         new_status = PaymentStatus(new_status)
+    if new_status == PaymentStatus.REFUNDED:
+        # возврат пишет журнал и refunded_minor: app/services/refunds.py
+        raise ValueError("refunds go through refund_payment")
 
-    allowed = ALLOWED_TRANSITIONS.get(old_status, set())
+    # Проверка перехода и запись — один условный UPDATE: параллельные
+    # confirm/fail/refund сериализуются блокировкой строки в Postgres,
+    # и проигравший просто не находит строку в допустимом статусе.
+    old = (
+        select(Payment.id, Payment.created_at, Payment.status)
+        .where(
+            Payment.id == payment_id,
+            Payment.created_at == _created_at_of(payment_id),
+        )
+        .with_for_update()
+        .cte("old")
+    )
+    row = (await db.execute(transition_stmt(old, new_status))).one_or_none()
 
-    if new_status not in allowed:
+    if row is None:
+        # Медленный путь: отличаем "нет платежа" от "запрещённый переход".
+        old_status = await db.scalar(select(Payment.status).where(
+            Payment.id == payment_id,
+            Payment.created_at == _created_at_of(payment_id),
+        ))
+        await db.rollback()
+        if old_status is None:
+            return None
+        INVALID_TRANSITIONS.labels(new_status.value).inc()
         raise InvalidStatusTransitionError(
             f"{old_status} -> {new_status} is not allowed")
 
-    payment.status = new_status
-    await db.commit()
-    await db.refresh(payment)
-    return payment
+    await commit_transitions(db, [row], new_status)
+    return row[0]
+
+
+async def confirm_payment(
+    payment_id: int,
+    db: AsyncSession,
+) -> Payment | PaymentRead | None:
+    """Списать у провайдера и перевести в CONFIRMED; отказ — в FAILED.
+
+    Провайдер вызывается без соединения с БД: платёж читается, транзакция
+    закрывается, и переход применяет change_status уже после ответа.
+    Если статус за это время сменился (истёк, отклонён), переход
+    отклоняется как обычно, а списание отменяется (void).
+    ProviderUnavailableError — платёж не тронут, confirm можно повторить.
+    """
+    payment = await get_payment(payment_id, db)
+    snapshot = None if payment is None else PaymentRead.model_validate(payment)
+    # соединение — обратно в пул до ответа провайдера (rollback заодно
+    # expire-ит payment, дальше — только snapshot)
+    await db.rollback()
+    if snapshot is None:
+        return None
+    if snapshot.status == PaymentStatus.CONFIRMED:
+        # повтор confirm: второй раз не списываем
+        return snapshot
+    if snapshot.status not in ALLOWED_FROM[PaymentStatus.CONFIRMED]:
+        INVALID_TRANSITIONS.labels(PaymentStatus.CONFIRMED.value).inc()
+        raise InvalidStatusTransitionError(
+            f"{snapshot.status} -> {PaymentStatus.CONFIRMED} is not allowed")
+
+    gateway = get_provider_gateway()
+    if await gateway.capture(snapshot) == CaptureOutcome.DECLINED:
+        try:
+            failed = await change_status(payment_id, PaymentStatus.FAILED, db)
+        except InvalidStatusTransitionError:
+            # параллельный confirm уже перевёл его в FAILED
+            failed = None
+        raise PaymentDeclinedError(failed)
+
+    try:
+        return await change_status(payment_id, PaymentStatus.CONFIRMED, db)
+    except InvalidStatusTransitionError:
+        await gateway.void(snapshot)
+        raise
+
+
+async def watch_payment(
+    payment_id: int,
+    session_factory: async_sessionmaker[AsyncSession],
+    idle: float,
+) -> AsyncIterator[PaymentRead | None]:
+    """Снимок платежа, затем каждый новый статус до терминального.
+
+    Без изменений дольше idle секунд отдаёт None (keepalive / конец
+    long-poll). Нет платежа — ничего не отдаёт. session_factory нужна
+    только на чтения: первое и после пропуска уведомлений, — ожидание
+    соединения не держит. Читать нужно с primary: реплика может отдать
+    статус до изменения, уведомление о котором уже ушло.
+    """
+    async def read() -> PaymentRead | None:
+        async with session_factory() as db:
+            payment = await get_payment(payment_id, db)
+        return None if payment is None else PaymentRead.model_validate(payment)
+
+    async with get_payment_hub().subscribe(payment_id) as updates:
+        last = await read()
+        if last is None:
+            return
+        yield last
+        while last.status not in TERMINAL_STATUSES:
+            try:
+                update = await asyncio.wait_for(updates.get(), timeout=idle)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if update is None:
+                update = await read()
+                if update is None:
+                    return
+            # тот же статус — повтор (своё уведомление или перечитали);
+            # updated_at раньше — устаревшее
+            if (update.status == last.status
+                    or update.updated_at < last.updated_at):
+                continue
+            last = update
+            yield last
@@ -0,0 +1,225 @@
+"""Платёжные провайдеры: списание при confirm.
+
+Адаптер — PaymentProvider: capture списывает средства, void отменяет
+списание, которое не удалось применить к платежу. Провайдер выбирается
+по Payment.provider. Вызовы идут через ProviderGateway: у каждого
+провайдера свой предел одновременных вызовов и таймаут на ожидание
+места и сам вызов вместе, поэтому медленный провайдер копит не больше
+concurrency запросов и не дольше timeout. Соединение с БД на время
+вызова не держится (app.services.payments.confirm_payment).
+"""
+import asyncio
+import enum
+import hashlib
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterable
+
+from app.core.config import get_settings
+from app.core.metrics import PROVIDER_CALL_DURATION, PROVIDER_CALLS
+from app.schemas.payment import PaymentRead
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureOutcome(str, enum.Enum):
+    CAPTURED = "captured"
+    DECLINED = "declined"
+
+
+class ProviderUnavailableError(Exception):
+    """Провайдер не дал ответа: таймаут, ошибка, нет свободного места.
+
+    Платёж остаётся pending, confirm можно повторить.
+    """
+
+
+class PaymentProvider(ABC):
+    """Адаптер провайдера.
+
+    capture для одного payment.id может прийти повторно (повтор confirm
+    после таймаута): провайдер должен списывать один раз — payment.id
+    и есть ключ идемпотентности.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def capture(self, payment: PaymentRead) -> CaptureOutcome:
+        ...
+
+    @abstractmethod
+    async def void(self, payment: PaymentRead) -> None:
+        ...
+
+
+class FakeProvider(PaymentProvider):
+    """Локальный провайдер без сети, детерминированный по seed.
+
+    Отказ (declined) и задержка — функция payment.id: повтор даёт тот же
+    ответ. Сбои (ProviderUnavailableError) — из последовательности
+    random.Random(seed): повтор confirm может пройти.
+    """
+
+    def __init__(
+        self,
+        name: str = "fake",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        decline_rate: float = 0.0,
+        seed: str = "fake",
+    ):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self.seed = seed
+        self._failures = random.Random(seed)
+        self.captured: set[int] = set()
+        self.voided: set[int] = set()
+
+    def _roll(self, payment_id: int, salt: str) -> float:
+        """Число из [0, 1), постоянное для (seed, salt, payment_id)."""
+        digest = hashlib.blake2b(
+            f"{self.seed}:{salt}:{payment_id}".encode(), digest_size=8)
+        return int.from_bytes(digest.digest()) / 2**64
+
+    async def capture(self, payment: PaymentRead) -> CaptureOutcome:
+        delay = self.latency + self.jitter * self._roll(payment.id, "latency")
+        if delay:
+            await asyncio.sleep(delay)
+        if self._failures.random() < self.failure_rate:
+            raise ProviderUnavailableError(f"{self.name}: simulated failure")
+        if self._roll(payment.id, "decline") < self.decline_rate:
+            return CaptureOutcome.DECLINED
+        self.captured.add(payment.id)
+        return CaptureOutcome.CAPTURED
+
+    async def void(self, payment: PaymentRead) -> None:
+        self.voided.add(payment.id)
+
+
+@dataclass(frozen=True)
+class ProviderLimit:
+    concurrency: int
+    timeout: float
+
+
+def parse_provider_limits(value: str) -> dict[str, ProviderLimit]:
+    """ "fake=50/10, acme=20/2.5" -> {"fake": ProviderLimit(50, 10.0), ...}."""
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, sep, spec = item.strip().partition("=")
+        concurrency, slash, timeout = spec.partition("/")
+        if not sep or not slash or not name.strip():
+            raise ValueError(f"Invalid PROVIDER_LIMITS item: {item!r}")
+        limits[name.strip()] = ProviderLimit(int(concurrency), float(timeout))
+    return limits
+
+
+class ProviderGateway:
+    """Адаптеры по имени, каждый за своим семафором и таймаутом."""
+
+    def __init__(
+        self,
+        providers: Iterable[PaymentProvider],
+        default: ProviderLimit,
+        limits: dict[str, ProviderLimit] | None = None,
+    ):
+        self._default = default
+        self._limits = limits or {}
+        self._providers: dict[str, PaymentProvider] = {}
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        for provider in providers:
+            self.register(provider)
+
+    def register(self, provider: PaymentProvider) -> None:
+        limit = self.limit(provider.name)
+        self._providers[provider.name] = provider
+        self._slots[provider.name] = asyncio.Semaphore(limit.concurrency)
+
+    def limit(self, name: str) -> ProviderLimit:
+        return self._limits.get(name, self._default)
+
+    def provider(self, name: str) -> PaymentProvider:
+        try:
+            return self._providers[name]
+        except KeyError:
+            raise ProviderUnavailableError(f"unknown provider {name!r}")
+
+    async def capture(self, payment: PaymentRead) -> CaptureOutcome:
+        return await self._call(
+            self.provider(payment.provider), "capture", payment)
+
+    async def void(self, payment: PaymentRead) -> None:
+        """Отменить списание; ошибка только логируется."""
+        try:
+            await self._call(self.provider(payment.provider), "void", payment)
+        except ProviderUnavailableError:
+            logger.error(
+                "void of payment %s at %s failed", payment.id,
+                payment.provider, exc_info=True)
+
+    async def _call(self, provider: PaymentProvider, method: str, payment):
+        name = provider.name
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.limit(name).timeout):
+                async with self._slots[name]:
+                    result = await getattr(provider, method)(payment)
+        except TimeoutError:
+            PROVIDER_CALLS.labels(name, method, "timeout").inc()
+            raise ProviderUnavailableError(f"{name}: {method} timed out")
+        except ProviderUnavailableError:
+            PROVIDER_CALLS.labels(name, method, "error").inc()
+            raise
+        except Exception as exc:
+            PROVIDER_CALLS.labels(name, method, "error").inc()
+            raise ProviderUnavailableError(f"{name}: {method} failed") from exc
+        PROVIDER_CALL_DURATION.labels(name, method).observe(
+            time.perf_counter() - started)
+        PROVIDER_CALLS.labels(
+            name, method, result.value if result else "ok").inc()
+        return result
+
+
+def build_provider_gateway() -> ProviderGateway:
+    settings = get_settings()
+    fake = FakeProvider(
+        latency=settings.FAKE_PROVIDER_LATENCY_SECONDS,
+        jitter=settings.FAKE_PROVIDER_JITTER_SECONDS,
+        failure_rate=settings.FAKE_PROVIDER_FAILURE_RATE,
+        decline_rate=settings.FAKE_PROVIDER_DECLINE_RATE,
+        seed=settings.FAKE_PROVIDER_SEED,
+    )
+    return ProviderGateway(
+        [fake],
+        ProviderLimit(
+            settings.PROVIDER_MAX_CONCURRENCY,
+            settings.PROVIDER_TIMEOUT_SECONDS,
+        ),
+        parse_provider_limits(settings.PROVIDER_LIMITS),
+    )
+
+
+_gateway: ProviderGateway | None = None
+
+
+def get_provider_gateway() -> ProviderGateway:
+    global _gateway
+    if _gateway is None:
+        _gateway = build_provider_gateway()
+    return _gateway
+
+
+def set_provider_gateway(gateway: ProviderGateway | None) -> None:
+    """Подменить провайдеров (тесты) или сбросить к настройкам (None)."""
+    global _gateway
+    _gateway = gateway
@@ -0,0 +1,287 @@
+"""Возвраты: частичные и полные, по одному и пачкой.
+
+Каждый возврат — строка журнала payment_refunds; payments.refunded_minor
+хранит их сумму, поэтому GET платежа журнал не читает. Остаток
+проверяется под блокировкой строк платежей (FOR UPDATE в порядке id —
+встречные пачки не ловят deadlock), так что параллельные возвраты одного
+платежа не превысят его amount. Когда возвращено всё, платёж переходит
+в REFUNDED (CONFIRMED -> REFUNDED из ALLOWED_TRANSITIONS).
+
+Пачка — одна транзакция: одна блокировка, один INSERT в журнал и один
+UPDATE платежей на всю пачку.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    case,
+    column,
+    func,
+    insert,
+    literal,
+    null,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import INVALID_TRANSITIONS, timed
+from app.core.money import InvalidAmountError, to_minor
+from app.models.idempotency import IdempotencyKey
+from app.models.payment import Payment, PaymentStatus
+from app.models.refund import PaymentRefund
+from app.schemas.payment import PaymentRead, RefundBatchItem, RefundOutcome
+from app.services.cache import get_payment_cache
+from app.services.notifications import get_payment_hub, notify_expr
+from app.services.outbox import (
+    EVENT_PARTIALLY_REFUNDED,
+    add_payment_event,
+    status_event_type,
+)
+from app.services.payments import ALLOWED_FROM, payment_keys
+
+REFUNDABLE = frozenset(ALLOWED_FROM[PaymentStatus.REFUNDED])
+
+
+def _minor(amount: Decimal, currency: str) -> int | None:
+    """Сумма в минорных единицах; None — точнее экспоненты валюты."""
+    try:
+        return to_minor(amount, currency)
+    except InvalidAmountError:
+        return None
+
+
+@dataclass
+class _Balance:
+    """Состояние платежа по ходу пачки."""
+    status: PaymentStatus
+    currency: str
+    amount: int  # в минорных единицах
+    refunded: int
+
+    @property
+    def remaining(self) -> int:
+        return self.amount - self.refunded
+
+
+@dataclass(frozen=True)
+class RefundResult:
+    outcome: RefundOutcome
+    refund: PaymentRefund | None = None
+    payment: Payment | None = None
+
+
+async def _lock_payments(
+    db: AsyncSession,
+    payment_ids: list[int],
+) -> dict[int, Payment]:
+    # created_at из ключей: условие по (id, created_at) отсекает секции
+    pairs = (await db.execute(
+        select(IdempotencyKey.payment_id, IdempotencyKey.created_at)
+        .where(IdempotencyKey.payment_id.in_(payment_ids))
+    )).all()
+    if not pairs:
+        return {}
+    keys = payment_keys(pairs)
+    payments = (await db.scalars(
+        select(Payment)
+        .where(
+            Payment.id == keys.c.id,
+            Payment.created_at == keys.c.created_at,
+        )
+        .order_by(Payment.id)
+        .with_for_update(of=Payment)
+        .execution_options(populate_existing=True)
+    )).all()
+    return {p.id: p for p in payments}
+
+
+def _apply_stmt(totals: dict[int, tuple[Payment, int]]):
+    """UPDATE refunded_minor пачкой; REFUNDED там, где возвращено всё."""
+    new = values(
+        column("id", BigInteger),
+        column("created_at", DateTime(timezone=True)),
+        column("refunded_minor", BigInteger),
+        name="new",
+    ).data([
+        (p.id, p.created_at, refunded)
+        for p, refunded in totals.values()
+    ])
+    notify = (
+        notify_expr(get_payment_hub().origin)
+        if get_settings().PAYMENT_NOTIFY_ENABLED else null()
+    )
+    return (
+        update(Payment)
+        .where(
+            Payment.id == new.c.id,
+            Payment.created_at == new.c.created_at,
+        )
+        .values(
+            refunded_minor=new.c.refunded_minor,
+            status=case(
+                (new.c.refunded_minor >= Payment.amount_minor,
+                 literal(PaymentStatus.REFUNDED, Payment.status.type)),
+                else_=Payment.status,
+            ),
+            updated_at=func.now(),
+        )
+        .returning(Payment, notify)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@timed("refund_payments")
+async def refund_payments(
+    items: list[RefundBatchItem],
+    db: AsyncSession,
+) -> list[RefundResult]:
+    """Возвраты items в одной транзакции; результаты в порядке items.
+
+    Повтор idempotency_key с тем же платежом и суммой (или без суммы) —
+    REPLAYED с прежней строкой журнала, с другими — CONFLICT.
+    """
+    payments = await _lock_payments(
+        db, sorted({item.payment_id for item in items}))
+    # ключи — после блокировки: повтор того же возврата ждёт первый
+    # на строке платежа и видит его ключ
+    keys = {item.idempotency_key for item in items if item.idempotency_key}
+    existing: dict[str, PaymentRefund] = {}
+    if keys:
+        existing = {
+            r.idempotency_key: r for r in (await db.scalars(
+                select(PaymentRefund)
+                .where(PaymentRefund.idempotency_key.in_(keys))
+            )).all()
+        }
+    # ключ -> (платёж, валюта, сумма, строка журнала или индекс в new_rows)
+    known: dict[str, tuple[int, str, int, PaymentRefund | int]] = {
+        key: (r.payment_id, r.currency, r.amount_minor, r)
+        for key, r in existing.items()
+    }
+
+    balances = {
+        p.id: _Balance(p.status, p.currency, p.amount_minor, p.refunded_minor)
+        for p in payments.values()
+    }
+    planned: list[tuple[RefundOutcome, PaymentRefund | int | None]] = []
+    new_rows: list[dict] = []
+    for item in items:
+        key = item.idempotency_key
+        if key is not None and key in known:
+            payment_id, currency, amount, refund = known[key]
+            if payment_id == item.payment_id and (
+                    item.amount is None
+                    or _minor(item.amount, currency) == amount):
+                planned.append((RefundOutcome.REPLAYED, refund))
+            else:
+                planned.append((RefundOutcome.CONFLICT, None))
+            continue
+
+        balance = balances.get(item.payment_id)
+        if balance is None:
+            planned.append((RefundOutcome.NOT_FOUND, None))
+            continue
+        if balance.status not in REFUNDABLE:
+            INVALID_TRANSITIONS.labels(PaymentStatus.REFUNDED.value).inc()
+            planned.append((RefundOutcome.INVALID_STATUS, None))
+            continue
+        amount = (
+            balance.remaining if item.amount is None
+            else _minor(item.amount, balance.currency))
+        if amount is None:
+            planned.append((RefundOutcome.INVALID_AMOUNT, None))
+            continue
+        if amount > balance.remaining:
+            planned.append((RefundOutcome.EXCEEDS_BALANCE, None))
+            continue
+
+        balance.refunded += amount
+        if balance.remaining == 0:
+            balance.status = PaymentStatus.REFUNDED
+        new_rows.append({
+            "payment_id": item.payment_id,
+            "amount_minor": amount,
+            "currency": balance.currency,
+            "idempotency_key": key,
+        })
+        if key is not None:
+            known[key] = (
+                item.payment_id, balance.currency, amount, len(new_rows) - 1)
+        planned.append((RefundOutcome.REFUNDED, len(new_rows) - 1))
+
+    refunds: list[PaymentRefund] = []
+    updated: list[Payment] = []
+    if new_rows:
+        refunds = list((await db.scalars(
+            insert(PaymentRefund).returning(
+                PaymentRefund, sort_by_parameter_order=True),
+            new_rows,
+        )).all())
+        totals = {
+            pid: (payments[pid], balances[pid].refunded)
+            for pid in sorted({row["payment_id"] for row in new_rows})
+        }
+        updated = list((await db.scalars(
+            select(Payment)
+            .from_statement(_apply_stmt(totals))
+            .execution_options(populate_existing=True)
+        )).all())
+        # одно событие на платёж, а не на строку журнала
+        for payment in updated:
+            add_payment_event(
+                db,
+                status_event_type(payment.status)
+                if payment.status == PaymentStatus.REFUNDED
+                else EVENT_PARTIALLY_REFUNDED,
+                payment,
+            )
+    await db.commit()
+
+    cache = get_payment_cache()
+    hub = get_payment_hub()
+    for payment in updated:
+        snapshot = PaymentRead.model_validate(payment)
+        await cache.set(snapshot)
+        if payment.status == PaymentStatus.REFUNDED:
+            hub.publish(snapshot)
+
+    return [
+        RefundResult(
+            outcome,
+            refunds[refund] if isinstance(refund, int) else refund,
+            payments.get(item.payment_id),
+        )
+        for item, (outcome, refund) in zip(items, planned)
+    ]
+
+
+async def refund_payment(
+    payment_id: int,
+    amount: Decimal | None,
+    idempotency_key: str | None,
+    db: AsyncSession,
+) -> RefundResult:
+    """Один возврат; amount=None — весь остаток."""
+    [result] = await refund_payments([RefundBatchItem(
+        payment_id=payment_id,
+        amount=amount,
+        idempotency_key=idempotency_key,
+    )], db)
+    return result
+
+
+@timed("list_refunds")
+async def list_refunds(
+    payment_id: int,
+    db: AsyncSession,
+) -> list[PaymentRefund]:
+    return list((await db.scalars(
+        select(PaymentRefund)
+        .where(PaymentRefund.payment_id == payment_id)
+        .order_by(PaymentRefund.id)
+    )).all())
@@ -0,0 +1,279 @@
+"""Дневные итоги платежей (GET /payments/stats).
+
+payment_daily_stats хранит count и sum(amount_minor) по (день UTC, валюта,
+статус); эндпоинт читает только её, поэтому отвечает за одно и то же
+время при любом размере payments.
+
+Итоги не обновляются в транзакции create_payment / change_status: все
+новые платежи дня попадали бы в одну строку (сегодня, USD, pending),
+и запись сериализовалась бы на её блокировке. Вместо этого
+refresh_stats пересчитывает целиком дни, где с прошлого раза менялись
+платежи (updated_at > водяной знак). Водяной знак — начало транзакции
+пересчёта; транзакции записи, начатые раньше, но закоммиченные позже,
+подхватываются запасом overlap. Пересчёт дня идемпотентен, поэтому
+повторно пересчитать день безопасно.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import timed
+from app.models.payment import Payment, PaymentStatus
+from app.models.stats import PaymentDailyStats, PaymentStatsWatermark
+from app.schemas.payment import PaymentStatsFilters
+from app.services.fx import RateTable, UnknownRateError
+
+logger = logging.getLogger(__name__)
+
+ONE_DAY = timedelta(days=1)
+
+
+class InvalidStatsRangeError(ValueError):
+    pass
+
+
+def day_of(column):
+    return func.date(func.timezone("UTC", column))
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time(), tzinfo=timezone.utc)
+
+
+def _totals(day_from: date, day_to: date):
+    """SELECT день, валюта, статус, count, sum по payments за [day_from, day_to].
+
+    Границы по created_at, а не по day_of: так работают отсечение
+    секций и индекс (created_at, id).
+    """
+    day = day_of(Payment.created_at)
+    return (
+        select(
+            day.label("day"),
+            Payment.currency,
+            Payment.status,
+            func.count().label("payments"),
+            func.sum(Payment.amount_minor).label("amount_minor"),
+        )
+        .where(
+            Payment.created_at >= day_start(day_from),
+            Payment.created_at < day_start(day_to + ONE_DAY),
+        )
+        .group_by(day, Payment.currency, Payment.status)
+    )
+
+
+async def recompute_days(db: AsyncSession, days: list[date]) -> None:
+    for day in sorted(days):
+        await db.execute(
+            delete(PaymentDailyStats).where(PaymentDailyStats.day == day))
+        await db.execute(
+            PaymentDailyStats.__table__.insert().from_select(
+                ["day", "currency", "status", "payments", "amount_minor"],
+                _totals(day, day),
+            )
+        )
+
+
+async def _catch_up(
+    db: AsyncSession,
+    overlap: timedelta,
+    wait: bool,
+) -> list[date] | None:
+    """Пересчитать дни, изменённые после водяного знака, и сдвинуть его.
+
+    None — строка водяного знака занята другим пересчётом (wait=False).
+    """
+    watermark = await db.scalar(
+        select(PaymentStatsWatermark.watermark)
+        .where(PaymentStatsWatermark.id == 1)
+        .with_for_update(skip_locked=not wait)
+    )
+    if watermark is None:
+        return None
+
+    days = sorted((await db.scalars(
+        select(day_of(Payment.created_at))
+        .where(Payment.updated_at > watermark - overlap)
+        .distinct()
+    )).all())
+    await recompute_days(db, days)
+    await db.execute(
+        update(PaymentStatsWatermark)
+        .where(PaymentStatsWatermark.id == 1)
+        .values(watermark=func.now())
+    )
+    return days
+
+
+@timed("refresh_stats")
+async def refresh_stats(
+    db: AsyncSession,
+    overlap: timedelta,
+) -> list[date] | None:
+    """Пересчитать дни, изменённые с прошлого раза; commit.
+
+    Возвращает пересчитанные дни; None — пересчёт уже идёт в другой
+    транзакции, этот вызов ничего не сделал.
+    """
+    days = await _catch_up(db, overlap, wait=False)
+    if days is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    return days
+
+
+async def run_stats_refresh(
+    session_factory: async_sessionmaker[AsyncSession],
+    overlap: timedelta,
+    interval: float,
+    stop: asyncio.Event,
+) -> None:
+    """Пересчитывать раз в interval секунд до stop."""
+    while not stop.is_set():
+        try:
+            async with session_factory() as db:
+                days = await refresh_stats(db, overlap)
+            if days:
+                logger.info("payment stats refreshed for %d days", len(days))
+        except Exception:
+            logger.exception("payment stats refresh failed")
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def stats_range(
+    filters: PaymentStatsFilters,
+    max_days: int,
+    today: date | None = None,
+) -> tuple[date, date]:
+    today = today or datetime.now(timezone.utc).date()
+    day_to = filters.day_to or today
+    day_from = filters.day_from or day_to - timedelta(days=29)
+    if day_from > day_to:
+        raise InvalidStatsRangeError("day_from is after day_to")
+    if (day_to - day_from).days >= max_days:
+        raise InvalidStatsRangeError(f"range is longer than {max_days} days")
+    return day_from, day_to
+
+
+@timed("get_stats")
+async def get_stats(
+    filters: PaymentStatsFilters,
+    max_days: int,
+    db: AsyncSession,
+) -> tuple[list[PaymentDailyStats], datetime]:
+    """Строки итогов за диапазон и водяной знак, по которому они посчитаны."""
+    day_from, day_to = stats_range(filters, max_days)
+    stmt = select(PaymentDailyStats).where(
+        PaymentDailyStats.day >= day_from,
+        PaymentDailyStats.day <= day_to,
+    )
+    if filters.currency is not None:
+        stmt = stmt.where(PaymentDailyStats.currency == filters.currency)
+    if filters.status is not None:
+        stmt = stmt.where(PaymentDailyStats.status == filters.status)
+    stmt = stmt.order_by(
+        PaymentDailyStats.day,
+        PaymentDailyStats.currency,
+        PaymentDailyStats.status,
+    )
+    rows = list((await db.scalars(stmt)).all())
+    as_of = await db.scalar(select(PaymentStatsWatermark.watermark))
+    return rows, as_of
+
+
+def convert_stats(
+    rows: list[PaymentDailyStats],
+    table: RateTable,
+    target: str,
+) -> list[int]:
+    """amount_minor строк в минорных единицах target.
+
+    Нет курса хоть одной валюты — UnknownRateError: сумма по строкам без
+    неё была бы неверной.
+    """
+    missing = sorted({row.currency for row in rows} - table.rates.keys())
+    if missing:
+        raise UnknownRateError(f"no FX rate for {', '.join(missing)}")
+    return [
+        table.convert(row.amount_minor, row.currency, target) for row in rows]
+
+
+@dataclass(frozen=True)
+class StatsMismatch:
+    day: date
+    currency: str
+    status: PaymentStatus
+    # (payments, amount_minor); None — строки нет
+    rollup: tuple[int, int] | None
+    actual: tuple[int, int] | None
+
+
+@timed("reconcile_stats")
+async def reconcile_stats(
+    db: AsyncSession,
+    day_from: date,
+    day_to: date,
+    overlap: timedelta,
+    fix: bool = False,
+) -> list[StatsMismatch]:
+    """Сверить итоги за [day_from, day_to] с полным пересчётом по payments.
+
+    Сначала обычный refresh_stats, затем сравнение в том же снимке
+    (REPEATABLE READ), чтобы свежие записи не давали ложных расхождений.
+    fix — пересчитать дни с расхождениями; commit в любом случае.
+    """
+    await db.connection(
+        execution_options={"isolation_level": "REPEATABLE READ"})
+    await _catch_up(db, overlap, wait=True)
+
+    actual = _totals(day_from, day_to).subquery("actual")
+    rollup = (
+        select(PaymentDailyStats)
+        .where(
+            PaymentDailyStats.day >= day_from,
+            PaymentDailyStats.day <= day_to,
+        )
+        .subquery("rollup")
+    )
+    on = (
+        (rollup.c.day == actual.c.day)
+        & (rollup.c.currency == actual.c.currency)
+        & (rollup.c.status == actual.c.status)
+    )
+    rows = (await db.execute(
+        select(
+            func.coalesce(rollup.c.day, actual.c.day).label("day"),
+            func.coalesce(rollup.c.currency, actual.c.currency).label("currency"),
+            func.coalesce(rollup.c.status, actual.c.status).label("status"),
+            rollup.c.payments, rollup.c.amount_minor,
+            actual.c.payments, actual.c.amount_minor,
+        )
+        .select_from(rollup.join(actual, on, full=True))
+        .where(
+            rollup.c.payments.is_distinct_from(actual.c.payments)
+            | rollup.c.amount_minor.is_distinct_from(actual.c.amount_minor)
+        )
+        .order_by("day", "currency", "status")
+    )).all()
+    mismatches = [
+        StatsMismatch(
+            day, currency, status,
+            None if r_count is None else (r_count, int(r_amount)),
+            None if a_count is None else (a_count, int(a_amount)),
+        )
+        for day, currency, status, r_count, r_amount, a_count, a_amount in rows
+    ]
+    if fix and mismatches:
+        await recompute_days(db, list({m.day for m in mismatches}))
+    await db.commit()
+    return mismatches
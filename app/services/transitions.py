@@ -0,0 +1,252 @@
+"""Массовая смена статусов по файлу сверки эквайера.
+
+Строки (id, status) применяются пачками по chunk_size: в пачке — по
+одной транзакции на целевой статус, и это один условный UPDATE
+(transition_stmt) по всем её id с проверкой ALLOWED_TRANSITIONS под
+блокировкой строк (FOR UPDATE в порядке id — встречные пачки не ловят
+deadlock). Пачки независимы: сбой посреди файла оставляет применёнными
+уже закоммиченные, а повтор файла для них даёт unchanged.
+
+confirmed здесь — без capture у провайдера: файл сверки означает, что
+эквайер уже списал средства. refunded — через refund_payments (весь
+остаток, с записью в журнал возвратов), а не прямым UPDATE статуса.
+"""
+import codecs
+import csv
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import BULK_TRANSITIONS, INVALID_TRANSITIONS, timed
+from app.models.idempotency import IdempotencyKey
+from app.models.payment import Payment, PaymentStatus
+from app.schemas.payment import (
+    RefundBatchItem,
+    RefundOutcome,
+    TransitionItem,
+    TransitionOutcome,
+    TransitionResult,
+)
+from app.services.payments import (
+    commit_transitions,
+    payment_keys,
+    transition_stmt,
+)
+from app.services.refunds import refund_payments
+
+
+class InvalidCsvError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class InvalidRow:
+    """Строка CSV, из которой не вышло TransitionItem."""
+    line: int
+
+
+async def items_from_list(
+    items: Iterable[TransitionItem],
+) -> AsyncIterator[TransitionItem]:
+    for item in items:
+        yield item
+
+
+async def read_csv_items(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[TransitionItem | InvalidRow]:
+    """Строки CSV с колонками id и status (порядок любой, лишние
+    игнорируются) по мере чтения тела запроса.
+
+    Без заголовка id,status — InvalidCsvError до первой строки данных.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    columns: tuple[int, int] | None = None
+    number = 0
+
+    def parse(text: str) -> TransitionItem | InvalidRow | None:
+        nonlocal columns
+        if not text.strip():
+            return None
+        [row] = csv.reader([text.rstrip("\r")])
+        if columns is None:
+            header = [name.strip().lower() for name in row]
+            if "id" not in header or "status" not in header:
+                raise InvalidCsvError("CSV header must have id and status")
+            columns = header.index("id"), header.index("status")
+            return None
+        try:
+            return TransitionItem(
+                id=int(row[columns[0]]),
+                status=PaymentStatus(row[columns[1]].strip().lower()),
+            )
+        except (ValueError, IndexError):
+            return InvalidRow(number)
+
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for text in lines:
+            number += 1
+            if (item := parse(text)) is not None:
+                yield item
+    buffer += decoder.decode(b"", final=True)
+    number += 1
+    if (item := parse(buffer)) is not None:
+        yield item
+    if columns is None:
+        raise InvalidCsvError("CSV header must have id and status")
+
+
+async def _transition(
+    ids: list[int],
+    target: PaymentStatus,
+    db: AsyncSession,
+) -> dict[int, TransitionResult]:
+    results = {
+        pid: TransitionResult(id=pid, outcome=TransitionOutcome.NOT_FOUND)
+        for pid in ids
+    }
+    # created_at из ключей: условие по (id, created_at) отсекает секции
+    pairs = (await db.execute(
+        select(IdempotencyKey.payment_id, IdempotencyKey.created_at)
+        .where(IdempotencyKey.payment_id.in_(ids))
+    )).all()
+    if not pairs:
+        await db.rollback()
+        return results
+
+    keys = payment_keys(pairs)
+    locked = (
+        select(Payment.id, Payment.created_at, Payment.status)
+        .where(
+            Payment.id == keys.c.id,
+            Payment.created_at == keys.c.created_at,
+        )
+        .order_by(Payment.id)
+        .with_for_update(of=Payment)
+        .cte("locked")
+    )
+    rows = (await db.execute(transition_stmt(locked, target))).all()
+    for payment, old_status, _ in rows:
+        results[payment.id] = TransitionResult(
+            id=payment.id,
+            outcome=(
+                TransitionOutcome.UNCHANGED if old_status == target
+                else TransitionOutcome.APPLIED
+            ),
+            status=target,
+        )
+
+    # не перешедшие: статус читается под той же блокировкой
+    changed = {payment.id for payment, _, _ in rows}
+    rest = [pair for pair in pairs if pair[0] not in changed]
+    if rest:
+        keys = payment_keys(rest)
+        statuses = (await db.execute(
+            select(Payment.id, Payment.status)
+            .where(
+                Payment.id == keys.c.id,
+                Payment.created_at == keys.c.created_at,
+            )
+        )).all()
+        for pid, status in statuses:
+            if status == target:
+                outcome = TransitionOutcome.UNCHANGED
+            else:
+                INVALID_TRANSITIONS.labels(target.value).inc()
+                outcome = TransitionOutcome.INVALID_STATUS
+            results[pid] = TransitionResult(
+                id=pid, outcome=outcome, status=status)
+
+    await commit_transitions(db, rows, target)
+    return results
+
+
+async def _refund(
+    ids: list[int],
+    db: AsyncSession,
+) -> dict[int, TransitionResult]:
+    results = await refund_payments(
+        [RefundBatchItem(payment_id=pid) for pid in ids], db)
+    out = {}
+    for pid, result in zip(ids, results):
+        payment = result.payment
+        if result.outcome == RefundOutcome.REFUNDED:
+            outcome = TransitionOutcome.APPLIED
+        elif payment is None:
+            outcome = TransitionOutcome.NOT_FOUND
+        elif payment.status == PaymentStatus.REFUNDED:
+            outcome = TransitionOutcome.UNCHANGED
+        else:
+            outcome = TransitionOutcome.INVALID_STATUS
+        out[pid] = TransitionResult(
+            id=pid,
+            outcome=outcome,
+            status=None if payment is None else payment.status,
+        )
+    return out
+
+
+@timed("apply_transitions")
+async def apply_transitions(
+    items: list[TransitionItem],
+    db: AsyncSession,
+) -> dict[int, TransitionResult]:
+    """Одна пачка с разными id; транзакция на каждый целевой статус."""
+    by_target: dict[PaymentStatus, list[int]] = defaultdict(list)
+    for item in items:
+        by_target[item.status].append(item.id)
+
+    results: dict[int, TransitionResult] = {}
+    for target, ids in by_target.items():
+        if target == PaymentStatus.REFUNDED:
+            results.update(await _refund(ids, db))
+        else:
+            results.update(await _transition(ids, target, db))
+    return results
+
+
+async def bulk_transitions(
+    rows: AsyncIterable[TransitionItem | InvalidRow],
+    db: AsyncSession,
+    chunk_size: int,
+) -> list[TransitionResult]:
+    """Применить rows пачками по chunk_size; результаты в порядке rows.
+
+    Пачка применяется, как только набралась, — CSV не читается в память
+    целиком. Повтор id в запросе — duplicate, применяется первое вхождение.
+    """
+    results: list[TransitionResult | None] = []
+    seen: set[int] = set()
+    chunk: list[tuple[int, TransitionItem]] = []
+
+    async def flush() -> None:
+        applied = await apply_transitions([item for _, item in chunk], db)
+        for index, item in chunk:
+            results[index] = applied[item.id]
+        chunk.clear()
+
+    async for row in rows:
+        if isinstance(row, InvalidRow):
+            results.append(TransitionResult(
+                id=None, outcome=TransitionOutcome.INVALID_ROW, line=row.line))
+        elif row.id in seen:
+            results.append(TransitionResult(
+                id=row.id, outcome=TransitionOutcome.DUPLICATE))
+        else:
+            seen.add(row.id)
+            chunk.append((len(results), row))
+            results.append(None)
+            if len(chunk) >= chunk_size:
+                await flush()
+    if chunk:
+        await flush()
+
+    for outcome, count in Counter(r.outcome for r in results).items():
+        BULK_TRANSITIONS.labels(outcome.value).inc(count)
+    return results
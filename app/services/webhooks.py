@@ -0,0 +1,350 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import secrets
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import Settings
+from app.models.webhook import WebhookEndpoint
+from app.services.outbox import EventSink, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_EVENT_TYPES = frozenset({
+    "payment.confirmed",
+    "payment.failed",
+    "payment.refunded",
+    "payment.partially_refunded",
+})
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+
+# 4xx, которые имеет смысл повторять; остальные 4xx — окончательный отказ.
+RETRYABLE_CLIENT_ERRORS = frozenset({408, 409, 425, 429})
+
+
+def new_secret() -> str:
+    return secrets.token_hex(32)
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """HMAC-SHA256 от "<timestamp>.<body>"."""
+    message = f"{timestamp}.".encode() + body
+    digest = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(
+    secret: str,
+    timestamp: int,
+    body: bytes,
+    signature: str,
+) -> bool:
+    return hmac.compare_digest(sign(secret, timestamp, body), signature)
+
+
+@dataclass
+class WebhookDelivery:
+    endpoint_id: int
+    url: str
+    secret: str
+    event_id: int
+    event_type: str
+    body: bytes
+    attempt: int = 0
+
+
+class CircuitBreaker:
+    """Предохранитель на один endpoint.
+
+    После threshold неудач подряд размыкается на reset_timeout секунд:
+    доставки на endpoint не отправляются вовсе. Затем пропускает одну
+    пробную попытку (half-open): успех замыкает цепь, неудача снова
+    размыкает.
+    """
+
+    def __init__(
+        self,
+        threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = self._clock()
+
+
+class WebhookDispatcher:
+    """Пул из concurrency воркеров поверх общего httpx.AsyncClient.
+
+    Медленный endpoint не держит весь пул: у каждой попытки таймаут,
+    одновременно на один endpoint идёт не больше max_in_flight_per_endpoint
+    запросов, а повтор ждёт в таймере event loop, а не в воркере.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        concurrency: int,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        max_in_flight_per_endpoint: int,
+        breaker_threshold: int,
+        breaker_reset: float,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_in_flight_per_endpoint = max_in_flight_per_endpoint
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self._rng = rng
+
+        self.stats: Counter[str] = Counter()
+        self._queue: asyncio.Queue[WebhookDelivery] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._timers: set[asyncio.TimerHandle] = set()
+        self._breakers: dict[int, CircuitBreaker] = {}
+        self._in_flight: Counter[int] = Counter()
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "WebhookDispatcher":
+        client = httpx.AsyncClient(
+            timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.WEBHOOK_CONCURRENCY,
+                max_keepalive_connections=settings.WEBHOOK_CONCURRENCY,
+            ),
+        )
+        return cls(
+            client,
+            concurrency=settings.WEBHOOK_CONCURRENCY,
+            max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+            backoff_base=settings.WEBHOOK_BACKOFF_BASE_SECONDS,
+            backoff_max=settings.WEBHOOK_BACKOFF_MAX_SECONDS,
+            max_in_flight_per_endpoint=(
+                settings.WEBHOOK_MAX_IN_FLIGHT_PER_ENDPOINT),
+            breaker_threshold=settings.WEBHOOK_BREAKER_THRESHOLD,
+            breaker_reset=settings.WEBHOOK_BREAKER_RESET_SECONDS,
+        )
+
+    def breaker(self, endpoint_id: int) -> CircuitBreaker:
+        if endpoint_id not in self._breakers:
+            self._breakers[endpoint_id] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_reset)
+        return self._breakers[endpoint_id]
+
+    def backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка с full jitter."""
+        cap = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return self._rng() * cap
+
+    async def start(self) -> None:
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.client.aclose()
+
+    def submit(self, delivery: WebhookDelivery) -> None:
+        self._pending += 1
+        self._idle.clear()
+        self._queue.put_nowait(delivery)
+
+    async def join(self) -> None:
+        """Дождаться, пока все принятые доставки завершатся (с повторами)."""
+        await self._idle.wait()
+
+    def _later(self, delay: float, delivery: WebhookDelivery) -> None:
+        loop = asyncio.get_running_loop()
+
+        def requeue() -> None:
+            self._timers.discard(timer)
+            self._queue.put_nowait(delivery)
+
+        timer = loop.call_later(delay, requeue)
+        self._timers.add(timer)
+
+    def _finish(self, delivery: WebhookDelivery, outcome: str) -> None:
+        self.stats[outcome] += 1
+        if outcome != "delivered":
+            logger.warning(
+                "webhook %s for event %s to endpoint %s %s after %s attempts",
+                delivery.event_type, delivery.event_id,
+                delivery.endpoint_id, outcome, delivery.attempt,
+            )
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _worker(self) -> None:
+        while True:
+            delivery = await self._queue.get()
+            try:
+                await self._handle(delivery)
+            except Exception:
+                logger.exception("webhook worker crashed on delivery")
+                self._finish(delivery, "dropped")
+
+    async def _handle(self, delivery: WebhookDelivery) -> None:
+        endpoint_id = delivery.endpoint_id
+        if self._in_flight[endpoint_id] >= self.max_in_flight_per_endpoint:
+            # endpoint уже занят — уступаем воркер другим получателям
+            self._later(0.05, delivery)
+            return
+
+        breaker = self.breaker(endpoint_id)
+        delivery.attempt += 1
+        if not breaker.allow():
+            self.stats["short_circuited"] += 1
+            self._retry_or_fail(delivery)
+            return
+
+        self._in_flight[endpoint_id] += 1
+        try:
+            ok, retryable = await self._send(delivery)
+        finally:
+            self._in_flight[endpoint_id] -= 1
+
+        if not retryable:
+            # endpoint ответил — он жив, даже если отказал в доставке
+            breaker.record_success()
+            self._finish(delivery, "delivered" if ok else "rejected")
+        else:
+            breaker.record_failure()
+            self._retry_or_fail(delivery)
+
+    def _retry_or_fail(self, delivery: WebhookDelivery) -> None:
+        if delivery.attempt >= self.max_attempts:
+            self._finish(delivery, "failed")
+            return
+        self.stats["retried"] += 1
+        self._later(self.backoff(delivery.attempt), delivery)
+
+    async def _send(self, delivery: WebhookDelivery) -> tuple[bool, bool]:
+        """(успех, имеет ли смысл повторять)."""
+        timestamp = int(time.time())
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Id": str(delivery.event_id),
+            "X-Webhook-Event": delivery.event_type,
+            TIMESTAMP_HEADER: str(timestamp),
+            SIGNATURE_HEADER: sign(delivery.secret, timestamp, delivery.body),
+        }
+        try:
+            response = await self.client.post(
+                delivery.url, content=delivery.body, headers=headers)
+        except httpx.HTTPError:
+            return False, True
+
+        code = response.status_code
+        if 200 <= code < 300:
+            return True, False
+        return False, code >= 500 or code in RETRYABLE_CLIENT_ERRORS
+
+
+def event_body(event: OutboxEvent) -> bytes:
+    return json.dumps({
+        "id": event.id,
+        "type": event.event_type,
+        "created_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }).encode()
+
+
+class WebhookSink(EventSink):
+    """Sink outbox relay: раскладывает события по подписанным endpoint'ам.
+
+    publish только ставит доставки в очередь диспетчера, поэтому медленные
+    получатели не задерживают relay. Доставки, принятые диспетчером, живут
+    в памяти процесса.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        dispatcher: WebhookDispatcher,
+    ):
+        self.session_factory = session_factory
+        self.dispatcher = dispatcher
+
+    async def publish(self, events: Sequence[OutboxEvent]) -> None:
+        relevant = [e for e in events if e.event_type in WEBHOOK_EVENT_TYPES]
+        if not relevant:
+            return
+
+        async with self.session_factory() as db:
+            endpoints = (await db.scalars(
+                select(WebhookEndpoint).where(WebhookEndpoint.is_active)
+            )).all()
+
+        for event in relevant:
+            body = event_body(event)
+            for endpoint in endpoints:
+                if endpoint.subscribes_to(event.event_type):
+                    self.dispatcher.submit(WebhookDelivery(
+                        endpoint_id=endpoint.id,
+                        url=endpoint.url,
+                        secret=endpoint.secret,
+                        event_id=event.id,
+                        event_type=event.event_type,
+                        body=body,
+                    ))
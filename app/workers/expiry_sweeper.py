@@ -0,0 +1,67 @@
+"""Истечение зависших PENDING-платежей.
+
+    python -m app.workers.expiry_sweeper
+    python -m app.workers.expiry_sweeper --once
+    python -m app.workers.expiry_sweeper --metrics-port 9102
+"""
+import argparse
+import asyncio
+import signal
+from datetime import timedelta
+
+from prometheus_client import start_http_server
+
+from app.core.config import get_settings
+from app.db import dispose_engine, get_engine
+from app.services.expiry import expire_pending, run_sweeper
+
+
+async def main(
+    max_age: float,
+    batch_size: int,
+    interval: float,
+    once: bool,
+) -> None:
+    _, session_factory = get_engine()
+    age = timedelta(seconds=max_age)
+    try:
+        if once:
+            total = 0
+            while True:
+                async with session_factory() as db:
+                    expired = await expire_pending(db, age, batch_size)
+                total += expired
+                if expired < batch_size:
+                    break
+            print(f"expired {total} payments")
+            return
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await run_sweeper(session_factory, age, batch_size, interval, stop)
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-age", type=float, default=settings.PAYMENT_PENDING_TTL_SECONDS,
+        help="seconds a payment may stay pending")
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.EXPIRY_BATCH_SIZE)
+    parser.add_argument(
+        "--interval", type=float, default=settings.EXPIRY_INTERVAL_SECONDS)
+    parser.add_argument(
+        "--once", action="store_true",
+        help="expire everything stale and exit (for cron)")
+    parser.add_argument(
+        "--metrics-port", type=int, default=0,
+        help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    asyncio.run(main(args.max_age, args.batch_size, args.interval, args.once))
@@ -0,0 +1,50 @@
+"""Очистка истёкших ключей идемпотентности.
+
+    python -m app.workers.idempotency_purge
+    python -m app.workers.idempotency_purge --once
+"""
+import argparse
+import asyncio
+import signal
+
+from app.core.config import get_settings
+from app.db import dispose_engine, get_engine
+from app.services.idempotency import purge_expired, run_purge
+
+
+async def main(batch_size: int, interval: float, once: bool) -> None:
+    _, session_factory = get_engine()
+    try:
+        if once:
+            total = 0
+            while True:
+                async with session_factory() as db:
+                    purged = await purge_expired(db, batch_size)
+                total += purged
+                if purged < batch_size:
+                    break
+            print(f"purged {total} keys")
+            return
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await run_purge(session_factory, batch_size, interval, stop)
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.IDEMPOTENCY_PURGE_BATCH_SIZE)
+    parser.add_argument(
+        "--interval", type=float,
+        default=settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+    parser.add_argument(
+        "--once", action="store_true",
+        help="purge everything expired and exit (for cron)")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.interval, args.once))
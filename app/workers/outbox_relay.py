@@ -0,0 +1,65 @@
+"""Relay outbox -> sink.
+
+    python -m app.workers.outbox_relay --file events.ndjson
+    python -m app.workers.outbox_relay --webhooks
+"""
+import argparse
+import asyncio
+import signal
+
+from app.core.config import get_settings
+from app.db import dispose_engine, get_engine
+from app.services.outbox import FileSink, run_relay
+from app.services.webhooks import WebhookDispatcher, WebhookSink
+
+# сколько ждать недоставленные вебхуки при остановке
+SHUTDOWN_DRAIN_SECONDS = 10
+
+
+async def main(
+    path: str | None,
+    batch_size: int,
+    poll_interval: float,
+) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    _, session_factory = get_engine()
+    dispatcher = None
+    if path is not None:
+        sink = FileSink(path)
+    else:
+        dispatcher = WebhookDispatcher.from_settings(get_settings())
+        await dispatcher.start()
+        sink = WebhookSink(session_factory, dispatcher)
+
+    try:
+        await run_relay(session_factory, sink, batch_size, poll_interval, stop)
+    finally:
+        if dispatcher is not None:
+            try:
+                await asyncio.wait_for(
+                    dispatcher.join(), timeout=SHUTDOWN_DRAIN_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            await dispatcher.stop()
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--file", help="NDJSON file sink")
+    target.add_argument(
+        "--webhooks", action="store_true",
+        help="deliver to registered webhook endpoints")
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+    parser.add_argument(
+        "--poll-interval", type=float,
+        default=settings.OUTBOX_POLL_INTERVAL_SECONDS)
+    args = parser.parse_args()
+    asyncio.run(main(args.file, args.batch_size, args.poll_interval))
@@ -0,0 +1,59 @@
+"""Обслуживание помесячных секций payments (cron, раз в сутки).
+
+    python -m app.workers.partitions
+    python -m app.workers.partitions --retain 24 --dry-run
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from app.core.config import get_settings
+from app.db import dispose_engine, get_engine
+from app.services.partitions import detach_old_partitions, ensure_partitions
+
+
+async def main(
+    ahead: int,
+    retain: int,
+    archive_schema: str | None,
+    dry_run: bool,
+) -> None:
+    engine, _ = get_engine()
+    today = datetime.now(timezone.utc).date()
+    prefix = "would " if dry_run else ""
+    try:
+        async with engine.connect() as conn:
+            # каждая команда — своя транзакция; DETACH CONCURRENTLY иначе нельзя
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for name in await ensure_partitions(conn, today, ahead, dry_run):
+                print(f"{prefix}create {name}")
+            if retain > 0:
+                for name in await detach_old_partitions(
+                    conn, today, retain, archive_schema, dry_run,
+                ):
+                    target = archive_schema or "drop"
+                    print(f"{prefix}detach {name} -> {target}")
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--ahead", type=int, default=settings.PARTITION_AHEAD_MONTHS,
+        help="months to create ahead of the current one")
+    parser.add_argument(
+        "--retain", type=int, default=settings.PARTITION_RETAIN_MONTHS,
+        help="months to keep attached; 0 keeps everything")
+    parser.add_argument(
+        "--drop", action="store_true",
+        help="drop detached partitions instead of archiving them")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(
+        args.ahead,
+        args.retain,
+        None if args.drop else settings.PARTITION_ARCHIVE_SCHEMA,
+        args.dry_run,
+    ))
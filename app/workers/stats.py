@@ -0,0 +1,91 @@
+"""Пересчёт и сверка дневных итогов платежей.
+
+    python -m app.workers.stats
+    python -m app.workers.stats --once
+    python -m app.workers.stats --reconcile --days 7 [--fix]
+
+--reconcile сравнивает итоги с полным пересчётом по payments и
+завершается с кодом 1, если нашлись расхождения (после --fix они
+исправлены, но код тот же — чтобы cron заметил).
+"""
+import argparse
+import asyncio
+import signal
+import sys
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import get_settings
+from app.db import dispose_engine, get_engine
+from app.services.stats import reconcile_stats, refresh_stats, run_stats_refresh
+
+
+async def main(
+    interval: float,
+    overlap: float,
+    once: bool,
+    reconcile_days: int | None,
+    fix: bool,
+) -> int:
+    _, session_factory = get_engine()
+    window = timedelta(seconds=overlap)
+    try:
+        if reconcile_days is not None:
+            day_to = datetime.now(timezone.utc).date()
+            day_from = day_to - timedelta(days=reconcile_days - 1)
+            async with session_factory() as db:
+                mismatches = await reconcile_stats(
+                    db, day_from, day_to, window, fix=fix)
+            for m in mismatches:
+                print(
+                    f"{m.day} {m.currency} {m.status.value}: "
+                    f"rollup={m.rollup} actual={m.actual}")
+            print(
+                f"{len(mismatches)} mismatches in {day_from}..{day_to}"
+                + (", fixed" if fix and mismatches else ""))
+            return 1 if mismatches else 0
+
+        if once:
+            async with session_factory() as db:
+                days = await refresh_stats(db, window)
+            if days is None:
+                print("refresh is already running elsewhere")
+            else:
+                print(f"refreshed {len(days)} days")
+            return 0
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await run_stats_refresh(session_factory, window, interval, stop)
+        return 0
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--interval", type=float,
+        default=settings.STATS_REFRESH_INTERVAL_SECONDS)
+    parser.add_argument(
+        "--overlap", type=float,
+        default=settings.STATS_WATERMARK_OVERLAP_SECONDS,
+        help="seconds to look back past the watermark")
+    parser.add_argument(
+        "--once", action="store_true",
+        help="refresh once and exit (for cron)")
+    parser.add_argument(
+        "--reconcile", action="store_true",
+        help="compare the rollup with payments and exit")
+    parser.add_argument(
+        "--days", type=int, default=7,
+        help="days to reconcile, ending today (UTC)")
+    parser.add_argument(
+        "--fix", action="store_true",
+        help="recompute days that do not match")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(
+        args.interval, args.overlap, args.once,
+        args.days if args.reconcile else None, args.fix)))
@@ -0,0 +1,80 @@
+"""Пропускная способность массовой смены статусов (строк в секунду).
+
+    DB_HOST=127.0.0.1 DB_PORT=5434 python -m bench.bench_bulk_transitions -n 20000
+
+Для сравнения --single гонит первые строки по одной через change_status,
+как шли бы вызовы POST /payments/{id}/confirm без провайдера.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+
+async def seed(session_factory, total: int) -> list[int]:
+    """total PENDING-платежей; их id."""
+    from app.schemas.payment import PaymentBatchItem
+    from app.services.payments import create_payments_batch
+
+    prefix = uuid.uuid4().hex
+    ids = []
+    async with session_factory() as db:
+        for start in range(0, total, 500):
+            results = await create_payments_batch([
+                PaymentBatchItem(
+                    idempotency_key=f"bench-bulk-{prefix}-{i}",
+                    order_id=i, amount="10", currency="USD")
+                for i in range(start, min(total, start + 500))
+            ], db)
+            ids.extend(payment.id for _, _, payment in results)
+    return ids
+
+
+async def main(total: int, sizes: list[int], single: int) -> None:
+    from app.db import dispose_engine, get_engine
+    from app.models.payment import PaymentStatus
+    from app.schemas.payment import TransitionItem
+    from app.services.payments import change_status
+    from app.services.transitions import bulk_transitions, items_from_list
+
+    _, session_factory = get_engine()
+
+    if single:
+        ids = await seed(session_factory, single)
+        started = time.perf_counter()
+        async with session_factory() as db:
+            for pid in ids:
+                await change_status(pid, PaymentStatus.CONFIRMED, db)
+        elapsed = time.perf_counter() - started
+        print(f"{'single':<12} rows={single:<6} {single / elapsed:>9.0f} rows/s")
+
+    for size in sizes:
+        ids = await seed(session_factory, total)
+        # половина confirmed, половина failed — две транзакции на пачку
+        items = [
+            TransitionItem(
+                id=pid,
+                status=PaymentStatus.CONFIRMED if i % 2
+                else PaymentStatus.FAILED)
+            for i, pid in enumerate(ids)
+        ]
+        started = time.perf_counter()
+        async with session_factory() as db:
+            results = await bulk_transitions(
+                items_from_list(items), db, size)
+        elapsed = time.perf_counter() - started
+        assert all(r.outcome.value == "applied" for r in results)
+        print(f"chunk={size:<6} rows={total:<6} {total / elapsed:>9.0f} rows/s")
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--total", type=int, default=20000)
+    parser.add_argument("--single", type=int, default=2000)
+    parser.add_argument(
+        "--sizes", type=lambda v: [int(x) for x in v.split(",")],
+        default=[100, 1000, 5000])
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.sizes, args.single))
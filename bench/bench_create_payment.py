@@ -0,0 +1,58 @@
+"""Латентность POST /api/v1/payments/ (новые платежи и повторы по ключу).
+
+    DB_HOST=127.0.0.1 DB_PORT=5434 python -m bench.bench_create_payment
+"""
+import argparse
+import asyncio
+import uuid
+
+from httpx import ASGITransport, AsyncClient
+
+from bench.common import print_row, run_concurrent
+
+
+async def main(total: int, concurrency: int) -> None:
+    from app.db import dispose_engine
+    from app.main import get_app
+
+    transport = ASGITransport(app=get_app())
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        run_id = uuid.uuid4().hex[:8]
+        body = {"order_id": 1, "amount": 10.0, "currency": "USD"}
+
+        async def create_new(i: int) -> None:
+            r = await client.post(
+                "/api/v1/payments/",
+                headers={"Idempotency-Key": f"bench-{run_id}-{i}"},
+                json=body,
+            )
+            assert r.status_code == 201, r.text
+
+        async def create_replay(i: int) -> None:
+            r = await client.post(
+                "/api/v1/payments/",
+                headers={"Idempotency-Key": f"bench-{run_id}-{i % 100}"},
+                json=body,
+            )
+            assert r.status_code == 200, r.text
+
+        # прогрев пула соединений; заодно создаёт ключи для replay
+        await run_concurrent(create_new, 100, concurrency)
+        replay_id, run_id = run_id, uuid.uuid4().hex[:8]
+
+        print_row("create (new)", await run_concurrent(create_new, total, concurrency))
+        run_id = replay_id
+        print_row(
+            "create (replay)",
+            await run_concurrent(create_replay, total, concurrency),
+        )
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--total", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.concurrency))
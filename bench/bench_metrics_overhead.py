@@ -0,0 +1,63 @@
+"""Накладные расходы метрик: GET /api/v1/payments/{id} с MetricsMiddleware
+и без неё (METRICS_ENABLED). Прогоны чередуются, чтобы сгладить шум.
+
+    DB_HOST=127.0.0.1 DB_PORT=5434 python -m bench.bench_metrics_overhead
+"""
+import argparse
+import asyncio
+import uuid
+
+from httpx import ASGITransport, AsyncClient
+
+from bench.common import print_row, run_concurrent
+
+
+async def main(total: int, concurrency: int, rounds: int) -> None:
+    from app.core.config import get_settings
+    from app.db import dispose_engine
+    from app.main import get_app
+
+    settings = get_settings()
+    apps = {
+        "metrics on": get_app(settings),
+        "metrics off": get_app(
+            settings.model_copy(update={"METRICS_ENABLED": False})),
+    }
+
+    clients = {
+        label: AsyncClient(transport=ASGITransport(app=app), base_url="http://bench")
+        for label, app in apps.items()
+    }
+    first = next(iter(clients.values()))
+    r = await first.post(
+        "/api/v1/payments/",
+        headers={"Idempotency-Key": f"bench-metrics-{uuid.uuid4().hex}"},
+        json={"order_id": 1, "amount": 10.0, "currency": "USD"},
+    )
+    path = f"/api/v1/payments/{r.json()['id']}"
+
+    def getter(client: AsyncClient):
+        async def get(i: int) -> None:
+            r = await client.get(path)
+            assert r.status_code == 200, r.text
+        return get
+
+    for client in clients.values():
+        await run_concurrent(getter(client), 200, concurrency)  # прогрев
+    for _ in range(rounds):
+        for label, client in clients.items():
+            print_row(
+                label, await run_concurrent(getter(client), total, concurrency))
+
+    for client in clients.values():
+        await client.aclose()
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--total", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-r", "--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.concurrency, args.rounds))
@@ -0,0 +1,74 @@
+"""Пропускная способность outbox relay при разных размерах пачки.
+
+    DB_HOST=127.0.0.1 DB_PORT=5434 python -m bench.bench_outbox_relay -n 20000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import insert
+
+
+async def seed(session_factory, total: int) -> None:
+    from app.models.event import PaymentEvent
+
+    payload = {
+        "id": 1, "order_id": 1, "amount": 10.0, "currency": "USD",
+        "status": "pending", "provider": "fake",
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "updated_at": "2026-01-01T00:00:00+00:00",
+    }
+    async with session_factory() as db:
+        for start in range(0, total, 5000):
+            await db.execute(insert(PaymentEvent), [
+                {"payment_id": i, "event_type": "payment.created",
+                 "payload": payload}
+                for i in range(start, min(total, start + 5000))
+            ])
+        await db.commit()
+
+
+async def drain(session_factory, sink, batch_size: int, relays: int) -> int:
+    from app.services.outbox import relay_batch
+
+    async def one() -> int:
+        total = 0
+        while True:
+            async with session_factory() as db:
+                delivered = await relay_batch(db, sink, batch_size)
+            if not delivered:
+                return total
+            total += delivered
+
+    return sum(await asyncio.gather(*(one() for _ in range(relays))))
+
+
+async def main(total: int, sizes: list[int], relays: int) -> None:
+    from app.db import dispose_engine, get_engine
+    from app.services.outbox import InMemorySink
+
+    _, session_factory = get_engine()
+    await drain(session_factory, InMemorySink(), 1000, 1)
+
+    for size in sizes:
+        await seed(session_factory, total)
+        started = time.perf_counter()
+        delivered = await drain(session_factory, InMemorySink(), size, relays)
+        elapsed = time.perf_counter() - started
+        print(
+            f"batch={size:<5} relays={relays} events={delivered:<6} "
+            f"{delivered / elapsed:>9.0f} events/s"
+        )
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--total", type=int, default=20000)
+    parser.add_argument("--relays", type=int, default=1)
+    parser.add_argument(
+        "--sizes", type=lambda v: [int(x) for x in v.split(",")],
+        default=[1, 10, 100, 500, 1000])
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.sizes, args.relays))
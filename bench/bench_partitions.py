@@ -0,0 +1,77 @@
+"""Поиск платежа по id и по ключу на секционированной payments.
+
+    DB_HOST=127.0.0.1 DB_PORT=5434 python -m bench.bench_partitions \\
+        --extra-partitions 60
+
+--extra-partitions добавляет на время прогона пустые секции в прошлом
+(с 2000-01), чтобы проверить, что поиск по id не растёт с их числом:
+лишние секции отсекаются при выполнении по created_at из ключей.
+"""
+import argparse
+import asyncio
+import random
+from datetime import date
+
+from sqlalchemy import select, text
+
+from bench.common import print_row, run_concurrent
+
+
+async def main(total: int, extra: int) -> None:
+    from app.db import dispose_engine, get_engine
+    from app.models.idempotency import IdempotencyKey
+    from app.models.payment import Payment
+    from app.services.partitions import MonthPartition, add_months
+    from app.services.payments import get_payment
+
+    engine, session_factory = get_engine()
+    extra_partitions = [
+        MonthPartition(add_months(date(2000, 1, 1), i)) for i in range(extra)]
+
+    async with engine.begin() as conn:
+        for partition in extra_partitions:
+            await conn.execute(text(partition.create_sql()))
+        rows = (await conn.execute(
+            select(IdempotencyKey.payment_id, IdempotencyKey.idempotency_key)
+            .order_by(IdempotencyKey.payment_id.desc())
+            .limit(20_000)
+        )).all()
+    sample = random.Random(0).choices(rows, k=total)
+
+    try:
+        async with session_factory() as db:
+            async def by_id(i: int) -> None:
+                assert await get_payment(sample[i][0], db) is not None
+
+            async def by_key(i: int) -> None:
+                payment = await db.scalar(
+                    select(Payment)
+                    .join(IdempotencyKey, IdempotencyKey.payment_id == Payment.id)
+                    .where(
+                        IdempotencyKey.idempotency_key == sample[i][1],
+                        IdempotencyKey.created_at == Payment.created_at,
+                    ))
+                assert payment is not None
+                db.expunge_all()
+
+            async def by_id_fresh(i: int) -> None:
+                await by_id(i)
+                db.expunge_all()
+
+            await run_concurrent(by_id_fresh, min(total, 500), 1)
+            label = f"+{extra} partitions"
+            print_row(f"get by id {label}", await run_concurrent(by_id_fresh, total, 1))
+            print_row(f"get by key {label}", await run_concurrent(by_key, total, 1))
+    finally:
+        async with engine.begin() as conn:
+            for partition in extra_partitions:
+                await conn.execute(text(f"DROP TABLE {partition.name}"))
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--total", type=int, default=3000)
+    parser.add_argument("--extra-partitions", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.extra_partitions))
@@ -0,0 +1,59 @@
+"""Пропускная способность сервисного слоя в зависимости от размера пула.
+
+    DB_HOST=127.0.0.1 DB_PORT=5434 python -m bench.bench_pool -c 32
+"""
+import argparse
+import asyncio
+import uuid
+
+from bench.common import print_row, run_concurrent
+
+
+async def run_pool(pool_size: int, pre_ping: bool, total: int, concurrency: int):
+    from app.core.config import get_settings
+    from app.db import build_engine
+    from app.schemas.payment import PaymentCreate
+    from app.services.payments import create_payment, get_payment
+
+    settings = get_settings().model_copy(update={
+        "DB_POOL_SIZE": pool_size,
+        "DB_MAX_OVERFLOW": 0,
+        "DB_POOL_PRE_PING": pre_ping,
+    })
+    engine, session_factory = build_engine(settings)
+    run_id = uuid.uuid4().hex[:8]
+    data = PaymentCreate(order_id=1, amount=10.0, currency="USD")
+    ids: list[int] = []
+
+    async def op(i: int) -> None:
+        async with session_factory() as db:
+            # 1 создание на 4 чтения — типичный профиль checkout-поллинга
+            if i % 5 == 0 or not ids:
+                payment, _ = await create_payment(data, f"pool-{run_id}-{i}", db)
+                ids.append(payment.id)
+            else:
+                await get_payment(ids[i % len(ids)], db)
+
+    await run_concurrent(op, concurrency * 4, concurrency)
+    stats = await run_concurrent(op, total, concurrency)
+    await engine.dispose()
+    return stats
+
+
+async def main(sizes: list[int], total: int, concurrency: int) -> None:
+    for pre_ping in (False, True):
+        for size in sizes:
+            stats = await run_pool(size, pre_ping, total, concurrency)
+            label = f"pool={size} pre_ping={'on' if pre_ping else 'off'}"
+            print_row(label, stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--total", type=int, default=5000)
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--sizes", type=lambda v: [int(x) for x in v.split(",")],
+        default=[1, 2, 5, 10, 20, 40])
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.total, args.concurrency))
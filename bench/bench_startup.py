@@ -0,0 +1,124 @@
+"""Холодный старт сервера и латентность первых запросов.
+
+    DB_HOST=127.0.0.1 DB_PORT=5434 python -m bench.bench_startup
+
+Для каждого варианта запуска: время от старта процесса до ответа
+/health, латентность первого GET /payments/{id} и первой пачки из
+--burst параллельных запросов (пул ещё пуст, если его не прогрели).
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from bench.common import percentile
+
+VARIANTS = {
+    # прежний docker-compose: один процесс с --reload, без lifespan
+    "uvicorn --reload": (
+        ["-m", "uvicorn", "app.main:app", "--reload", "--lifespan", "off"], {}),
+    "uvicorn, no lifespan": (
+        ["-m", "uvicorn", "app.main:app", "--lifespan", "off"], {}),
+    "app.server, 1 worker": (
+        ["-m", "app.server"], {"WEB_CONCURRENCY": "1"}),
+}
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen) -> None:
+    while True:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.005)
+
+
+async def run_variant(
+    args: list[str],
+    env: dict[str, str],
+    port: int,
+    payment_id: int,
+    burst: int,
+) -> dict[str, float]:
+    env = {
+        **os.environ, **env,
+        "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port),
+    }
+    if args[1] == "uvicorn":
+        args = [*args, "--host", "127.0.0.1", "--port", str(port),
+                "--log-level", "warning"]
+    limits = httpx.Limits(max_connections=burst)
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, *args], env=env)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30,
+        ) as client:
+            await wait_ready(client, server)
+            ready = time.perf_counter() - started
+
+            t = time.perf_counter()
+            r = await client.get(f"/api/v1/payments/{payment_id}")
+            assert r.status_code == 200, r.text
+            first = time.perf_counter() - t
+
+            async def one() -> float:
+                t = time.perf_counter()
+                r = await client.get(f"/api/v1/payments/{payment_id}")
+                assert r.status_code == 200, r.text
+                return time.perf_counter() - t
+
+            samples = await asyncio.gather(*(one() for _ in range(burst)))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "ready_ms": ready * 1000,
+        "first_ms": first * 1000,
+        "burst_p50_ms": percentile(samples, 50) * 1000,
+        "burst_max_ms": max(samples) * 1000,
+    }
+
+
+async def seed_payment() -> int:
+    from app.db import dispose_engine, get_engine
+    from app.schemas.payment import PaymentCreate
+    from app.services.payments import create_payment
+
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        payment, _ = await create_payment(
+            PaymentCreate(order_id=1, amount=1.0),
+            f"startup-{uuid.uuid4().hex}", db)
+    await dispose_engine()
+    return payment.id
+
+
+async def main(rounds: int, burst: int, port: int) -> None:
+    payment_id = await seed_payment()
+    for label, (args, env) in VARIANTS.items():
+        for _ in range(rounds):
+            s = await run_variant(args, env, port, payment_id, burst)
+            print(
+                f"{label:<24} ready={s['ready_ms']:>7.0f}ms  "
+                f"first={s['first_ms']:>6.1f}ms  "
+                f"burst p50={s['burst_p50_ms']:>6.1f}ms "
+                f"max={s['burst_max_ms']:>6.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--rounds", type=int, default=3)
+    parser.add_argument("-b", "--burst", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds, args.burst, args.port))
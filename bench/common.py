@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Перцентиль методом nearest-rank, samples в секундах."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float], elapsed: float) -> dict[str, float]:
+    return {
+        "requests": len(samples),
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+async def run_concurrent(
+    op: Callable[[int], Awaitable[None]],
+    total: int,
+    concurrency: int,
+) -> dict[str, float]:
+    """Выполнить op(i) total раз не более чем в concurrency корутинах."""
+    samples: list[float] = []
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for i in counter:
+            started = time.perf_counter()
+            await op(i)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - started)
+
+
+def print_row(label: str, stats: dict[str, float]) -> None:
+    print(
+        f"{label:<28} n={stats['requests']:<6} "
+        f"rps={stats['rps']:>8.1f}  p50={stats['p50_ms']:>7.2f}ms  "
+        f"p95={stats['p95_ms']:>7.2f}ms  p99={stats['p99_ms']:>7.2f}ms"
+    )
+
+
+def environment() -> dict[str, Any]:
+    """Где и на каком коммите сняты результаты."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path: str | Path, results: dict[str, dict[str, Any]]) -> None:
+    """Сохранить результаты в JSON: {"meta": ..., "results": {name: stats}}.
+
+    Если файл уже есть, результаты дописываются к нему — так load и micro
+    можно складывать в один файл на коммит.
+    """
+    path = Path(path)
+    merged = load_results(path)["results"] if path.exists() else {}
+    merged.update(results)
+    path.write_text(json.dumps(
+        {"meta": environment(), "results": merged}, indent=2, sort_keys=True))
+
+
+def load_results(path: str | Path) -> dict[str, Any]:
+    return json.loads(Path(path).read_text())
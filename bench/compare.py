@@ -0,0 +1,79 @@
+"""Сравнение двух JSON с результатами bench.load / bench.micro.
+
+    python -m bench.compare bench-results/base.json bench-results/new.json
+
+Код выхода 1, если хоть одна метрика ухудшилась больше чем на --threshold
+процентов, — годится как проверка в CI.
+"""
+import argparse
+import sys
+
+from bench.common import load_results
+
+# метрика -> True, если больше значит лучше
+METRICS = {
+    "rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "ns_per_op": False,
+}
+DEFAULT_METRICS = ("rps", "p95_ms", "ns_per_op")
+
+
+def compare(
+    base: dict[str, dict[str, float]],
+    new: dict[str, dict[str, float]],
+    metrics: tuple[str, ...] = DEFAULT_METRICS,
+    threshold: float = 10.0,
+) -> list[dict]:
+    """Строки сравнения по общим бенчмаркам; regression=True — хуже порога."""
+    rows = []
+    for name in sorted(base.keys() & new.keys()):
+        for metric in metrics:
+            if metric not in base[name] or metric not in new[name]:
+                continue
+            old_value, new_value = base[name][metric], new[name][metric]
+            if not old_value:
+                continue
+            change = (new_value - old_value) / old_value * 100
+            worse = -change if METRICS[metric] else change
+            rows.append({
+                "name": name,
+                "metric": metric,
+                "base": old_value,
+                "new": new_value,
+                "change_pct": change,
+                "regression": worse > threshold,
+            })
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument(
+        "-t", "--threshold", type=float, default=10.0,
+        help="allowed degradation, percent")
+    parser.add_argument(
+        "-m", "--metrics", nargs="+", choices=list(METRICS),
+        default=list(DEFAULT_METRICS))
+    args = parser.parse_args()
+
+    base, new = load_results(args.base), load_results(args.new)
+    rows = compare(
+        base["results"], new["results"], tuple(args.metrics), args.threshold)
+    print(f"base {base['meta'].get('commit')}  ->  new {new['meta'].get('commit')}")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['name']:<40} {row['metric']:<10} "
+            f"{row['base']:>12.2f} {row['new']:>12.2f} "
+            f"{row['change_pct']:>+8.1f}%  {flag}"
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
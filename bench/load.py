@@ -0,0 +1,265 @@
+"""Нагрузочный прогон API: in-process через ASGI или через живой uvicorn.
+
+    DB_HOST=127.0.0.1 DB_PORT=5434 python -m bench.load --mode both \\
+        -n 2000 -c 16 --out bench-results/$(git rev-parse --short HEAD).json
+
+Сценарии (--scenarios, по умолчанию все):
+
+* create_new — POST /payments/ с новым ключом идемпотентности
+* create_replay — повтор POST с уже использованным ключом
+* get — GET /payments/{id} по заранее созданным платежам
+* list — GET /payments/?order_id=...&limit=50, первая страница
+* confirm_refund — confirm и refund одного платежа (одна операция = 2 запроса)
+* mixed — 60% get, 20% create_new, 10% create_replay, 10% confirm
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable
+
+import httpx
+
+from bench.common import print_row, run_concurrent, write_results
+
+PAYMENTS = "/api/v1/payments"
+BODY = {"order_id": 1, "amount": 10.0, "currency": "USD"}
+BATCH_LIMIT = 500
+
+Op = Callable[[int], Awaitable[None]]
+
+
+def expect(response: httpx.Response, *codes: int) -> None:
+    if response.status_code not in codes:
+        raise RuntimeError(
+            f"{response.request.method} {response.request.url.path}: "
+            f"{response.status_code} {response.text[:200]}")
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    seeded: list[tuple[int, str]] = field(default_factory=list)
+
+    def key(self, scenario: str, i: int) -> str:
+        return f"load-{self.run_id}-{scenario}-{i}"
+
+    async def create_pending(self, prefix: str, count: int) -> list[int]:
+        """Подготовка вне замера: count новых платежей через /batch."""
+        ids = []
+        for start in range(0, count, BATCH_LIMIT):
+            items = [
+                {**BODY, "idempotency_key": self.key(prefix, i)}
+                for i in range(start, min(count, start + BATCH_LIMIT))
+            ]
+            r = await self.client.post(f"{PAYMENTS}/batch", json={"items": items})
+            expect(r, 200)
+            ids += [item["payment"]["id"] for item in r.json()]
+        return ids
+
+    async def seed(self, count: int) -> None:
+        ids = await self.create_pending("seed", count)
+        self.seeded = [(pid, self.key("seed", i)) for i, pid in enumerate(ids)]
+
+
+async def create_new(ctx: Context, total: int) -> Op:
+    prefix = f"new-{uuid.uuid4().hex[:6]}"
+
+    async def op(i: int) -> None:
+        r = await ctx.client.post(
+            f"{PAYMENTS}/",
+            headers={"Idempotency-Key": ctx.key(prefix, i)}, json=BODY)
+        expect(r, 201)
+    return op
+
+
+async def create_replay(ctx: Context, total: int) -> Op:
+    async def op(i: int) -> None:
+        _, key = ctx.seeded[i % len(ctx.seeded)]
+        r = await ctx.client.post(
+            f"{PAYMENTS}/", headers={"Idempotency-Key": key}, json=BODY)
+        expect(r, 200)
+    return op
+
+
+async def get(ctx: Context, total: int) -> Op:
+    async def op(i: int) -> None:
+        pid, _ = ctx.seeded[i % len(ctx.seeded)]
+        expect(await ctx.client.get(f"{PAYMENTS}/{pid}"), 200)
+    return op
+
+
+async def list_page(ctx: Context, total: int) -> Op:
+    params = {"order_id": BODY["order_id"], "limit": 50}
+
+    async def op(i: int) -> None:
+        expect(await ctx.client.get(f"{PAYMENTS}/", params=params), 200)
+    return op
+
+
+async def confirm_refund(ctx: Context, total: int) -> Op:
+    ids = await ctx.create_pending(f"cr-{uuid.uuid4().hex[:6]}", total)
+
+    async def op(i: int) -> None:
+        expect(await ctx.client.post(f"{PAYMENTS}/{ids[i]}/confirm"), 200)
+        expect(await ctx.client.post(f"{PAYMENTS}/{ids[i]}/refund"), 200)
+    return op
+
+
+async def mixed(ctx: Context, total: int) -> Op:
+    ops = {
+        "get": await get(ctx, total),
+        "create_new": await create_new(ctx, total),
+        "create_replay": await create_replay(ctx, total),
+    }
+    pending = await ctx.create_pending(f"mx-{uuid.uuid4().hex[:6]}", total // 10 + 1)
+    # смесь раскладывается по номерам операций с фиксированным seed:
+    # прогоны с одинаковым -n сравнимы между коммитами
+    choices = random.Random(0).choices(
+        ["get", "create_new", "create_replay", "confirm"],
+        weights=[60, 20, 10, 10], k=total)
+    confirmed = iter(pending)
+
+    async def op(i: int) -> None:
+        kind = choices[i]
+        if kind != "confirm":
+            await ops[kind](i)
+            return
+        pid = next(confirmed, None)
+        if pid is None:
+            await ops["get"](i)
+            return
+        expect(await ctx.client.post(f"{PAYMENTS}/{pid}/confirm"), 200)
+    return op
+
+
+SCENARIOS: dict[str, Callable[[Context, int], Awaitable[Op]]] = {
+    "create_new": create_new,
+    "create_replay": create_replay,
+    "get": get,
+    "list": list_page,
+    "confirm_refund": confirm_refund,
+    "mixed": mixed,
+}
+
+
+@contextlib.asynccontextmanager
+async def asgi_client() -> AsyncIterator[httpx.AsyncClient]:
+    from app.db import dispose_engine
+    from app.main import get_app
+
+    transport = httpx.ASGITransport(app=get_app())
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench",
+    ) as client:
+        yield client
+    await dispose_engine()
+
+
+@contextlib.asynccontextmanager
+async def uvicorn_client(
+    concurrency: int,
+    port: int,
+    server_args: list[str],
+) -> AsyncIterator[httpx.AsyncClient]:
+    """uvicorn в отдельном процессе: честный HTTP-стек и отдельный CPU-бюджет."""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log", *server_args],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=30,
+        ) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with {server.returncode}")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not become ready in 30s")
+                await asyncio.sleep(0.1)
+            yield client
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+async def run_mode(
+    mode: str,
+    client_cm: contextlib.AbstractAsyncContextManager[httpx.AsyncClient],
+    scenarios: list[str],
+    total: int,
+    concurrency: int,
+    warmup: int,
+) -> dict[str, dict[str, float]]:
+    results = {}
+    async with client_cm as client:
+        ctx = Context(client)
+        await ctx.seed(max(100, concurrency))
+        warm = await get(ctx, warmup)
+        await run_concurrent(warm, warmup, concurrency)
+
+        for name in scenarios:
+            op = await SCENARIOS[name](ctx, total)
+            stats = await run_concurrent(op, total, concurrency)
+            stats["concurrency"] = concurrency
+            label = f"{mode}/{name}"
+            print_row(label, stats)
+            results[label] = stats
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    modes = ["asgi", "uvicorn"] if args.mode == "both" else [args.mode]
+    results = {}
+    for mode in modes:
+        if mode == "asgi":
+            client_cm = asgi_client()
+        else:
+            client_cm = uvicorn_client(
+                args.concurrency, args.port, args.server_arg)
+        results.update(await run_mode(
+            mode, client_cm, args.scenarios,
+            args.total, args.concurrency, args.warmup))
+
+    if args.out:
+        write_results(args.out, results)
+        print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mode", choices=["asgi", "uvicorn", "both"], default="asgi")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS),
+        default=list(SCENARIOS))
+    parser.add_argument("-n", "--total", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--server-arg", action="append", default=[],
+        help="extra uvicorn argument, e.g. --server-arg=--workers=2")
+    parser.add_argument("--out", help="JSON file to write (merged if it exists)")
+    asyncio.run(main(parser.parse_args()))
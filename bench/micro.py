@@ -0,0 +1,108 @@
+"""Микробенчмарки горячих мест без БД и HTTP.
+
+    python -m bench.micro --out bench-results/$(git rev-parse --short HEAD).json
+
+ns_per_op — лучший из --repeat замеров (минимум меньше всего зашумлён).
+"""
+import argparse
+import timeit
+from datetime import datetime, timezone
+from typing import Callable
+
+
+def payment(i: int = 1):
+    from app.models.payment import Payment, PaymentStatus
+
+    now = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    return Payment(
+        id=i, order_id=1000 + i, amount_minor=1050, refunded_minor=0,
+        currency="USD",
+        status=PaymentStatus.CONFIRMED, provider="fake",
+        idempotency_key=f"micro-{i}", created_at=now, updated_at=now,
+    )
+
+
+def build_cases() -> dict[str, tuple[Callable[[], object], int]]:
+    """name -> (функция, сколько операций делает один её вызов)."""
+    from fastapi.responses import JSONResponse
+
+    from app.api.responses import FastJSONResponse, payment_dict, payments_list
+    from app.models.payment import PaymentStatus
+    from app.schemas.payment import PaymentPage, PaymentRead
+    from app.services.payments import ALLOWED_FROM, ALLOWED_TRANSITIONS
+
+    one = payment()
+    page = [payment(i) for i in range(50)]
+    read = PaymentRead.model_validate(one)
+    pairs = [(old, new) for old in PaymentStatus for new in PaymentStatus]
+
+    def transitions() -> None:
+        for old, new in pairs:
+            new in ALLOWED_TRANSITIONS[old]
+
+    def allowed_from() -> None:
+        for old, new in pairs:
+            old in ALLOWED_FROM[new]
+
+    return {
+        "payment_read_validate": (lambda: PaymentRead.model_validate(one), 1),
+        "payment_read_dump_json": (read.model_dump_json, 1),
+        "payment_read_roundtrip": (
+            lambda: PaymentRead.model_validate(one).model_dump_json(), 1),
+        "payment_page_50_dump_json": (
+            lambda: PaymentPage(
+                items=[PaymentRead.model_validate(p) for p in page],
+            ).model_dump_json(), 1),
+        # путь FastAPI с response_model: validate -> dump(json) -> json.dumps
+        "response_payment_default": (
+            lambda: JSONResponse(
+                PaymentRead.model_validate(one).model_dump(mode="json")), 1),
+        "response_payment_fast": (
+            lambda: FastJSONResponse(payment_dict(one)), 1),
+        "response_page_50_default": (
+            lambda: JSONResponse(PaymentPage(
+                items=[PaymentRead.model_validate(p) for p in page],
+            ).model_dump(mode="json")), 1),
+        "response_page_50_fast": (
+            lambda: FastJSONResponse(
+                {"items": payments_list(page), "next_cursor": None}), 1),
+        "transition_check": (transitions, len(pairs)),
+        "transition_allowed_from": (allowed_from, len(pairs)),
+    }
+
+
+def measure(func: Callable[[], object], ops_per_call: int, repeat: int) -> dict:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return {
+        "ns_per_op": best / number / ops_per_call * 1e9,
+        "loops": number,
+    }
+
+
+def main(names: list[str] | None, repeat: int, out: str | None) -> None:
+    from bench.common import write_results
+
+    cases = build_cases()
+    results = {}
+    for name, (func, ops) in cases.items():
+        if names and name not in names:
+            continue
+        stats = measure(func, ops, repeat)
+        label = f"micro/{name}"
+        print(f"{label:<40} {stats['ns_per_op']:>12.1f} ns/op")
+        results[label] = stats
+
+    if out:
+        write_results(out, results)
+        print(f"results written to {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("names", nargs="*", help="run only these cases")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--out", help="JSON file to write (merged if it exists)")
+    args = parser.parse_args()
+    main(args.names, args.repeat, args.out)
@@ -0,0 +1,78 @@
+import pytest
+
+from test.utils import create_payment, new_key
+
+
+def batch_item(key: str, order_id: int, amount: float = 10.0) -> dict:
+    return {
+        "idempotency_key": key,
+        "order_id": order_id,
+        "amount": amount,
+        "currency": "USD",
+    }
+
+
+@pytest.mark.asyncio
+async def test_batch_creates_payments(client):
+    items = [batch_item(new_key("batch"), 50001 + i) for i in range(3)]
+
+    r = await client.post("/api/v1/payments/batch", json={"items": items})
+    assert r.status_code == 200
+
+    body = r.json()
+    assert [res["outcome"] for res in body] == ["created"] * 3
+    assert [res["idempotency_key"] for res in body] == [
+        i["idempotency_key"] for i in items]
+    assert [res["payment"]["order_id"] for res in body] == [
+        50001, 50002, 50003]
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_replay_and_conflict(client):
+    replay_key = new_key("batch")
+    conflict_key = new_key("batch")
+    r1, existing, _ = await create_payment(
+        client, order_id=50010, amount=10.0, key=replay_key)
+    await create_payment(client, order_id=50011, amount=10.0, key=conflict_key)
+
+    r = await client.post(
+        "/api/v1/payments/batch",
+        json={"items": [
+            batch_item(replay_key, 50010),
+            batch_item(conflict_key, 50011, amount=99.0),
+            batch_item(new_key("batch"), 50012),
+        ]},
+    )
+    assert r.status_code == 200
+
+    body = r.json()
+    assert [res["outcome"] for res in body] == [
+        "replayed", "conflict", "created"]
+    assert body[0]["payment"]["id"] == existing["id"]
+    assert body[1]["payment"] is None
+
+
+@pytest.mark.asyncio
+async def test_batch_duplicate_key_inside_batch(client):
+    key = new_key("batch")
+
+    r = await client.post(
+        "/api/v1/payments/batch",
+        json={"items": [
+            batch_item(key, 50020),
+            batch_item(key, 50020),
+            batch_item(key, 50021),
+        ]},
+    )
+    assert r.status_code == 200
+
+    body = r.json()
+    assert [res["outcome"] for res in body] == [
+        "created", "replayed", "conflict"]
+    assert body[0]["payment"]["id"] == body[1]["payment"]["id"]
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_empty_list(client):
+    r = await client.post("/api/v1/payments/batch", json={"items": []})
+    assert r.status_code == 422
@@ -0,0 +1,38 @@
+from bench.common import load_results, percentile, write_results
+from bench.compare import compare
+
+
+def test_percentile_nearest_rank():
+    samples = [i / 100 for i in range(1, 101)]
+    assert percentile(samples, 50) == 0.5
+    assert percentile(samples, 99) == 0.99
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_flags_only_degradations_over_threshold():
+    base = {
+        "asgi/get": {"rps": 1000.0, "p95_ms": 10.0},
+        "micro/transition_check": {"ns_per_op": 50.0},
+        "asgi/only_in_base": {"rps": 1.0},
+    }
+    new = {
+        "asgi/get": {"rps": 850.0, "p95_ms": 9.0},
+        "micro/transition_check": {"ns_per_op": 54.0},
+    }
+
+    rows = {(r["name"], r["metric"]): r for r in compare(base, new, threshold=10)}
+
+    assert rows[("asgi/get", "rps")]["regression"]  # -15% пропускной
+    assert not rows[("asgi/get", "p95_ms")]["regression"]  # стало быстрее
+    assert not rows[("micro/transition_check", "ns_per_op")]["regression"]
+    assert all(name != "asgi/only_in_base" for name, _ in rows)
+
+
+def test_write_results_merges_into_existing_file(tmp_path):
+    path = tmp_path / "results.json"
+    write_results(path, {"asgi/get": {"rps": 1.0}})
+    write_results(path, {"micro/x": {"ns_per_op": 2.0}})
+
+    data = load_results(path)
+    assert set(data["results"]) == {"asgi/get", "micro/x"}
+    assert "commit" in data["meta"]
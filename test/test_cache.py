@@ -0,0 +1,164 @@
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+
+from app.models.payment import PaymentStatus
+from app.schemas.payment import PaymentRead
+from app.services.cache import (
+    LRUPaymentCache,
+    RedisPaymentCache,
+    set_payment_cache,
+)
+from test.utils import create_payment
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """Минимальный async-клиент с семантикой get/set(px)/delete Redis."""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.data: dict[str, tuple[float | None, str]] = {}
+
+    async def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self.data[key]
+            return None
+        return value.encode()
+
+    async def set(self, key, value, px=None):
+        expires_at = None if px is None else self.clock() + px / 1000
+        self.data[key] = (expires_at, value)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def snapshot(payment_id: int, status: PaymentStatus) -> PaymentRead:
+    now = datetime.now(timezone.utc)
+    return PaymentRead(
+        id=payment_id,
+        order_id=1,
+        amount=10.0,
+        currency="USD",
+        status=status,
+        provider="fake",
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache_and_clock(request):
+    clock = FakeClock()
+    if request.param == "memory":
+        cache = LRUPaymentCache(max_entries=2, ttl=5, clock=clock)
+    else:
+        cache = RedisPaymentCache(FakeRedis(clock), ttl=5)
+    return cache, clock
+
+
+@pytest.mark.asyncio
+async def test_cache_entry_expires_after_ttl(cache_and_clock):
+    cache, clock = cache_and_clock
+    await cache.set(snapshot(1, PaymentStatus.PENDING))
+
+    clock.now += 4
+    assert (await cache.get(1)).status == PaymentStatus.PENDING
+
+    clock.now += 2
+    assert await cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_terminal_status_cached_without_ttl(cache_and_clock):
+    cache, clock = cache_and_clock
+    await cache.set(snapshot(1, PaymentStatus.REFUNDED))
+
+    clock.now += 10_000
+    assert (await cache.get(1)).status == PaymentStatus.REFUNDED
+
+
+@pytest.mark.asyncio
+async def test_cache_delete(cache_and_clock):
+    cache, _ = cache_and_clock
+    await cache.set(snapshot(1, PaymentStatus.PENDING))
+    await cache.delete(1)
+    assert await cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used():
+    cache = LRUPaymentCache(max_entries=2, ttl=5)
+    for pid in (1, 2):
+        await cache.set(snapshot(pid, PaymentStatus.PENDING))
+
+    await cache.get(1)
+    await cache.set(snapshot(3, PaymentStatus.PENDING))
+
+    assert len(cache) == 2
+    assert await cache.get(2) is None
+    assert await cache.get(1) is not None
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_are_treated_as_miss():
+    class BrokenRedis:
+        async def get(self, key):
+            raise ConnectionError("down")
+
+        async def set(self, key, value, px=None):
+            raise ConnectionError("down")
+
+    cache = RedisPaymentCache(BrokenRedis(), ttl=5)
+    await cache.set(snapshot(1, PaymentStatus.PENDING))
+    assert await cache.get(1) is None
+
+
+@pytest_asyncio.fixture
+async def memory_cache():
+    cache = LRUPaymentCache(max_entries=100, ttl=60)
+    set_payment_cache(cache)
+    yield cache
+    set_payment_cache(None)
+
+
+@pytest.mark.asyncio
+async def test_get_endpoint_reads_through_cache(client, memory_cache):
+    _, payment, _ = await create_payment(client, order_id=70001, amount=10.0)
+    pid = payment["id"]
+
+    # create_payment сразу кладёт снимок в кэш
+    assert (await memory_cache.get(pid)).status == PaymentStatus.PENDING
+
+    await memory_cache.delete(pid)
+    r = await client.get(f"/api/v1/payments/{pid}")
+    assert r.status_code == 200
+    assert (await memory_cache.get(pid)).id == pid
+
+
+@pytest.mark.asyncio
+async def test_status_change_updates_cached_entry(client, memory_cache):
+    _, payment, _ = await create_payment(client, order_id=70002, amount=10.0)
+    pid = payment["id"]
+    await client.get(f"/api/v1/payments/{pid}")
+
+    await client.post(f"/api/v1/payments/{pid}/confirm")
+    r = await client.get(f"/api/v1/payments/{pid}")
+    assert r.json()["status"] == "confirmed"
+
+    await client.post(f"/api/v1/payments/{pid}/refund")
+    r = await client.get(f"/api/v1/payments/{pid}")
+    assert r.json()["status"] == "refunded"
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from test.utils import create_payment
+
+
+@pytest.mark.asyncio
+async def test_parallel_confirm_and_fail_only_one_wins(client):
+    for i in range(10):
+        _, payment, _ = await create_payment(
+            client, order_id=60001 + i, amount=10.0)
+        pid = payment["id"]
+
+        confirm, fail = await asyncio.gather(
+            client.post(f"/api/v1/payments/{pid}/confirm"),
+            client.post(f"/api/v1/payments/{pid}/fail"),
+        )
+
+        codes = sorted([confirm.status_code, fail.status_code])
+        assert codes == [200, 409]
+
+        winner = confirm if confirm.status_code == 200 else fail
+        final = await client.get(f"/api/v1/payments/{pid}")
+        assert final.json()["status"] == winner.json()["status"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_confirm_fail_refund_stay_consistent(client):
+    actions = ["confirm", "fail", "refund"] * 3
+
+    for i in range(10):
+        _, payment, _ = await create_payment(
+            client, order_id=60101 + i, amount=10.0)
+        pid = payment["id"]
+
+        responses = await asyncio.gather(*(
+            client.post(f"/api/v1/payments/{pid}/{action}")
+            for action in actions
+        ))
+        assert {r.status_code for r in responses} <= {200, 409}
+
+        succeeded = {
+            action for action, r in zip(actions, responses)
+            if r.status_code == 200
+        }
+        # pending -> failed и pending -> confirmed взаимоисключающие
+        assert not {"confirm", "fail"} <= succeeded
+        if "refund" in succeeded:
+            assert "confirm" in succeeded
+        assert sum(
+            1 for action, r in zip(actions, responses)
+            if action == "refund" and r.status_code == 200) <= 1
+
+        final = (await client.get(f"/api/v1/payments/{pid}")).json()
+        if "refund" in succeeded:
+            assert final["status"] == "refunded"
+        elif "fail" in succeeded:
+            assert final["status"] == "failed"
+        else:
+            assert final["status"] == "confirmed"
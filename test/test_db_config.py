@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+
+from app.core.config import Settings
+from app.core.metrics import InstrumentedAsyncPool
+from app.db import build_engine, engine_options
+
+
+def make_settings(**overrides):
+    # свежий Settings, а не get_settings(): env для БД выставляет фикстура app
+    return Settings(**overrides)
+
+
+def test_engine_options_pool_sizing():
+    options = engine_options(make_settings(
+        DB_POOL_SIZE=7, DB_MAX_OVERFLOW=3, DB_POOL_RECYCLE=60))
+
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert options["pool_recycle"] == 60
+    assert options["pool_pre_ping"] is False
+    assert options["poolclass"] is InstrumentedAsyncPool
+
+
+def test_engine_options_null_pool_for_pgbouncer():
+    options = engine_options(make_settings(
+        DB_USE_NULL_POOL=True, DB_STATEMENT_CACHE_SIZE=0))
+
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+
+
+def test_statement_timeout_only_when_set():
+    server_settings = engine_options(
+        make_settings())["connect_args"]["server_settings"]
+    assert "statement_timeout" not in server_settings
+
+    server_settings = engine_options(make_settings(
+        DB_STATEMENT_TIMEOUT_MS=1500))["connect_args"]["server_settings"]
+    assert server_settings["statement_timeout"] == "1500"
+
+
+@pytest.mark.asyncio
+async def test_server_settings_reach_postgres(app):
+    engine, _ = build_engine(make_settings(
+        DB_USE_NULL_POOL=True,
+        DB_STATEMENT_CACHE_SIZE=0,
+        DB_APPLICATION_NAME="payment-test",
+        DB_STATEMENT_TIMEOUT_MS=1500,
+    ))
+    try:
+        async with engine.connect() as conn:
+            name = await conn.scalar(text("SHOW application_name"))
+            timeout = await conn.scalar(text("SHOW statement_timeout"))
+    finally:
+        await engine.dispose()
+
+    assert name == "payment-test"
+    assert timeout == "1500ms"
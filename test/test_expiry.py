@@ -0,0 +1,100 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, insert, select, text
+
+from app.db import get_engine
+from app.models.event import PaymentEvent
+from app.models.payment import PAYMENT_ID_SEQ, Payment, PaymentStatus
+from app.services.expiry import expire_pending
+from app.services.partitions import MonthPartition, ensure_partitions
+from test.utils import new_key, new_order_id
+
+# отдельная секция далеко в прошлом: в общей тестовой БД полно свежих PENDING
+OLD_MONTH = date(2002, 3, 1)
+
+
+@pytest_asyncio.fixture
+async def stale(app):
+    """Три PENDING и один CONFIRMED платёж в OLD_MONTH; id в порядке создания."""
+    engine, session_factory = get_engine()
+    partition = MonthPartition(OLD_MONTH).name
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"DROP TABLE IF EXISTS {partition}"))
+        await ensure_partitions(conn, OLD_MONTH, 0)
+
+    ids = []
+    order_id = new_order_id()
+    async with session_factory() as db:
+        for day, status in enumerate([
+            PaymentStatus.PENDING, PaymentStatus.PENDING,
+            PaymentStatus.PENDING, PaymentStatus.CONFIRMED,
+        ], start=1):
+            created_at = datetime(2002, 3, day, tzinfo=timezone.utc)
+            payment_id = await db.scalar(PAYMENT_ID_SEQ.next_value().select())
+            await db.execute(insert(Payment).values(
+                id=payment_id, order_id=order_id, amount_minor=100, currency="USD",
+                status=status, idempotency_key=new_key("stale"),
+                created_at=created_at, updated_at=created_at))
+            ids.append(payment_id)
+        await db.commit()
+
+    yield ids
+
+    async with session_factory() as db:
+        await db.execute(delete(PaymentEvent).where(
+            PaymentEvent.payment_id.in_(ids)))
+        await db.commit()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"DROP TABLE IF EXISTS {partition}"))
+
+
+@pytest.mark.asyncio
+async def test_sweeper_expires_stale_pending_and_skips_locked(stale):
+    _, session_factory = get_engine()
+    # старше апреля 2002 — только платежи фикстуры
+    max_age = datetime.now(timezone.utc) - datetime(
+        2002, 4, 1, tzinfo=timezone.utc)
+
+    # моложе max_age — не трогаются
+    async with session_factory() as db:
+        assert await expire_pending(
+            db, max_age + timedelta(days=40), batch_size=10) == 0
+
+    async with session_factory() as holder, session_factory() as sweeper:
+        # платёж в процессе confirm: строка занята другой транзакцией
+        await holder.execute(
+            select(Payment.id)
+            .where(Payment.id == stale[0])
+            .with_for_update())
+
+        assert await expire_pending(sweeper, max_age, batch_size=1) == 1
+        assert await expire_pending(sweeper, max_age, batch_size=10) == 1
+        assert await expire_pending(sweeper, max_age, batch_size=10) == 0
+        await holder.rollback()
+
+        assert await expire_pending(sweeper, max_age, batch_size=10) == 1
+
+        statuses = dict((await sweeper.execute(
+            select(Payment.id, Payment.status)
+            .where(Payment.id.in_(stale)))).all())
+        assert statuses == {
+            stale[0]: PaymentStatus.FAILED,
+            stale[1]: PaymentStatus.FAILED,
+            stale[2]: PaymentStatus.FAILED,
+            stale[3]: PaymentStatus.CONFIRMED,
+        }
+
+        events = (await sweeper.execute(
+            select(PaymentEvent.payment_id, PaymentEvent.event_type)
+            .where(PaymentEvent.payment_id.in_(stale))
+            .order_by(PaymentEvent.id))).all()
+        # самые старые — первыми
+        assert events == [
+            (stale[1], "payment.failed"),
+            (stale[2], "payment.failed"),
+            (stale[0], "payment.failed"),
+        ]
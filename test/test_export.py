@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import tracemalloc
+import uuid
+
+import pytest
+from sqlalchemy import insert
+
+from app.db import get_engine
+from app.models.payment import Payment
+from app.schemas.payment import ExportFormat, PaymentFilters
+from app.services.export import export_payments
+from test.utils import create_payment, new_order_id
+
+
+async def insert_rows(order_id: int, count: int) -> None:
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        await db.execute(insert(Payment), [
+            {
+                "order_id": order_id,
+                "amount_minor": 100,
+                "currency": "USD",
+                "idempotency_key": f"export-{uuid.uuid4()}",
+            }
+            for _ in range(count)
+        ])
+        await db.commit()
+
+
+async def export_peak_memory(order_id: int) -> tuple[int, int]:
+    """(число строк, пик аллокаций Python) при полном чтении выгрузки."""
+    rows = 0
+    tracemalloc.start()
+    try:
+        async for chunk in export_payments(
+            PaymentFilters(order_id=order_id),
+            ExportFormat.NDJSON,
+            chunk_size=500,
+        ):
+            rows += chunk.count(b"\n")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return rows, peak
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson(client):
+    order_id = new_order_id()
+    for amount in (10.0, 20.0):
+        await create_payment(client, order_id=order_id, amount=amount)
+
+    r = await client.get(
+        "/api/v1/payments/export", params={"order_id": order_id})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [line["amount"] for line in lines] == ["10.00", "20.00"]
+    assert lines[0]["status"] == "pending"
+    assert lines[0]["order_id"] == order_id
+
+
+@pytest.mark.asyncio
+async def test_export_csv(client):
+    order_id = new_order_id()
+    await create_payment(client, order_id=order_id, amount=10.0)
+
+    r = await client.get(
+        "/api/v1/payments/export",
+        params={"order_id": order_id, "format": "csv"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 1
+    assert rows[0]["order_id"] == str(order_id)
+    assert rows[0]["currency"] == "USD"
+
+
+@pytest.mark.asyncio
+async def test_export_memory_stays_flat(app):
+    small, large = new_order_id(), new_order_id()
+    await insert_rows(small, 1_000)
+    await insert_rows(large, 8_000)
+
+    await export_peak_memory(small)  # прогрев кэшей компиляции
+    small_rows, small_peak = await export_peak_memory(small)
+    large_rows, large_peak = await export_peak_memory(large)
+
+    assert (small_rows, large_rows) == (1_000, 8_000)
+    # в 8 раз больше строк, а пик памяти почти тот же: держим одну пачку
+    assert large_peak < small_peak * 1.5
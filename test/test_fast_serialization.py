@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from app.api import responses
+from app.api.responses import dumps, payment_dict
+from app.models.payment import Payment, PaymentStatus
+from app.schemas.payment import PaymentRead
+from test.utils import create_payment, new_key, new_order_id
+
+
+@pytest_asyncio.fixture
+async def fast_client(app):
+    from app.core.config import get_settings
+    from app.main import get_app
+
+    settings = get_settings().model_copy(update={"FAST_SERIALIZATION": True})
+    transport = ASGITransport(app=get_app(settings))
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2024, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+    datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
+    datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone(timedelta(hours=3))),
+    datetime(2024, 1, 1, 12, 0, 0),
+])
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_matches_pydantic(created_at, use_orjson, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr(responses, "orjson", None)
+    elif responses.orjson is None:
+        pytest.skip("orjson is not installed")
+
+    payment = Payment(
+        id=1, order_id=2, amount_minor=1050, refunded_minor=0, currency="USD",
+        status=PaymentStatus.CONFIRMED, provider="fake",
+        idempotency_key="k", created_at=created_at, updated_at=created_at,
+    )
+    expected = PaymentRead.model_validate(payment).model_dump_json().encode()
+
+    assert dumps(payment_dict(payment)) == expected
+    assert dumps(payment_dict(PaymentRead.model_validate(payment))) == expected
+
+
+@pytest.mark.asyncio
+async def test_fast_responses_are_byte_identical(client, fast_client):
+    r, payment, key = await create_payment(
+        fast_client, order_id=new_order_id(), amount=12.34)
+    assert r.status_code == 201
+    pid = payment["id"]
+
+    replay = await fast_client.post(
+        "/api/v1/payments/", headers={"Idempotency-Key": key},
+        json={"order_id": payment["order_id"], "amount": 12.34,
+              "currency": "USD"})
+    assert replay.status_code == 200
+    assert replay.json() == payment
+
+    for path in (
+        f"/api/v1/payments/{pid}",
+        f"/api/v1/payments/?order_id={payment['order_id']}",
+    ):
+        default, fast = await client.get(path), await fast_client.get(path)
+        assert fast.status_code == default.status_code == 200
+        assert fast.headers["content-type"] == default.headers["content-type"]
+        assert fast.content == default.content
+
+    r = await fast_client.post(f"/api/v1/payments/{pid}/confirm")
+    assert r.status_code == 200
+    assert r.content == (await client.get(f"/api/v1/payments/{pid}")).content
+
+    r = await fast_client.post(f"/api/v1/payments/{pid}/fail")
+    assert r.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_fast_batch_response(client, fast_client):
+    order_id = new_order_id()
+    items = [
+        {"order_id": order_id, "amount": 1.0, "idempotency_key": new_key()},
+        {"order_id": order_id, "amount": 2.0, "idempotency_key": new_key()},
+    ]
+    created = await fast_client.post(
+        "/api/v1/payments/batch", json={"items": items})
+    assert [i["outcome"] for i in created.json()] == ["created", "created"]
+
+    items[1]["amount"] = 3.0
+    fast = await fast_client.post("/api/v1/payments/batch", json={"items": items})
+    default = await client.post("/api/v1/payments/batch", json={"items": items})
+    assert fast.content == default.content
+    assert [i["outcome"] for i in fast.json()] == ["replayed", "conflict"]
+    assert fast.json()[1]["payment"] is None
@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.db import get_engine
+from app.services.fx import (
+    FxRates,
+    FxRatesUnavailableError,
+    InvalidRateTableError,
+    UnknownRateError,
+    parse_rate_table,
+    set_fx_rates,
+)
+from app.services.stats import refresh_stats
+from test.test_stats import OVERLAP, old_payments  # noqa: F401
+from test.utils import create_payment, new_order_id
+
+RATES = {
+    "base": "USD",
+    "as_of": "2026-10-18T00:00:00+00:00",
+    "rates": {"EUR": "0.92", "JPY": "150"},
+}
+
+
+@pytest.fixture
+def fx():
+    rates = FxRates()
+    rates.swap(parse_rate_table(json.dumps(RATES)))
+    set_fx_rates(rates)
+    yield rates
+    set_fx_rates(None)
+
+
+def test_conversion_is_exact_and_rounds_half_even():
+    table = parse_rate_table(json.dumps(RATES))
+
+    assert table.convert(1000, "USD", "EUR") == 920
+    assert table.convert(1500, "JPY", "EUR") == 920
+    assert table.convert(700, "EUR", "USD") == 761  # 760.869...
+    assert table.convert(1, "USD", "JPY") == 2  # 1.5
+    assert table.convert(3, "USD", "JPY") == 4  # 4.5
+    assert table.convert(1000, "USD", "USD") == 1000
+    assert table.converter("USD", "EUR") is table.converter("USD", "EUR")
+    with pytest.raises(UnknownRateError):
+        table.convert(100, "GBP", "USD")
+
+    for broken in [
+        {**RATES, "base": "XYZ"},
+        {**RATES, "rates": {"EUR": "-1"}},
+        {**RATES, "rates": {"USD": "2"}},
+        {"base": "USD"},
+    ]:
+        with pytest.raises(InvalidRateTableError):
+            parse_rate_table(json.dumps(broken))
+
+
+@pytest.mark.asyncio
+async def test_refresh_swaps_whole_table(tmp_path):
+    source = tmp_path / "rates.json"
+    source.write_text(json.dumps(RATES))
+    rates = FxRates(str(source))
+    with pytest.raises(FxRatesUnavailableError):
+        rates.table()
+
+    assert await rates.refresh()
+    first = rates.table()
+    # то же содержимое в другом виде — та же версия, без подмены
+    source.write_text(json.dumps(RATES, indent=2))
+    assert not await rates.refresh()
+
+    source.write_text(json.dumps({**RATES, "rates": {"EUR": "0.95"}}))
+    assert await rates.refresh()
+    second = rates.table()
+    assert second.version != first.version
+    # взявший таблицу раньше досчитывает по ней
+    assert first.convert(1000, "USD", "EUR") == 920
+    assert second.convert(1000, "USD", "EUR") == 950
+
+    source.write_text("{")
+    with pytest.raises(InvalidRateTableError):
+        await rates.refresh()
+    assert rates.table() is second
+
+
+@pytest.mark.asyncio
+async def test_currency_is_validated(client):
+    r, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount="5", currency="eur")
+    assert r.status_code == 201
+    assert payment["currency"] == "EUR"
+
+    r, _, _ = await create_payment(
+        client, order_id=new_order_id(), amount="5", currency="XYZ")
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_stats_converted(client, old_payments, fx):  # noqa: F811
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        await refresh_stats(db, OVERLAP)
+
+    url = "/api/v1/payments/stats"
+    days = {"day_from": "2002-05-01", "day_to": "2002-05-02"}
+    r = await client.get(url, params={**days, "convert_to": "eur"})
+    assert r.status_code == 200
+    body = r.json()
+    assert [(i["currency"], i["amount"], i["converted_amount"])
+            for i in body["items"]] == [
+        ("EUR", "7.00", "7.00"),
+        ("USD", "15.50", "14.26"),
+        ("USD", "1.00", "0.92"),
+    ]
+    assert body["converted_total"] == "22.18"
+    assert body["fx"]["currency"] == "EUR"
+    assert body["fx"]["version"] == fx.table().version
+
+    r = await client.get(url, params={**days, "convert_to": "GBP"})
+    assert r.status_code == 400
+    r = await client.get(url, params={**days, "convert_to": "XYZ"})
+    assert r.status_code == 422
+    set_fx_rates(FxRates())
+    r = await client.get(url, params={**days, "convert_to": "EUR"})
+    assert r.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_export_converted(client, fx):
+    order_id = new_order_id()
+    await create_payment(client, order_id=order_id, amount="10")
+    await create_payment(
+        client, order_id=order_id, amount="1500", currency="JPY")
+
+    r = await client.get("/api/v1/payments/export", params={
+        "order_id": order_id, "format": "csv", "convert_to": "EUR"})
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [(row["amount"], row["currency"], row["converted_amount"],
+             row["converted_currency"]) for row in rows] == [
+        ("10.00", "USD", "9.20", "EUR"),
+        ("1500", "JPY", "9.20", "EUR"),
+    ]
+
+    r = await client.get("/api/v1/fx/rates")
+    assert r.json()["rates"] == {"EUR": "0.92", "JPY": "150", "USD": "1"}
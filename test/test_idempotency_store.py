@@ -0,0 +1,160 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select, update
+
+from app.db import get_engine
+from app.models.idempotency import IdempotencyKey
+from app.schemas.payment import PaymentBatchItem, PaymentCreate, PaymentRead
+from app.services.idempotency import (
+    IdempotencyRecord,
+    IdempotencyStore,
+    fingerprint,
+    purge_expired,
+    set_idempotency_store,
+)
+from test.utils import create_payment, new_key, new_order_id
+
+
+def test_fingerprint_is_canonical():
+    base = fingerprint(PaymentCreate(order_id=1, amount=10, currency="USD"))
+
+    assert base == fingerprint(PaymentCreate.model_validate_json(
+        '{"currency": "USD", "amount": 10.0, "order_id": 1}'))
+    assert base == fingerprint(PaymentBatchItem(
+        idempotency_key="k", order_id=1, amount=10.0))
+    assert base != fingerprint(
+        PaymentCreate(order_id=1, amount=10.0, currency="EUR"))
+
+
+def test_hot_tier_keeps_records_until_expiry():
+    now = [datetime(2026, 1, 1, tzinfo=timezone.utc)]
+    store = IdempotencyStore(ttl=60, hot_max_entries=10, now=lambda: now[0])
+    response = PaymentRead(
+        id=1, order_id=1, amount=1.0, currency="USD", status="pending",
+        provider="fake", created_at=now[0], updated_at=now[0])
+
+    store.remember("expired", IdempotencyRecord(
+        "fp", response, now[0] - timedelta(seconds=1)))
+    assert store.cached("expired") is None
+
+    record = store.created("k", "fp", response)
+    assert record.expires_at == now[0] + timedelta(seconds=60)
+    assert store.cached("k") is record
+
+    assert IdempotencyStore(ttl=60, hot_max_entries=0).cached("k") is None
+
+
+@pytest_asyncio.fixture
+async def statements(app):
+    """SQL, выполненный через engine, пока идёт тест."""
+    engine, _ = get_engine()
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest_asyncio.fixture
+async def store():
+    store = IdempotencyStore(ttl=3600, hot_max_entries=100)
+    set_idempotency_store(store)
+    yield store
+    set_idempotency_store(None)
+
+
+def touches_payments(statement: str) -> bool:
+    # Попытка занять ключ — один оператор с INSERT в payments; при занятом
+    # ключе до payments он не доходит, поэтому его не считаем.
+    if "INSERT INTO payment_idempotency_keys" in statement:
+        return False
+    return re.search(r"\bpayments\b", statement) is not None
+
+
+@pytest.mark.asyncio
+async def test_replay_is_served_without_reading_payments(
+    client, store, statements,
+):
+    order_id = new_order_id()
+    r1, created, key = await create_payment(client, order_id=order_id, amount=7.5)
+    assert r1.status_code == 201
+    await client.post(f"/api/v1/payments/{created['id']}/confirm")
+
+    # горячий слой: без обращений к БД вообще
+    statements.clear()
+    r2, replayed, _ = await create_payment(
+        client, order_id=order_id, amount=7.5, key=key)
+    assert r2.status_code == 200
+    assert statements == []
+    # ответ на повтор — снимок на момент создания
+    assert replayed == created
+
+    # другой воркер (пустой горячий слой): только таблица ключей
+    set_idempotency_store(IdempotencyStore(ttl=3600, hot_max_entries=100))
+    statements.clear()
+    r3, replayed, _ = await create_payment(
+        client, order_id=order_id, amount=7.5, key=key)
+    assert r3.status_code == 200
+    assert replayed == created
+    assert statements
+    assert not any(touches_payments(s) for s in statements)
+
+    r4, _, _ = await create_payment(
+        client, order_id=order_id, amount=8.0, key=key)
+    assert r4.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_purge_frees_expired_keys(client, store):
+    order_id = new_order_id()
+    _, first, key = await create_payment(client, order_id=order_id, amount=3.0)
+
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.idempotency_key == key)
+            .values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+        )
+        await db.commit()
+        assert await purge_expired(db, batch_size=10_000) >= 1
+
+        row = await db.scalar(select(IdempotencyKey).where(
+            IdempotencyKey.payment_id == first["id"]))
+        assert row.idempotency_key is None
+        assert row.response is None
+
+    # платёж по-прежнему находится по id
+    assert (await client.get(f"/api/v1/payments/{first['id']}")).status_code \
+        == 200
+
+    # ключ свободен: с ним создаётся новый платёж
+    set_idempotency_store(IdempotencyStore(ttl=3600, hot_max_entries=100))
+    r, second, _ = await create_payment(
+        client, order_id=order_id, amount=4.0, key=key)
+    assert r.status_code == 201
+    assert second["id"] != first["id"]
+
+
+@pytest.mark.asyncio
+async def test_batch_replays_from_store(client, store, statements):
+    order_id = new_order_id()
+    item = {"idempotency_key": new_key("batch"), "order_id": order_id,
+            "amount": 2.0, "currency": "USD"}
+    r1 = await client.post("/api/v1/payments/batch", json={"items": [item]})
+    assert r1.json()[0]["outcome"] == "created"
+
+    set_idempotency_store(IdempotencyStore(ttl=3600, hot_max_entries=100))
+    statements.clear()
+    r2 = await client.post("/api/v1/payments/batch", json={"items": [
+        item, {**item, "amount": 5.0},
+    ]})
+    assert [res["outcome"] for res in r2.json()] == ["replayed", "conflict"]
+    assert r2.json()[0]["payment"] == r1.json()[0]["payment"]
+    assert not any(touches_payments(s) for s in statements)
@@ -0,0 +1,48 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core.config import Settings
+from app.server import worker_count
+
+
+def test_worker_count_defaults_to_cpu_count():
+    assert worker_count(Settings(WEB_CONCURRENCY=3)) == 3
+    assert worker_count(Settings(WEB_CONCURRENCY=0)) == (os.cpu_count() or 1)
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_pool_and_disposes_engine(app):
+    from app.core.config import get_settings
+    from app.db import _engines, get_engine
+    from app.main import get_app
+
+    settings = get_settings().model_copy(update={"DB_POOL_WARMUP": 3})
+    fresh = get_app(settings)
+    key = id(asyncio.get_running_loop())
+
+    async with fresh.router.lifespan_context(fresh):
+        engine, _ = get_engine()
+        assert engine.pool.checkedin() >= 3
+        assert engine.pool.checkedout() == 0
+
+    assert key not in _engines
+
+
+@pytest.mark.asyncio
+async def test_lifespan_survives_unreachable_database(app):
+    from app.core.config import get_settings
+    from app.db import dispose_engine
+    from app.main import get_app
+
+    await dispose_engine()
+    os.environ["DB_PORT"] = "1"
+    get_settings.cache_clear()
+    try:
+        down = get_app(get_settings())
+        async with down.router.lifespan_context(down):
+            pass
+    finally:
+        os.environ["DB_PORT"] = "5434"
+        get_settings.cache_clear()
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from test.utils import create_payment, new_order_id
+
+
+async def collect_pages(client, params: dict, limit: int) -> list[dict]:
+    items, cursor = [], None
+    while True:
+        query = {**params, "limit": limit}
+        if cursor:
+            query["cursor"] = cursor
+        r = await client.get("/api/v1/payments/", params=query)
+        assert r.status_code == 200
+        body = r.json()
+        assert len(body["items"]) <= limit
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+@pytest.mark.asyncio
+async def test_list_by_order_id_pages_through_everything(client):
+    order_id = new_order_id()
+    created = [
+        (await create_payment(client, order_id=order_id, amount=10.0 + i))[1]
+        for i in range(5)
+    ]
+
+    items = await collect_pages(client, {"order_id": order_id}, limit=2)
+
+    assert [p["id"] for p in items] == [p["id"] for p in created]
+
+
+@pytest.mark.asyncio
+async def test_list_filters_by_status(client):
+    order_id = new_order_id()
+    payments = [
+        (await create_payment(client, order_id=order_id, amount=10.0))[1]
+        for _ in range(3)
+    ]
+    await client.post(f"/api/v1/payments/{payments[1]['id']}/confirm")
+
+    pending = await collect_pages(
+        client, {"order_id": order_id, "status": "pending"}, limit=10)
+    confirmed = await collect_pages(
+        client, {"order_id": order_id, "status": "confirmed"}, limit=10)
+
+    assert [p["id"] for p in pending] == [
+        payments[0]["id"], payments[2]["id"]]
+    assert [p["id"] for p in confirmed] == [payments[1]["id"]]
+
+
+@pytest.mark.asyncio
+async def test_list_time_window(client):
+    order_id = new_order_id()
+    await create_payment(client, order_id=order_id, amount=10.0)
+    now = datetime.now(timezone.utc)
+
+    past = await collect_pages(client, {
+        "order_id": order_id,
+        "created_to": (now - timedelta(hours=1)).isoformat(),
+    }, limit=10)
+    recent = await collect_pages(client, {
+        "order_id": order_id,
+        "created_from": (now - timedelta(hours=1)).isoformat(),
+    }, limit=10)
+
+    assert past == []
+    assert len(recent) == 1
+
+
+@pytest.mark.asyncio
+async def test_list_rejects_malformed_cursor(client):
+    r = await client.get(
+        "/api/v1/payments/", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
@@ -0,0 +1,64 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from test.utils import create_payment, new_order_id
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_request_histogram_uses_route_template(client):
+    _, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount=10.0)
+    route = "/api/v1/payments/{payment_id}"
+    labels = dict(method="GET", route=route, status="200")
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    await client.get(f"/api/v1/payments/{payment['id']}")
+    await client.get(f"/api/v1/payments/{payment['id']}")
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 2
+
+    body = (await client.get("/metrics")).text
+    assert f'route="{route}"' in body
+    assert f'route="/api/v1/payments/{payment["id"]}"' not in body
+
+
+@pytest.mark.asyncio
+async def test_idempotency_and_transition_counters(client):
+    replays = sample("payment_idempotency_replays_total")
+    conflicts = sample("payment_idempotency_conflicts_total")
+    invalid = sample("payment_invalid_transitions_total", target="refunded")
+
+    order_id = new_order_id()
+    _, payment, key = await create_payment(
+        client, order_id=order_id, amount=10.0)
+    await create_payment(client, order_id=order_id, amount=10.0, key=key)
+    r, _, _ = await create_payment(
+        client, order_id=order_id, amount=11.0, key=key)
+    assert r.status_code == 409
+
+    r = await client.post(f"/api/v1/payments/{payment['id']}/refund")
+    assert r.status_code == 409
+
+    assert sample("payment_idempotency_replays_total") == replays + 1
+    assert sample("payment_idempotency_conflicts_total") == conflicts + 1
+    assert sample(
+        "payment_invalid_transitions_total", target="refunded") == invalid + 1
+
+
+@pytest.mark.asyncio
+async def test_db_operation_and_pool_metrics(client):
+    count = sample(
+        "db_operation_duration_seconds_count", operation="create_payment")
+    await create_payment(client, order_id=new_order_id(), amount=1.0)
+
+    assert sample(
+        "db_operation_duration_seconds_count",
+        operation="create_payment") == count + 1
+    assert sample("db_pool_checkout_wait_seconds_count") > 0
+    body = (await client.get("/metrics")).text
+    assert "db_pool_size{" in body
+    assert "db_pool_checked_out{" in body
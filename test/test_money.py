@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+import pytest
+
+from app.core.money import InvalidAmountError, format_minor, to_minor
+from test.utils import create_payment, new_key, new_order_id
+
+
+def test_minor_units_follow_currency_exponent():
+    assert to_minor(Decimal("10.5"), "USD") == 1050
+    assert to_minor(Decimal("1500"), "JPY") == 1500
+    assert to_minor(Decimal("1.234"), "KWD") == 1234
+    assert format_minor(1050, "USD") == "10.50"
+    assert format_minor(1500, "JPY") == "1500"
+    assert format_minor(1234, "KWD") == "1.234"
+    assert format_minor(0, "USD") == "0.00"
+
+    with pytest.raises(InvalidAmountError):
+        to_minor(Decimal("10.005"), "USD")
+    with pytest.raises(InvalidAmountError):
+        to_minor(Decimal("0.5"), "JPY")
+
+
+@pytest.mark.asyncio
+async def test_amounts_are_exact_strings(client):
+    r, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount="0.10")
+    assert r.status_code == 201
+    assert payment["amount"] == "0.10"
+    assert payment["refunded_total"] == "0.00"
+
+    r, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount="1500", currency="JPY")
+    assert payment["amount"] == "1500"
+
+    r = await client.get(f"/api/v1/payments/{payment['id']}")
+    assert r.json()["amount"] == "1500"
+
+    r, _, _ = await create_payment(
+        client, order_id=new_order_id(), amount="10.005")
+    assert r.status_code == 422
+    r, _, _ = await create_payment(
+        client, order_id=new_order_id(), amount="0.5", currency="JPY")
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_replay_matches_equal_amounts_in_any_form(client):
+    order_id, key = new_order_id(), new_key()
+    r, first, _ = await create_payment(
+        client, order_id=order_id, amount="10", key=key)
+    assert r.status_code == 201
+
+    for amount in (10, 10.0, "10.00", "10.0"):
+        r, replay, _ = await create_payment(
+            client, order_id=order_id, amount=amount, key=key)
+        assert r.status_code == 200
+        assert replay == first
+
+    r, _, _ = await create_payment(
+        client, order_id=order_id, amount="10.01", key=key)
+    assert r.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_refund_precision_follows_payment_currency(client):
+    _, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount="100", currency="JPY")
+    url = f"/api/v1/payments/{payment['id']}/refund"
+    await client.post(f"/api/v1/payments/{payment['id']}/confirm")
+
+    r = await client.post(url, json={"amount": "0.5"})
+    assert r.status_code == 422
+
+    r = await client.post(url, json={"amount": "30"})
+    assert r.json()["refunded_total"] == "30"
+    r = await client.get(f"/api/v1/payments/{payment['id']}/refunds")
+    assert [(x["amount"], x["currency"]) for x in r.json()] == [("30", "JPY")]
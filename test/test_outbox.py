@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.db import get_engine
+from app.models.event import PaymentEvent
+from app.services.outbox import FileSink, InMemorySink, relay_batch
+from test.utils import create_payment, new_key
+
+
+async def events_for(payment_id: int) -> list[str]:
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        result = await db.scalars(
+            select(PaymentEvent.event_type)
+            .where(PaymentEvent.payment_id == payment_id)
+            .order_by(PaymentEvent.id)
+        )
+        return list(result)
+
+
+async def drain(sink, batch_size: int = 100) -> int:
+    _, session_factory = get_engine()
+    total = 0
+    while True:
+        async with session_factory() as db:
+            delivered = await relay_batch(db, sink, batch_size)
+        if not delivered:
+            return total
+        total += delivered
+
+
+@pytest.mark.asyncio
+async def test_create_and_transitions_write_events(client):
+    _, payment, key = await create_payment(client, order_id=80001, amount=10.0)
+    pid = payment["id"]
+
+    # повтор создания и повторный confirm событий не порождают
+    await create_payment(client, order_id=80001, amount=10.0, key=key)
+    await client.post(f"/api/v1/payments/{pid}/confirm")
+    await client.post(f"/api/v1/payments/{pid}/confirm")
+    await client.post(f"/api/v1/payments/{pid}/refund")
+    # отклонённый переход тоже
+    await client.post(f"/api/v1/payments/{pid}/fail")
+
+    assert await events_for(pid) == [
+        "payment.created",
+        "payment.confirmed",
+        "payment.refunded",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_create_writes_events_for_new_items_only(client):
+    _, existing, key = await create_payment(client, order_id=80002, amount=10.0)
+
+    r = await client.post("/api/v1/payments/batch", json={"items": [
+        {"idempotency_key": key, "order_id": 80002, "amount": 10.0},
+        {"idempotency_key": new_key(), "order_id": 80003, "amount": 10.0},
+    ]})
+    created = r.json()[1]["payment"]
+
+    assert await events_for(existing["id"]) == ["payment.created"]
+    assert await events_for(created["id"]) == ["payment.created"]
+
+
+@pytest.mark.asyncio
+async def test_relay_delivers_and_removes_events(client):
+    _, payment, _ = await create_payment(client, order_id=80004, amount=10.0)
+    await client.post(f"/api/v1/payments/{payment['id']}/fail")
+
+    sink = InMemorySink()
+    await drain(sink, batch_size=3)
+
+    mine = [e for e in sink.events if e.payment_id == payment["id"]]
+    assert [e.event_type for e in mine] == ["payment.created", "payment.failed"]
+    assert mine[1].payload["status"] == "failed"
+    assert await events_for(payment["id"]) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_sink_keeps_events(client):
+    class BrokenSink(InMemorySink):
+        async def publish(self, events):
+            raise ConnectionError("down")
+
+    _, payment, _ = await create_payment(client, order_id=80005, amount=10.0)
+
+    with pytest.raises(ConnectionError):
+        await drain(BrokenSink())
+
+    assert await events_for(payment["id"]) == ["payment.created"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_relays_do_not_duplicate(client):
+    await drain(InMemorySink())
+    for i in range(30):
+        await create_payment(client, order_id=80100 + i, amount=10.0)
+
+    sinks = [InMemorySink() for _ in range(3)]
+    await asyncio.gather(*(drain(sink, batch_size=4) for sink in sinks))
+
+    ids = [e.id for sink in sinks for e in sink.events]
+    assert len(ids) == len(set(ids))
+    assert len(ids) >= 30
+
+
+@pytest.mark.asyncio
+async def test_file_sink_appends_ndjson(client, tmp_path):
+    _, payment, _ = await create_payment(client, order_id=80006, amount=10.0)
+    path = tmp_path / "events.ndjson"
+
+    await drain(FileSink(path))
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    mine = [e for e in lines if e["payment_id"] == payment["id"]]
+    assert mine[0]["event_type"] == "payment.created"
+    assert mine[0]["payload"]["order_id"] == 80006
@@ -0,0 +1,116 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, insert, text
+
+from app.db import get_engine
+from app.models.idempotency import IdempotencyKey
+from app.models.payment import PAYMENT_ID_SEQ, Payment
+from app.schemas.payment import PaymentCreate, PaymentRead
+from app.services.idempotency import fingerprint
+from app.services.partitions import (
+    MonthPartition,
+    add_months,
+    detach_old_partitions,
+    ensure_partitions,
+    list_partitions,
+)
+from test.utils import new_key, new_order_id
+
+# месяц далеко в прошлом: в общей тестовой БД таких платежей нет
+OLD_MONTH = date(2001, 1, 1)
+ARCHIVE = "test_archive"
+
+
+def test_month_math_and_names():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+    partition = MonthPartition(date(2026, 12, 1))
+    assert partition.name == "payments_p2026_12"
+    assert partition.upper == date(2027, 1, 1)
+    assert "FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')" \
+        in partition.create_sql()
+    assert MonthPartition.from_name(partition.name) == partition
+    assert MonthPartition.from_name("payments_default") is None
+
+
+@pytest_asyncio.fixture
+async def autocommit(app):
+    engine, _ = get_engine()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(
+            f"DROP TABLE IF EXISTS {MonthPartition(OLD_MONTH).name}"))
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {ARCHIVE} CASCADE"))
+        yield conn
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {ARCHIVE} CASCADE"))
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_dry_run(autocommit):
+    existing = {p.name for p in await list_partitions(autocommit)}
+    today = datetime.now(timezone.utc).date()
+
+    planned = await ensure_partitions(autocommit, today, 24, dry_run=True)
+    assert planned
+    assert not existing & set(planned)
+    assert {p.name for p in await list_partitions(autocommit)} == existing
+
+    # текущий месяц и ahead по умолчанию создала миграция
+    assert await ensure_partitions(autocommit, today, 0, dry_run=True) == []
+
+
+@pytest.mark.asyncio
+async def test_old_partition_is_readable_then_archived(client, autocommit):
+    assert await ensure_partitions(autocommit, OLD_MONTH, 0) == [
+        "payments_p2001_01"]
+
+    key = new_key("old")
+    order_id = new_order_id()
+    created_at = datetime(2001, 1, 15, tzinfo=timezone.utc)
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        payment_id = await db.scalar(PAYMENT_ID_SEQ.next_value().select())
+        payment = await db.scalar(insert(Payment).values(
+            id=payment_id, order_id=order_id, amount_minor=500, currency="USD",
+            idempotency_key=key, created_at=created_at,
+            updated_at=created_at).returning(Payment))
+        await db.execute(insert(IdempotencyKey).values(
+            idempotency_key=key, payment_id=payment_id, created_at=created_at,
+            fingerprint=fingerprint(PaymentCreate(
+                order_id=order_id, amount=5.0, currency="USD")),
+            response=PaymentRead.model_validate(payment).model_dump(
+                mode="json"),
+            expires_at=datetime.now(timezone.utc) + timedelta(hours=1)))
+        await db.commit()
+
+    try:
+        r = await client.get(f"/api/v1/payments/{payment_id}")
+        assert r.status_code == 200
+        assert r.json()["created_at"].startswith("2001-01-15")
+
+        # ключ уникален поверх всех секций: повтор отдаёт старый платёж
+        r = await client.post(
+            "/api/v1/payments/", headers={"Idempotency-Key": key},
+            json={"order_id": order_id, "amount": 5.0, "currency": "USD"})
+        assert r.status_code == 200
+        assert r.json()["id"] == payment_id
+
+        r = await client.post(f"/api/v1/payments/{payment_id}/confirm")
+        assert r.json()["status"] == "confirmed"
+
+        detached = await detach_old_partitions(
+            autocommit, add_months(OLD_MONTH, 2), 1, ARCHIVE)
+        assert detached == ["payments_p2001_01"]
+        archived = await autocommit.scalar(text(
+            f"SELECT count(*) FROM {ARCHIVE}.payments_p2001_01"))
+        assert archived == 1
+        assert (await client.get(f"/api/v1/payments/{payment_id}")).status_code \
+            == 404
+    finally:
+        async with session_factory() as db:
+            await db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.idempotency_key == key))
+            await db.commit()
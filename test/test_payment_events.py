@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+
+from app.db import get_engine
+from app.services.notifications import (
+    PaymentHub,
+    connect_listener,
+    set_payment_hub,
+)
+from test.utils import create_payment, new_order_id
+
+
+def listening_hub() -> PaymentHub:
+    return PaymentHub(connect_listener, reconnect_delay=0.05)
+
+
+@pytest_asyncio.fixture
+async def hubs(app):
+    """Фабрика hub с LISTEN; каждый — как отдельный воркер."""
+    created = []
+
+    def make() -> PaymentHub:
+        created.append(listening_hub())
+        return created[-1]
+
+    yield make
+    set_payment_hub(None)
+    for hub in created:
+        await hub.close()
+
+
+@pytest_asyncio.fixture
+async def checkins(app):
+    """Сколько раз соединение вернулось в пул с начала теста."""
+    engine, _ = get_engine()
+    count = [0]
+
+    def on_checkin(*args):
+        count[0] += 1
+
+    event.listen(engine.sync_engine.pool, "checkin", on_checkin)
+    yield count
+    event.remove(engine.sync_engine.pool, "checkin", on_checkin)
+
+
+async def subscribed(
+    hub: PaymentHub,
+    payment_id: int,
+    checkins: list[int],
+) -> None:
+    """Подписчик есть и прочитал первый снимок (вернул соединение в пул)."""
+    engine, _ = get_engine()
+    before = checkins[0]
+    for _ in range(200):
+        if hub.subscribers(payment_id):
+            break
+        await asyncio.sleep(0.01)
+    else:
+        raise AssertionError("no subscriber")
+    for _ in range(200):
+        if checkins[0] > before and engine.pool.checkedout() == 0:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("subscriber did not read the payment")
+
+
+def sse_statuses(body: str) -> list[str]:
+    return [
+        line.split('"status":"')[1].split('"')[0]
+        for line in body.splitlines() if line.startswith("data: ")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sse_streams_status_until_terminal(client, hubs, checkins):
+    hub = hubs()
+    set_payment_hub(hub)
+    _, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount=5.0)
+    pid = payment["id"]
+
+    stream = asyncio.create_task(client.get(f"/api/v1/payments/{pid}/events"))
+    await subscribed(hub, pid, checkins)
+    await client.post(f"/api/v1/payments/{pid}/confirm")
+    await client.post(f"/api/v1/payments/{pid}/refund")
+
+    r = await asyncio.wait_for(stream, timeout=5)
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert sse_statuses(r.text) == ["pending", "confirmed", "refunded"]
+    assert hub.subscribers(pid) == 0
+
+
+@pytest.mark.asyncio
+async def test_long_poll(client, hubs):
+    set_payment_hub(hubs())
+    _, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount=5.0)
+    url = f"/api/v1/payments/{payment['id']}/events"
+
+    # статус уже отличается от известного клиенту — ответ сразу
+    r = await client.get(url, params={"wait": 30, "status": "confirmed"})
+    assert r.json()["status"] == "pending"
+
+    # не изменился за wait — текущий снимок
+    r = await client.get(url, params={"wait": 0.05, "status": "pending"})
+    assert r.status_code == 200
+    assert r.json() == payment
+
+    r = await client.get("/api/v1/payments/0/events", params={"wait": 1})
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_long_poll_woken_by_other_worker(client, hubs, checkins):
+    waiting, other = hubs(), hubs()
+    set_payment_hub(waiting)
+    _, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount=5.0)
+    pid = payment["id"]
+
+    poll = asyncio.create_task(client.get(
+        f"/api/v1/payments/{pid}/events",
+        params={"wait": 10, "status": "pending"}))
+    # прочитав платёж, ожидающий клиент отдаёт соединение пулу
+    await subscribed(waiting, pid, checkins)
+    assert not poll.done()
+
+    # статус меняет другой воркер: до waiting доходит только NOTIFY
+    set_payment_hub(other)
+    await client.post(f"/api/v1/payments/{pid}/confirm")
+
+    r = await asyncio.wait_for(poll, timeout=5)
+    assert r.json()["status"] == "confirmed"
+
+
+@pytest.mark.asyncio
+async def test_rereads_after_listen_connection_loss(client, hubs, checkins):
+    hub = hubs()
+    set_payment_hub(hub)
+    _, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount=5.0)
+    pid = payment["id"]
+
+    poll = asyncio.create_task(client.get(
+        f"/api/v1/payments/{pid}/events",
+        params={"wait": 10, "status": "pending"}))
+    await subscribed(hub, pid, checkins)
+
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        await db.execute(text(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+            "WHERE query = 'LISTEN \"payment_status\"' "
+            "AND pid <> pg_backend_pid()"))
+        # изменение, пока воркер не слушает: уведомление не дойдёт
+        await db.execute(text(
+            "UPDATE payments SET status = 'FAILED' WHERE id = :id"),
+            {"id": pid})
+        await db.commit()
+
+    r = await asyncio.wait_for(poll, timeout=5)
+    assert r.json()["status"] == "failed"
@@ -11,7 +11,7 @@ async def test_create_payment_returns_201(client):
     body = r.json()
     assert body["id"] > 0
     assert body["order_id"] == 10001
-    assert body["amount"] == 10.0
+    assert body["amount"] == "10.00"
     assert body["currency"] == "USD"
     assert body["status"] == "pending"
     assert "created_at" in body
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.db import get_engine
+from app.schemas.payment import PaymentRead
+from app.services.providers import (
+    CaptureOutcome,
+    FakeProvider,
+    ProviderGateway,
+    ProviderLimit,
+    ProviderUnavailableError,
+    parse_provider_limits,
+    set_provider_gateway,
+)
+from test.test_outbox import events_for
+from test.utils import create_payment, new_order_id
+
+
+class GatedProvider(FakeProvider):
+    """capture ждёт release; started — вызов начался."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def capture(self, payment):
+        self.started.set()
+        await self.release.wait()
+        return await super().capture(payment)
+
+
+@pytest_asyncio.fixture
+async def gateway(app):
+    def install(provider, limit=ProviderLimit(10, 5.0)) -> ProviderGateway:
+        gateway = ProviderGateway([provider], limit)
+        set_provider_gateway(gateway)
+        return gateway
+
+    yield install
+    set_provider_gateway(None)
+
+
+async def pending_payment(client) -> int:
+    _, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount=10.0)
+    return payment["id"]
+
+
+@pytest.mark.asyncio
+async def test_fake_provider_is_deterministic():
+    payments = [
+        PaymentRead(
+            id=i, order_id=1, amount=1.0, currency="USD", status="pending",
+            provider="fake", created_at="2026-01-01T00:00:00Z",
+            updated_at="2026-01-01T00:00:00Z")
+        for i in range(200)
+    ]
+
+    async def outcomes(provider):
+        result = []
+        for p in payments:
+            try:
+                result.append(await provider.capture(p))
+            except ProviderUnavailableError:
+                result.append(None)
+        return result
+
+    a = await outcomes(FakeProvider(
+        failure_rate=0.2, decline_rate=0.3, seed="s"))
+    b = await outcomes(FakeProvider(
+        failure_rate=0.2, decline_rate=0.3, seed="s"))
+    assert a == b
+    assert 20 < a.count(None) < 60
+    assert 30 < a.count(CaptureOutcome.DECLINED) < 90
+
+    assert parse_provider_limits(" fake=5/1.5, acme=2/10 ") == {
+        "fake": ProviderLimit(5, 1.5), "acme": ProviderLimit(2, 10.0)}
+    with pytest.raises(ValueError):
+        parse_provider_limits("fake=5")
+
+
+@pytest.mark.asyncio
+async def test_confirm_releases_connection_while_waiting(client, gateway):
+    provider = GatedProvider()
+    gateway(provider)
+    pid = await pending_payment(client)
+
+    confirm = asyncio.create_task(
+        client.post(f"/api/v1/payments/{pid}/confirm"))
+    await asyncio.wait_for(provider.started.wait(), timeout=5)
+    engine, _ = get_engine()
+    assert engine.pool.checkedout() == 0
+
+    provider.release.set()
+    r = await confirm
+    assert r.status_code == 200
+    assert r.json()["status"] == "confirmed"
+    assert provider.captured == {pid}
+
+
+@pytest.mark.asyncio
+async def test_slow_provider_is_limited_and_times_out(client, gateway):
+    provider = GatedProvider()
+    gateway(provider, ProviderLimit(1, 0.2))
+    first, second = await pending_payment(client), await pending_payment(client)
+
+    blocked = asyncio.create_task(
+        client.post(f"/api/v1/payments/{first}/confirm"))
+    await asyncio.wait_for(provider.started.wait(), timeout=5)
+
+    # место у провайдера занято, ждать дольше таймаута не будем
+    r = await client.post(f"/api/v1/payments/{second}/confirm")
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+    r = await client.get(f"/api/v1/payments/{second}")
+    assert r.json()["status"] == "pending"
+
+    # первый тоже упирается в таймаут и остаётся pending
+    r = await blocked
+    assert r.status_code == 503
+    provider.release.set()
+    r = await client.post(f"/api/v1/payments/{first}/confirm")
+    assert r.json()["status"] == "confirmed"
+
+
+@pytest.mark.asyncio
+async def test_declined_capture_fails_payment(client, gateway):
+    gateway(FakeProvider(decline_rate=1.0))
+    pid = await pending_payment(client)
+
+    r = await client.post(f"/api/v1/payments/{pid}/confirm")
+    assert r.status_code == 402
+    r = await client.get(f"/api/v1/payments/{pid}")
+    assert r.json()["status"] == "failed"
+    assert await events_for(pid) == ["payment.created", "payment.failed"]
+
+
+@pytest.mark.asyncio
+async def test_capture_voided_when_payment_changed_meanwhile(client, gateway):
+    provider = GatedProvider()
+    gateway(provider)
+    pid = await pending_payment(client)
+
+    confirm = asyncio.create_task(
+        client.post(f"/api/v1/payments/{pid}/confirm"))
+    await asyncio.wait_for(provider.started.wait(), timeout=5)
+    r = await client.post(f"/api/v1/payments/{pid}/fail")
+    assert r.status_code == 200
+
+    provider.release.set()
+    r = await confirm
+    assert r.status_code == 409
+    assert provider.voided == {pid}
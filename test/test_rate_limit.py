@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api.limits import (
+    Limit,
+    LoadSheddingMiddleware,
+    MemoryRateLimitBackend,
+    parse_route_limits,
+)
+from app.core.config import get_settings
+from app.core.metrics import PoolWaitTracker
+
+
+def test_parse_route_limits():
+    assert parse_route_limits(
+        "post /api/v1/payments/=5/10, GET /api/v1/payments/{payment_id}=2.5,"
+    ) == {
+        "POST /api/v1/payments/": Limit(5.0, 10),
+        "GET /api/v1/payments/{payment_id}": Limit(2.5, 3),
+    }
+    assert parse_route_limits("") == {}
+    with pytest.raises(ValueError):
+        parse_route_limits("POST=5/10")
+
+
+@pytest.mark.asyncio
+async def test_memory_bucket_refills():
+    now = [0.0]
+    backend = MemoryRateLimitBackend(max_entries=10, clock=lambda: now[0])
+    limit = Limit(rate=2, burst=3)
+
+    assert [await backend.acquire("a", limit) for _ in range(3)] == [0, 0, 0]
+    assert await backend.acquire("a", limit) == pytest.approx(0.5)
+    # у другого клиента своё ведро
+    assert await backend.acquire("b", limit) == 0
+
+    now[0] = 0.5
+    assert await backend.acquire("a", limit) == 0
+    assert await backend.acquire("a", limit) > 0
+
+    # долилось до burst, не больше
+    now[0] = 100
+    assert [await backend.acquire("a", limit) for _ in range(4)][-1] > 0
+
+
+def test_pool_wait_tracker_sees_stalled_checkout():
+    now = [0.0]
+    tracker = PoolWaitTracker(half_life=1.0, alpha=0.5, clock=lambda: now[0])
+
+    token = tracker.start()
+    now[0] = 2.0
+    # ожидание ещё идёт, а уже видно
+    assert tracker.value() == 2.0
+    assert tracker.finish(token) == 2.0
+    assert tracker.value() == 1.0
+
+    # без новых замеров затухает
+    now[0] = 3.0
+    assert tracker.value() == 0.5
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_per_client_and_route(app):
+    from app.main import get_app
+
+    settings = get_settings().model_copy(update={
+        "RATE_LIMIT_ENABLED": True,
+        "RATE_LIMIT_ROUTES": "GET /api/v1/payments/{payment_id}=0.01/2",
+    })
+    limited = get_app(settings)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=limited), base_url="http://test",
+    ) as client:
+        statuses = [
+            (await client.get(
+                "/api/v1/payments/0", headers={"X-API-Key": "a"})).status_code
+            for _ in range(3)
+        ]
+        assert statuses == [404, 404, 429]
+
+        r = await client.get("/api/v1/payments/0", headers={"X-API-Key": "a"})
+        assert r.status_code == 429
+        assert r.json() == {"detail": "Too many requests"}
+        assert int(r.headers["retry-after"]) > 1
+
+        # другой ключ и маршрут без лимита не затронуты
+        r = await client.get("/api/v1/payments/0", headers={"X-API-Key": "b"})
+        assert r.status_code == 404
+        r = await client.get(
+            "/api/v1/payments/?limit=1", headers={"X-API-Key": "a"})
+        assert r.status_code == 200
+
+        metrics = (await client.get("/metrics")).text
+        assert ('http_requests_rate_limited_total'
+                '{route="/api/v1/payments/{payment_id}"}') in metrics
+        assert ('route="/api/v1/payments/{payment_id}",status="429"'
+                in metrics)
+
+
+@pytest.mark.asyncio
+async def test_load_shedding():
+    released = asyncio.Event()
+    now = [0.0]
+    tracker = PoolWaitTracker(clock=lambda: now[0])
+    app = FastAPI()
+
+    @app.get("/api/slow")
+    async def slow():
+        await released.wait()
+        return {}
+
+    @app.get("/health")
+    async def health():
+        return {}
+
+    app.add_middleware(
+        LoadSheddingMiddleware, max_in_flight=1, max_pool_wait=0.5,
+        prefix="/api", pool_wait=tracker)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test",
+    ) as client:
+        first = asyncio.create_task(client.get("/api/slow"))
+        await asyncio.sleep(0.05)
+
+        r = await client.get("/api/slow")
+        assert r.status_code == 503
+        assert r.headers["retry-after"] == "1"
+        assert (await client.get("/health")).status_code == 200
+
+        released.set()
+        assert (await first).status_code == 200
+
+        # пул не отдаёт соединение дольше порога
+        token = tracker.start()
+        now[0] = 1.0
+        assert (await client.get("/api/slow")).status_code == 503
+        tracker.finish(token)
+        assert (await client.get("/api/slow")).status_code == 200
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from test.test_outbox import events_for
+from test.utils import create_payment, new_key, new_order_id
+
+
+async def confirmed_payment(client, amount: float = 10.0) -> int:
+    _, payment, _ = await create_payment(
+        client, order_id=new_order_id(), amount=amount)
+    await client.post(f"/api/v1/payments/{payment['id']}/confirm")
+    return payment["id"]
+
+
+@pytest.mark.asyncio
+async def test_partial_refunds_then_rest(client):
+    pid = await confirmed_payment(client)
+
+    r = await client.post(
+        f"/api/v1/payments/{pid}/refund", json={"amount": 3.25})
+    assert r.status_code == 200
+    assert r.json()["status"] == "confirmed"
+    assert r.json()["refunded_total"] == "3.25"
+
+    r = await client.post(
+        f"/api/v1/payments/{pid}/refund", json={"amount": 7.0})
+    assert r.status_code == 409
+    assert r.json()["detail"] == "Refund exceeds the refundable amount"
+
+    # без суммы — весь остаток
+    r = await client.post(f"/api/v1/payments/{pid}/refund")
+    assert r.status_code == 200
+    assert r.json()["status"] == "refunded"
+    assert r.json()["refunded_total"] == "10.00"
+
+    r = await client.get(f"/api/v1/payments/{pid}")
+    assert r.json()["refunded_total"] == "10.00"
+    r = await client.get(f"/api/v1/payments/{pid}/refunds")
+    assert [x["amount"] for x in r.json()] == ["3.25", "6.75"]
+
+    r = await client.post(
+        f"/api/v1/payments/{pid}/refund", json={"amount": 1.0})
+    assert r.status_code == 409
+    assert r.json()["detail"] == "Invalid status transition"
+
+    assert await events_for(pid) == [
+        "payment.created",
+        "payment.confirmed",
+        "payment.partially_refunded",
+        "payment.refunded",
+    ]
+
+    r = await client.get("/api/v1/payments/0/refunds")
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_refund_idempotency_key(client):
+    pid = await confirmed_payment(client)
+    key = new_key("refund")
+    url = f"/api/v1/payments/{pid}/refund"
+
+    r1 = await client.post(
+        url, json={"amount": 2.0}, headers={"Idempotency-Key": key})
+    r2 = await client.post(
+        url, json={"amount": 2.0}, headers={"Idempotency-Key": key})
+    assert r1.status_code == r2.status_code == 200
+    assert r2.json()["refunded_total"] == "2.00"
+
+    r = await client.post(
+        url, json={"amount": 3.0}, headers={"Idempotency-Key": key})
+    assert r.status_code == 409
+
+    r = await client.get(f"/api/v1/payments/{pid}/refunds")
+    assert [x["amount"] for x in r.json()] == ["2.00"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_partial_refunds_never_exceed_amount(client):
+    pid = await confirmed_payment(client)
+
+    responses = await asyncio.gather(*[
+        client.post(f"/api/v1/payments/{pid}/refund", json={"amount": 3.0})
+        for _ in range(6)
+    ])
+    assert sorted(r.status_code for r in responses) == [200] * 3 + [409] * 3
+
+    r = await client.get(f"/api/v1/payments/{pid}")
+    assert r.json()["status"] == "confirmed"
+    assert r.json()["refunded_total"] == "9.00"
+
+
+@pytest.mark.asyncio
+async def test_batch_refunds(client):
+    first = await confirmed_payment(client)
+    second = await confirmed_payment(client, amount=5.0)
+    _, pending, _ = await create_payment(
+        client, order_id=new_order_id(), amount=5.0)
+    key = new_key("refund")
+
+    r = await client.post("/api/v1/payments/refunds/batch", json={"items": [
+        {"payment_id": first, "amount": 4.0, "idempotency_key": key},
+        {"payment_id": first, "amount": 4.0, "idempotency_key": key},
+        {"payment_id": first, "amount": 7.0},
+        {"payment_id": first},
+        {"payment_id": second, "amount": 1.5},
+        {"payment_id": pending["id"]},
+        {"payment_id": 0},
+    ]})
+    assert r.status_code == 200
+    body = r.json()
+    assert [x["outcome"] for x in body] == [
+        "refunded", "replayed", "exceeds_balance", "refunded",
+        "refunded", "invalid_status", "not_found",
+    ]
+    assert body[0]["refund"] == body[1]["refund"]
+    assert body[3]["refund"]["amount"] == "6.00"
+    assert body[3]["payment"]["status"] == "refunded"
+    assert body[4]["payment"]["refunded_total"] == "1.50"
+    assert body[6]["payment"] is None
+
+    # пачка — одно событие на платёж
+    assert await events_for(first) == [
+        "payment.created", "payment.confirmed", "payment.refunded"]
+    assert await events_for(second) == [
+        "payment.created", "payment.confirmed", "payment.partially_refunded"]
@@ -0,0 +1,170 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, func, insert, select, text, update
+
+from app.db import get_engine
+from app.models.event import PaymentEvent
+from app.models.idempotency import IdempotencyKey
+from app.models.payment import PAYMENT_ID_SEQ, Payment, PaymentStatus
+from app.models.stats import PaymentDailyStats
+from app.services.partitions import MonthPartition, ensure_partitions
+from app.services.stats import reconcile_stats, refresh_stats
+from test.utils import new_key, new_order_id
+
+# отдельная секция далеко в прошлом: дни фикстуры не пересекаются с другими
+OLD_MONTH = date(2002, 5, 1)
+DAY_1, DAY_2 = date(2002, 5, 1), date(2002, 5, 2)
+OVERLAP = timedelta(seconds=60)
+# сверка без запаса: иначе она сама пересчитает дни фикстуры до сравнения
+NO_OVERLAP = timedelta(0)
+
+
+@pytest_asyncio.fixture
+async def old_payments(app):
+    """Платежи за два дня OLD_MONTH; updated_at — сейчас, как у только что записанных."""
+    engine, session_factory = get_engine()
+    partition = MonthPartition(OLD_MONTH).name
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"DROP TABLE IF EXISTS {partition}"))
+        await ensure_partitions(conn, OLD_MONTH, 0)
+
+    ids = []
+    order_id = new_order_id()
+    async with session_factory() as db:
+        for day, hour, amount, currency in [
+            (DAY_1, 0, 1000, "USD"),
+            (DAY_1, 23, 550, "USD"),
+            (DAY_1, 12, 700, "EUR"),
+            (DAY_2, 1, 100, "USD"),
+        ]:
+            created_at = datetime.combine(
+                day, datetime.min.time(), tzinfo=timezone.utc
+            ) + timedelta(hours=hour)
+            payment_id = await db.scalar(PAYMENT_ID_SEQ.next_value().select())
+            key = new_key("stats")
+            await db.execute(insert(Payment).values(
+                id=payment_id, order_id=order_id, amount_minor=amount,
+                currency=currency, status=PaymentStatus.PENDING,
+                idempotency_key=key,
+                created_at=created_at, updated_at=func.now()))
+            # по нему API находит секцию платежа
+            await db.execute(insert(IdempotencyKey).values(
+                payment_id=payment_id, created_at=created_at,
+                idempotency_key=key))
+            ids.append(payment_id)
+        await db.commit()
+
+    yield ids
+
+    async with session_factory() as db:
+        await db.execute(delete(PaymentEvent).where(
+            PaymentEvent.payment_id.in_(ids)))
+        await db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.payment_id.in_(ids)))
+        await db.execute(delete(PaymentDailyStats).where(
+            PaymentDailyStats.day.between(DAY_1, DAY_2)))
+        await db.commit()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"DROP TABLE IF EXISTS {partition}"))
+
+
+async def rollup() -> dict:
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        rows = (await db.execute(
+            select(PaymentDailyStats)
+            .where(PaymentDailyStats.day.between(DAY_1, DAY_2)))).scalars()
+        return {
+            (r.day, r.currency, r.status): (r.payments, r.amount_minor)
+            for r in rows
+        }
+
+
+@pytest.mark.asyncio
+async def test_refresh_picks_up_new_and_changed_payments(client, old_payments):
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        days = await refresh_stats(db, OVERLAP)
+    assert {DAY_1, DAY_2} <= set(days)
+    assert await rollup() == {
+        (DAY_1, "USD", PaymentStatus.PENDING): (2, 1550),
+        (DAY_1, "EUR", PaymentStatus.PENDING): (1, 700),
+        (DAY_2, "USD", PaymentStatus.PENDING): (1, 100),
+    }
+
+    r = await client.post(f"/api/v1/payments/{old_payments[0]}/confirm")
+    assert r.status_code == 200
+    async with session_factory() as db:
+        assert DAY_1 in await refresh_stats(db, OVERLAP)
+    assert await rollup() == {
+        (DAY_1, "USD", PaymentStatus.PENDING): (1, 550),
+        (DAY_1, "USD", PaymentStatus.CONFIRMED): (1, 1000),
+        (DAY_1, "EUR", PaymentStatus.PENDING): (1, 700),
+        (DAY_2, "USD", PaymentStatus.PENDING): (1, 100),
+    }
+
+    # пока один пересчёт держит водяной знак, другой не ждёт
+    async with session_factory() as holder, session_factory() as db:
+        await holder.execute(text(
+            "SELECT 1 FROM payment_stats_watermark FOR UPDATE"))
+        assert await refresh_stats(db, OVERLAP) is None
+        await holder.rollback()
+
+
+@pytest.mark.asyncio
+async def test_reconcile_detects_and_fixes_drift(old_payments):
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        await refresh_stats(db, OVERLAP)
+        await db.execute(
+            update(PaymentDailyStats)
+            .where(PaymentDailyStats.day == DAY_1,
+                   PaymentDailyStats.currency == "USD")
+            .values(payments=3))
+        await db.execute(delete(PaymentDailyStats).where(
+            PaymentDailyStats.day == DAY_2))
+        await db.commit()
+
+    async with session_factory() as db:
+        mismatches = await reconcile_stats(db, DAY_1, DAY_2, NO_OVERLAP)
+    assert [(m.day, m.currency, m.rollup, m.actual) for m in mismatches] == [
+        (DAY_1, "USD", (3, 1550), (2, 1550)),
+        (DAY_2, "USD", None, (1, 100)),
+    ]
+
+    async with session_factory() as db:
+        assert len(await reconcile_stats(
+            db, DAY_1, DAY_2, NO_OVERLAP, fix=True)) == 2
+    async with session_factory() as db:
+        assert await reconcile_stats(db, DAY_1, DAY_2, NO_OVERLAP) == []
+
+
+@pytest.mark.asyncio
+async def test_stats_endpoint(client, old_payments):
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        await refresh_stats(db, OVERLAP)
+
+    r = await client.get("/api/v1/payments/stats", params={
+        "day_from": "2002-05-01", "day_to": "2002-05-02",
+        "currency": "USD"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["items"] == [
+        {"day": "2002-05-01", "currency": "USD", "status": "pending",
+         "payments": 2, "amount": "15.50"},
+        {"day": "2002-05-02", "currency": "USD", "status": "pending",
+         "payments": 1, "amount": "1.00"},
+    ]
+    assert body["as_of"]
+
+    r = await client.get("/api/v1/payments/stats", params={
+        "day_from": "2002-05-02", "day_to": "2002-05-01"})
+    assert r.status_code == 400
+    r = await client.get("/api/v1/payments/stats", params={
+        "day_from": "2000-01-01", "day_to": "2002-05-01"})
+    assert r.status_code == 400
@@ -0,0 +1,138 @@
+import pytest
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.db import get_engine
+from app.models.event import PaymentEvent
+from app.services.providers import FakeProvider, get_provider_gateway
+from test.utils import create_payment, new_order_id
+
+URL = "/api/v1/payments/transitions:bulk"
+
+
+async def new_payments(client, count: int) -> list[int]:
+    order_id = new_order_id()
+    ids = []
+    for _ in range(count):
+        _, payment, _ = await create_payment(
+            client, order_id=order_id, amount="10")
+        ids.append(payment["id"])
+    return ids
+
+
+async def status_of(client, payment_id: int) -> str:
+    return (await client.get(f"/api/v1/payments/{payment_id}")).json()["status"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_json_applies_allowed_transitions(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "TRANSITIONS_CHUNK_SIZE", 2)
+    a, b, c, d, e = await new_payments(client, 5)
+    await client.post(f"/api/v1/payments/{d}/fail")
+    await client.post(f"/api/v1/payments/{e}/confirm")
+
+    r = await client.post(URL, json={"items": [
+        {"id": a, "status": "confirmed"},
+        {"id": b, "status": "failed"},
+        {"id": c, "status": "confirmed"},
+        {"id": d, "status": "confirmed"},
+        {"id": e, "status": "refunded"},
+        {"id": a, "status": "failed"},
+        {"id": 0, "status": "confirmed"},
+        {"id": d, "status": "failed"},
+    ]})
+    assert r.status_code == 200
+    body = r.json()
+    assert [(i["id"], i["outcome"], i["status"]) for i in body["results"]] == [
+        (a, "applied", "confirmed"),
+        (b, "applied", "failed"),
+        (c, "applied", "confirmed"),
+        (d, "invalid_status", "failed"),
+        (e, "applied", "refunded"),
+        (a, "duplicate", None),
+        (0, "not_found", None),
+        (d, "duplicate", None),
+    ]
+    assert body["counts"] == {
+        "applied": 4, "invalid_status": 1, "duplicate": 2, "not_found": 1}
+    assert await status_of(client, a) == "confirmed"
+    assert await status_of(client, b) == "failed"
+    r = await client.get(f"/api/v1/payments/{e}/refunds")
+    assert [refund["amount"] for refund in r.json()] == ["10.00"]
+
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        events = (await db.scalars(
+            select(PaymentEvent.event_type)
+            .where(PaymentEvent.payment_id == a)
+            .order_by(PaymentEvent.id)
+        )).all()
+    assert events == ["payment.created", "payment.confirmed"]
+
+    # повтор того же файла ничего не меняет
+    r = await client.post(URL, json={"items": [
+        {"id": a, "status": "confirmed"},
+        {"id": b, "status": "failed"},
+        {"id": e, "status": "refunded"},
+    ]})
+    assert [i["outcome"] for i in r.json()["results"]] == ["unchanged"] * 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_confirm_skips_provider_capture(client):
+    [pid] = await new_payments(client, 1)
+    provider = get_provider_gateway().provider("fake")
+    assert isinstance(provider, FakeProvider)
+
+    r = await client.post(URL, json={"items": [
+        {"id": pid, "status": "confirmed"}]})
+    assert r.json()["results"][0]["outcome"] == "applied"
+    assert pid not in provider.captured
+
+
+@pytest.mark.asyncio
+async def test_bulk_csv_upload_streams(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "TRANSITIONS_CHUNK_SIZE", 2)
+    a, b, c = await new_payments(client, 3)
+    body = (
+        "\ufeffstatus,id,amount\r\n"
+        f"CONFIRMED,{a},10.00\r\n"
+        "confirmed,oops,10.00\r\n"
+        "\r\n"
+        f"failed,{b},10.00\r\n"
+        f"settled,{c},10.00\r\n"
+        f"failed,{c}"
+    ).encode()
+
+    async def chunks():
+        # границы кусков посреди строк и символов
+        for start in range(0, len(body), 2):
+            yield body[start:start + 2]
+
+    r = await client.post(
+        URL, content=chunks(), headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [(i["id"], i["outcome"], i["line"]) for i in results] == [
+        (a, "applied", None),
+        (None, "invalid_row", 3),
+        (b, "applied", None),
+        (None, "invalid_row", 6),
+        (c, "applied", None),
+    ]
+    assert await status_of(client, c) == "failed"
+
+
+@pytest.mark.asyncio
+async def test_bulk_rejects_bad_input(client):
+    r = await client.post(
+        URL, content=b"payment,state\n1,confirmed\n",
+        headers={"Content-Type": "text/csv"})
+    assert r.status_code == 422
+
+    r = await client.post(URL, json={"items": [{"id": 1, "status": "paid"}]})
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"][:2] == ["body", "items"]
+
+    r = await client.post(URL, json={"items": []})
+    assert r.status_code == 422
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+
+from app.db import get_engine
+from app.models.webhook import WebhookEndpoint
+from app.services.outbox import relay_batch
+from app.services.webhooks import (
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    CircuitBreaker,
+    WebhookDelivery,
+    WebhookDispatcher,
+    WebhookSink,
+    verify_signature,
+)
+from test.utils import create_payment
+
+
+class StubServer:
+    """Локальный HTTP-сервер: отвечает кодами из statuses (последний —
+    на все остальные запросы) и записывает полученные запросы."""
+
+    def __init__(self, statuses=(200,), delay: float = 0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests: list[tuple[dict[str, str], bytes]] = []
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/hook"
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(
+            self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(
+                    int(headers.get("content-length", 0)))
+                self.requests.append((headers, body))
+
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                code = self.statuses[min(
+                    len(self.requests) - 1, len(self.statuses) - 1)]
+                writer.write(
+                    f"HTTP/1.1 {code} X\r\ncontent-length: 0\r\n\r\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def make_dispatcher(**overrides) -> WebhookDispatcher:
+    options = dict(
+        concurrency=4,
+        max_attempts=4,
+        backoff_base=0.01,
+        backoff_max=0.05,
+        max_in_flight_per_endpoint=2,
+        breaker_threshold=100,
+        breaker_reset=60,
+    )
+    options.update(overrides)
+    timeout = options.pop("timeout", 2.0)
+    return WebhookDispatcher(httpx.AsyncClient(timeout=timeout), **options)
+
+
+def delivery(url: str, endpoint_id: int = 1, event_id: int = 1):
+    return WebhookDelivery(
+        endpoint_id=endpoint_id,
+        url=url,
+        secret="s3cret",
+        event_id=event_id,
+        event_type="payment.confirmed",
+        body=b'{"id": 1}',
+    )
+
+
+@pytest_asyncio.fixture
+async def dispatcher():
+    d = make_dispatcher()
+    await d.start()
+    yield d
+    await d.stop()
+
+
+@pytest.mark.asyncio
+async def test_delivery_is_signed(dispatcher):
+    async with StubServer() as stub:
+        dispatcher.submit(delivery(stub.url))
+        await asyncio.wait_for(dispatcher.join(), 5)
+
+    headers, body = stub.requests[0]
+    assert verify_signature(
+        "s3cret",
+        int(headers[TIMESTAMP_HEADER.lower()]),
+        body,
+        headers[SIGNATURE_HEADER.lower()],
+    )
+    assert dispatcher.stats["delivered"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_with_backoff_until_success(dispatcher):
+    async with StubServer(statuses=(500, 503, 200)) as stub:
+        dispatcher.submit(delivery(stub.url))
+        await asyncio.wait_for(dispatcher.join(), 5)
+
+    assert len(stub.requests) == 3
+    assert dispatcher.stats["delivered"] == 1
+    assert dispatcher.stats["retried"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts_and_on_4xx(dispatcher):
+    async with StubServer(statuses=(500,)) as failing, \
+            StubServer(statuses=(400,)) as rejecting:
+        dispatcher.submit(delivery(failing.url, endpoint_id=1))
+        dispatcher.submit(delivery(rejecting.url, endpoint_id=2))
+        await asyncio.wait_for(dispatcher.join(), 5)
+
+    assert len(failing.requests) == 4
+    assert len(rejecting.requests) == 1
+    assert dispatcher.stats["failed"] == 1
+    assert dispatcher.stats["rejected"] == 1
+
+
+def test_backoff_is_exponential_with_full_jitter():
+    d = make_dispatcher(backoff_base=1, backoff_max=10, rng=lambda: 1.0)
+    assert [d.backoff(a) for a in range(1, 6)] == [1, 2, 4, 8, 10]
+
+    d = make_dispatcher(backoff_base=1, backoff_max=10, rng=lambda: 0.5)
+    assert d.backoff(3) == 2
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow()  # одна пробная попытка
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_short_circuits_requests():
+    d = make_dispatcher(max_attempts=10, breaker_threshold=2, breaker_reset=60)
+    await d.start()
+    try:
+        async with StubServer(statuses=(500,)) as stub:
+            d.submit(delivery(stub.url))
+            await asyncio.wait_for(d.join(), 5)
+    finally:
+        await d.stop()
+
+    # после двух неудач цепь разомкнута — остальные попытки без запросов
+    assert len(stub.requests) == 2
+    assert d.stats["short_circuited"] == 8
+    assert d.stats["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_endpoint_does_not_block_others():
+    d = make_dispatcher(
+        concurrency=4, max_in_flight_per_endpoint=2, max_attempts=1,
+        timeout=1.0)
+    await d.start()
+    try:
+        async with StubServer(delay=0.8) as slow, StubServer() as fast:
+            for i in range(4):
+                d.submit(delivery(slow.url, endpoint_id=1, event_id=i))
+            started = time.perf_counter()
+            for i in range(20):
+                d.submit(delivery(fast.url, endpoint_id=2, event_id=i))
+
+            while len(fast.requests) < 20:
+                await asyncio.sleep(0.01)
+            fast_elapsed = time.perf_counter() - started
+            await asyncio.wait_for(d.join(), 10)
+    finally:
+        await d.stop()
+
+    # быстрый получатель обслужен, пока медленный держит всего 2 воркера
+    assert fast_elapsed < 0.8
+    assert d.stats["delivered"] == 24
+
+
+@pytest_asyncio.fixture
+async def only_our_endpoints(app):
+    # в общей тестовой БД могут остаться endpoint'ы прошлых прогонов
+    _, session_factory = get_engine()
+    async with session_factory() as db:
+        await db.execute(update(WebhookEndpoint).values(is_active=False))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_endpoint_registration_api(client, only_our_endpoints):
+    r = await client.post("/api/v1/webhooks/endpoints/", json={
+        "url": "http://merchant.example/hook",
+        "event_types": ["payment.refunded"],
+    })
+    assert r.status_code == 201
+    created = r.json()
+    assert len(created["secret"]) == 64
+
+    listed = (await client.get("/api/v1/webhooks/endpoints/")).json()
+    assert [e["id"] for e in listed] == [created["id"]]
+    assert "secret" not in listed[0]
+
+    r = await client.delete(f"/api/v1/webhooks/endpoints/{created['id']}")
+    assert r.status_code == 204
+    assert (await client.get("/api/v1/webhooks/endpoints/")).json() == []
+
+    r = await client.post("/api/v1/webhooks/endpoints/", json={
+        "url": "http://merchant.example/hook",
+        "event_types": ["payment.created"],
+    })
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_status_changes_reach_registered_endpoints(
+    client, only_our_endpoints,
+):
+    _, session_factory = get_engine()
+    d = make_dispatcher()
+    await d.start()
+    try:
+        async with StubServer() as all_events, StubServer() as refunds_only:
+            r1 = await client.post(
+                "/api/v1/webhooks/endpoints/", json={"url": all_events.url})
+            r2 = await client.post("/api/v1/webhooks/endpoints/", json={
+                "url": refunds_only.url,
+                "event_types": ["payment.refunded"],
+            })
+            secret = r1.json()["secret"]
+
+            _, payment, _ = await create_payment(
+                client, order_id=90001, amount=10.0)
+            pid = payment["id"]
+            await client.post(f"/api/v1/payments/{pid}/confirm")
+            await client.post(f"/api/v1/payments/{pid}/refund")
+
+            sink = WebhookSink(session_factory, d)
+            while True:
+                async with session_factory() as db:
+                    if not await relay_batch(db, sink, 100):
+                        break
+            await asyncio.wait_for(d.join(), 5)
+    finally:
+        await d.stop()
+
+    def events(stub):
+        bodies = [json.loads(body) for _, body in stub.requests]
+        # на один endpoint доставки идут параллельно — порядок не гарантирован
+        return sorted(b["type"] for b in bodies if b["data"]["id"] == pid)
+
+    assert events(all_events) == ["payment.confirmed", "payment.refunded"]
+    assert events(refunds_only) == ["payment.refunded"]
+
+    headers, body = all_events.requests[-1]
+    assert verify_signature(
+        secret,
+        int(headers["x-webhook-timestamp"]),
+        body,
+        headers["x-webhook-signature"],
+    )
+    assert r2.status_code == 201
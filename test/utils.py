@@ -8,7 +8,7 @@ def new_key(prefix: str = "idem") -> str:
 async def create_payment(
     client, *,
     order_id: int,
-    amount: float,
+    amount: float | str,
     currency: str = "USD",
     key: str | None = None
 ):
@@ -26,3 +26,8 @@ async def create_payment(
     payment = r.json() if r.headers.get("content-type", "").startswith(
         "application/json") else None
     return r, payment, key
+
+
+def new_order_id() -> int:
+    """Уникальный order_id, чтобы выборки не видели данные прошлых прогонов."""
+    return uuid.uuid4().int % 10**12